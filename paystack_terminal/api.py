@@ -6,56 +6,83 @@ Description: A custom module for integrating Paystack Terminal with ERPNext
 
 
 import frappe
-import requests
 import json
 from frappe import _
+from paystack_terminal.checkout import PaystackUnavailableError, publish_status, start_consolidated_payment, start_terminal_payment
+from paystack_terminal.comments import queue_comment
+from paystack_terminal.dispatcher import clear_in_flight
+from paystack_terminal.events import journal_event
+from paystack_terminal.ledger import get_allocations, get_posted_payment_entry, get_transaction, record_transaction, to_kobo
+from paystack_terminal.locks import ReferenceLockTimeout, acquire_reference_lock
+from paystack_terminal.payment_status import set_payment_status
+from paystack_terminal.posting_context import get_posting_context
+from paystack_terminal.reconciliation import reconcile
+from paystack_terminal.settings import get_settings
+from paystack_terminal.terminal_status import update_from_webhook as update_terminal_status_from_webhook
+from paystack_terminal.webhook import claim_event, is_valid_signature, release_event
 
 @frappe.whitelist(allow_guest=True)
 def handle_webhook():
-    """Handle Paystack webhook notifications"""
+    """Handle Paystack webhook notifications.
+
+    Fast path only: verify the signature, deduplicate in Redis and append
+    the event to the Paystack Event journal. The only database access on
+    the request is that single insert.
+    """
     try:
-        # Get the signature from headers
+        payload = frappe.request.get_data() if frappe.request else b""
         signature = frappe.get_request_header('x-paystack-signature')
         
-        if not signature:
-            frappe.logger().warning("No Paystack signature in webhook")
-            return {'status': 'error', 'message': 'No signature'}
-            
-        # Get request data
-        if frappe.request.data:
-            data = json.loads(frappe.request.data)
-            
-            # Log webhook data for debugging
-            frappe.logger().debug(f"Paystack Webhook Data: {data}")
+        if not is_valid_signature(payload, signature):
+            frappe.logger().warning("Invalid or missing Paystack webhook signature")
+            frappe.local.response.http_status_code = 401
+            return {'status': 'error', 'message': 'Invalid signature'}
             
-            # Ensure data is a dictionary
-            if not isinstance(data, dict):
-                frappe.logger().error("Invalid webhook data format")
-                return {'status': 'error', 'message': 'Invalid data format'}
-            
-            # Process based on event type
-            event = data.get('event')
-            webhook_data = data.get('data', {})
+        data = json.loads(payload)
+        
+        # Ensure data is a dictionary
+        if not isinstance(data, dict):
+            frappe.logger().error("Invalid webhook data format")
+            return {'status': 'error', 'message': 'Invalid data format'}
+        
+        # Process based on event type
+        event = data.get('event')
+        webhook_data = data.get('data') or {}
+        
+        # ONLY process charge.success events, ignore paymentrequest.success
+        if event == "charge.success":
+            reference = webhook_data.get("reference")
             
-            # ONLY process charge.success events, ignore paymentrequest.success
-            if event == "charge.success":
-                reference = webhook_data.get("reference")
-                
-                # Check if payment entry already exists
-                if reference and frappe.db.exists("Payment Entry", {"reference_no": reference}):
-                    frappe.logger().info(f"Payment already processed for reference: {reference}")
-                else:
-                    frappe.enqueue(
-                        'paystack_terminal.api.handle_successful_charge',
-                        data=webhook_data,
-                        queue='short'
-                    )
+            if not reference:
+                frappe.logger().warning("Paystack charge.success without a reference")
+            elif not claim_event(event, reference):
+                frappe.logger().info("Duplicate Paystack webhook for reference: %s", reference)
             else:
-                # Log other events but don't process them
-                frappe.logger().info(f"Ignoring Paystack event: {event}")
-                
-            # Return 200 OK immediately
-            return {'status': 'success'}
+                try:
+                    # One append-only insert; the consumer job does the rest
+                    journal_event(event, reference, payload)
+                    invoice_no = (webhook_data.get("metadata") or {}).get("invoice_no")
+                    set_payment_status(
+                        reference,
+                        "Processing",
+                        [invoice_no] if invoice_no else None,
+                        message=_("Payment received, recording it")
+                    )
+                except Exception as e:
+                    # Let Paystack's retry through if the event could not be recorded
+                    frappe.db.rollback()
+                    release_event(event, reference)
+                    frappe.logger().error(f"Could not journal Paystack charge {reference}: {str(e)}")
+                    frappe.local.response.http_status_code = 503
+                    return {'status': 'error', 'message': 'Could not queue event'}
+        elif event and event.startswith("terminal."):
+            update_terminal_status_from_webhook(event, webhook_data)
+        else:
+            # Log other events but don't process them
+            frappe.logger().info("Ignoring Paystack event: %s", event)
+            
+        # Return 200 OK immediately
+        return {'status': 'success'}
             
     except Exception as e:
         frappe.logger().error(f"Webhook Processing Error: {str(e)}")
@@ -65,36 +92,52 @@ def handle_webhook():
 def handle_successful_charge(data):
     """Handle successful charge notification"""
     try:
-        if not isinstance(data, dict):
-            frappe.logger().error(f"Invalid data type received: {type(data)}")
-            return
-            
-        reference = data.get("reference")
-        amount = float(data.get("amount", 0)) / 100  # Convert from kobo to naira
-        metadata = data.get("metadata", {})
-        
-        # Double-check if payment entry already exists
-        if frappe.db.exists("Payment Entry", {"reference_no": reference}):
-            frappe.logger().info(f"Payment already processed for reference: {reference}")
-            return
-            
-        # Look for the invoice using terminal_reference from Sales Invoice
-        invoice_no = metadata.get("invoice_no")
-        if not invoice_no:
-            # Try to find invoice by terminal_reference
-            invoices = frappe.get_all(
-                "Sales Invoice", 
-                filters={"terminal_reference": reference, "status": "Unpaid"},
-                fields=["name"]
-            )
-            if invoices:
-                invoice_no = invoices[0].name
-                
-        create_payment_entry(reference, amount, invoice_no, metadata)
+        process_charge(data)
             
     except Exception as e:
         frappe.logger().error(f"Charge Processing Error: {str(e)}")
 
+def process_charge(data, existing_references=None, invoices_by_reference=None):
+    """Create the Payment Entry for a charge.success payload, raising on failure.
+    
+    Batch callers can pass pre-fetched lookups: the set of references that
+    already have a Payment Entry and a {reference: invoice} map, both
+    normally built from the Paystack Transaction ledger.
+    """
+    if not isinstance(data, dict):
+        frappe.throw(_("Invalid data type received: {0}").format(type(data)))
+        
+    reference = data.get("reference")
+    amount = float(data.get("amount", 0)) / 100  # Convert from kobo to naira
+    metadata = data.get("metadata") or {}
+    
+    # Double-check if payment entry already exists (primary key lookup on the ledger)
+    transaction = None
+    if existing_references is not None:
+        already_processed = reference in existing_references
+    else:
+        transaction = get_transaction(reference)
+        already_processed = bool(transaction and transaction.payment_entry)
+        
+    if already_processed:
+        frappe.logger().info(f"Payment already processed for reference: {reference}")
+        return
+        
+    # Look for the invoice the reference was pushed for
+    invoice_no = metadata.get("invoice_no")
+    if not invoice_no:
+        if invoices_by_reference is not None:
+            invoice_no = invoices_by_reference.get(reference)
+        elif transaction:
+            invoice_no = transaction.sales_invoice
+            
+    result = create_payment_entry(reference, amount, invoice_no, metadata, fees_kobo=data.get("fees"))
+    
+    if existing_references is not None:
+        existing_references.add(reference)
+        
+    return result
+
 def handle_successful_payment_request(data):
     """
     DEPRECATED: This function is no longer used as we only process charge.success events.
@@ -103,66 +146,93 @@ def handle_successful_payment_request(data):
     frappe.logger().warning("handle_successful_payment_request called but is deprecated")
     return
 
-def create_payment_entry(reference, amount, invoice=None, metadata=None):
+def create_payment_entry(reference, amount, invoice=None, metadata=None, fees_kobo=None):
     """Create a Payment Entry for successful Paystack payments"""
     try:
         # Ensure amount is float
         amount = float(amount) if isinstance(amount, str) else amount
         
-        # Ensure Mode of Payment exists
-        if not frappe.db.exists("Mode of Payment", "Paystack Terminal"):
-            frappe.get_doc({
-                "doctype": "Mode of Payment",
-                "mode_of_payment": "Paystack Terminal",
-                "type": "Bank",
-                "enabled": 1
-            }).insert(ignore_permissions=True)
+        # Serialise workers on this reference until our transaction ends, then
+        # re-check with a locking read so a just-committed entry is visible
+        acquire_reference_lock(reference)
+        existing_payment_entry = get_posted_payment_entry(reference)
+        if existing_payment_entry:
+            frappe.logger().info(f"Payment already processed for reference: {reference}")
+            return {
+                "success": True,
+                "payment_entry": existing_payment_entry,
+                "duplicate": True
+            }
+        
+        # A consolidated charge pays several invoices; the ledger holds the split
+        allocations = get_allocations(reference)
+        if allocations:
+            invoice = invoice or allocations[0].sales_invoice
+            amount = sum(frappe.utils.flt(row.allocated_amount) for row in allocations)
+        elif invoice:
+            allocations = [frappe._dict(sales_invoice=invoice, allocated_amount=amount)]
+            
+        # Single lookup for the invoice's customer and company
+        invoice_details = None
+        if invoice:
+            invoice_details = frappe.db.get_value("Sales Invoice", invoice, ["customer", "company"], as_dict=True)
+            
+        company = (
+            (metadata or {}).get("company")
+            or (invoice_details.company if invoice_details else None)
+            or frappe.defaults.get_user_default("Company")
+        )
         
-        # Get company currency
-        company = metadata.get("company") if metadata else frappe.defaults.get_user_default("Company")
-        company_currency = frappe.get_value("Company", company, "default_currency")
+        # Currency, accounts and mode of payment are cached per company
+        context = get_posting_context(company)
         
         payment_entry = frappe.get_doc({
             "doctype": "Payment Entry",
             "payment_type": "Receive",
             "posting_date": frappe.utils.today(),
             "company": company,
-            "mode_of_payment": "Paystack Terminal",
+            "mode_of_payment": context["mode_of_payment"],
             "paid_amount": amount,
             "received_amount": amount,
             "target_exchange_rate": 1,
-            "paid_to_account_currency": company_currency,
-            "paid_from_account_currency": company_currency,
+            "paid_to_account_currency": context["currency"],
+            "paid_from_account_currency": context["currency"],
+            "paid_to": context["paid_to"],
+            "paid_from": context["paid_from"],
             "reference_no": reference,
+            "paystack_reference": reference,
             "reference_date": frappe.utils.today(),
             "party_type": "Customer",
             "remarks": f"Patient: {metadata.get('patient')}" if metadata and metadata.get('patient') else None
         })
         
-        # If invoice is provided, link it
-        if invoice:
-            payment_entry.party = frappe.get_value("Sales Invoice", invoice, "customer")
-            payment_entry.append("references", {
-                "reference_doctype": "Sales Invoice",
-                "reference_name": invoice,
-                "allocated_amount": amount
-            })
+        # If invoice is provided, link it (one row per invoice for a consolidated charge)
+        if invoice_details:
+            payment_entry.party = invoice_details.customer
+            for allocation in allocations:
+                payment_entry.append("references", {
+                    "reference_doctype": "Sales Invoice",
+                    "reference_name": allocation.sales_invoice,
+                    "allocated_amount": allocation.allocated_amount
+                })
         else:
             payment_entry.party = "Walk-in Customer"
         
-        # Set accounts
-        payment_entry.paid_to = frappe.get_value("Mode of Payment Account",
-            {"parent": "Paystack Terminal", "company": company}, "default_account")
+        # Paystack's fee rides along to the on_submit hooks for the ledger and sales rollup
+        if fees_kobo is not None:
+            payment_entry.flags.paystack_fees_kobo = frappe.utils.cint(fees_kobo)
             
-        if not payment_entry.paid_to:
-            payment_entry.paid_to = frappe.get_value("Company", company, "default_bank_account")
-            
-        if not payment_entry.paid_to:
-            frappe.throw(_("Please set default bank account in Company or Mode of Payment"))
+        try:
+            payment_entry.insert(ignore_permissions=True)
+        except frappe.UniqueValidationError:
+            # Unique paystack_reference is the backstop if the lock was bypassed
+            frappe.logger().info(f"Payment already processed for reference: {reference}")
+            return {
+                "success": True,
+                "payment_entry": frappe.db.get_value("Payment Entry", {"paystack_reference": reference}),
+                "duplicate": True
+            }
             
-        payment_entry.paid_from = frappe.get_value("Company", company, "default_receivable_account")
-        
-        payment_entry.insert(ignore_permissions=True)
         payment_entry.submit()
         
         return {
@@ -170,6 +240,9 @@ def create_payment_entry(reference, amount, invoice=None, metadata=None):
             "payment_entry": payment_entry.name
         }
         
+    except ReferenceLockTimeout:
+        raise
+        
     except Exception as e:
         frappe.logger().error(f"Payment Entry Creation Error: {str(e)}")
         frappe.throw(_("Failed to create payment entry"))
@@ -178,53 +251,16 @@ def create_payment_entry(reference, amount, invoice=None, metadata=None):
 def reconcile_pending_payments():
     """Daily reconciliation of pending payments"""
     try:
-        settings = frappe.get_single("Paystack Settings")
+        settings = get_settings()
         
         if not settings.enabled:
             return
             
-        headers = {
-            "Authorization": f"Bearer {settings.get_password('secret_key')}",
-            "Content-Type": "application/json"
-        }
-        
         # Get pending payments from the last 24 hours
         yesterday = frappe.utils.add_days(frappe.utils.nowdate(), -1)
         
-        # Get all Sales Invoices with terminal_reference but no payment entry
-        pending_invoices = frappe.get_all(
-            "Sales Invoice",
-            filters={
-                "terminal_reference": ["!=", ""],
-                "status": "Unpaid",
-                "creation": [">=", yesterday]
-            },
-            fields=["name", "terminal_reference", "grand_total"]
-        )
-        
-        for invoice in pending_invoices:
-            try:
-                # Verify payment status with Paystack
-                verify_url = f"https://api.paystack.co/transaction/verify/{invoice.terminal_reference}"
-                verify_response = requests.get(verify_url, headers=headers)
-                
-                if verify_response.status_code == 200:
-                    response_data = verify_response.json()["data"]
-                    
-                    if response_data["status"] == "success":
-                        # Create payment entry if payment was successful
-                        if not frappe.db.exists("Payment Entry", {"reference_no": invoice.terminal_reference}):
-                            create_payment_entry(
-                                reference=invoice.terminal_reference,
-                                amount=invoice.grand_total,
-                                invoice=invoice.name
-                            )
-                            
-                        frappe.logger().info(f"Reconciled payment for invoice {invoice.name}")
-                        
-            except Exception as e:
-                frappe.logger().error(f"Error reconciling invoice {invoice.name}: {str(e)}")
-                continue
+        summary = reconcile(yesterday, settings=settings)
+        frappe.logger().info(f"Paystack reconciliation summary: {summary}")
                 
     except Exception as e:
         frappe.logger().error(f"Reconciliation Error: {str(e)}")
@@ -237,153 +273,75 @@ def update_payment_status(doc, method):
         if doc.mode_of_payment != "Paystack Terminal":
             return
             
-        # Get linked Sales Invoice
-        for ref in doc.references:
-            if ref.reference_doctype == "Sales Invoice":
-                sales_invoice = frappe.get_doc("Sales Invoice", ref.reference_name)
-                
-                # Update custom field
-                sales_invoice.db_set("paystack_status", "Paid")
-                sales_invoice.db_set("terminal_reference", doc.reference_no)
-                
-                # Add comment to Sales Invoice
-                frappe.get_doc({
-                    "doctype": "Comment",
-                    "comment_type": "Info",
-                    "reference_doctype": "Sales Invoice",
-                    "reference_name": sales_invoice.name,
-                    "content": f"Payment processed via Paystack Terminal (Reference: {doc.reference_no})"
-                }).insert(ignore_permissions=True)
-                
-                frappe.db.commit()
-                
+        sales_invoices = [ref.reference_name for ref in doc.references if ref.reference_doctype == "Sales Invoice"]
+        
+        # The terminal is free again once its request has been paid
+        transaction = get_transaction(doc.reference_no)
+        if transaction and transaction.terminal_id:
+            clear_in_flight(transaction.terminal_id, doc.reference_no)
+            
+        record_transaction(
+            doc.reference_no,
+            sales_invoice=sales_invoices[0] if sales_invoices else None,
+            payment_entry=doc.name,
+            amount_kobo=to_kobo(doc.paid_amount),
+            fees_kobo=doc.flags.get("paystack_fees_kobo"),
+            status="Success"
+        )
+        set_payment_status(doc.reference_no, "Paid", sales_invoices, payment_entry=doc.name)
+        
+        if sales_invoices:
+            # One multi-column UPDATE for every linked invoice, without loading them
+            frappe.db.set_value(
+                "Sales Invoice",
+                {"name": ["in", sales_invoices]},
+                {"paystack_status": "Paid", "terminal_reference": doc.reference_no}
+            )
+            
+        # Comments and realtime updates wait for the submit transaction to commit
+        for sales_invoice in sales_invoices:
+            queue_comment(
+                "Sales Invoice",
+                sales_invoice,
+                f"Payment processed via Paystack Terminal (Reference: {doc.reference_no})"
+            )
+            publish_status(
+                sales_invoice,
+                "paid",
+                _("Payment received via Paystack Terminal"),
+                after_commit=True,
+                reference=doc.reference_no
+            )
+            
     except Exception as e:
         frappe.logger().error(f"Payment Status Update Error: {str(e)}")
         # Don't throw error to avoid interrupting payment entry submission
         pass
 
 @frappe.whitelist()
-def process_terminal_payment(invoice, amount, customer):
+def process_terminal_payment(invoice, amount, customer, terminal_id=None, counter=None):
     """Process payment through Paystack Terminal"""
     try:
-        # Convert amount to float
-        amount = float(amount)
+        return start_terminal_payment(invoice, amount, terminal_id=terminal_id, counter=counter)
         
-        settings = frappe.get_single("Paystack Settings")
-        if not settings.enabled:
-            frappe.throw(_("Paystack Terminal integration is disabled"))
-            
-        # Check terminal status before proceeding
-        headers = {
-            "Authorization": f"Bearer {settings.get_password('secret_key')}",
-            "Content-Type": "application/json"
-        }
-        
-        # Check if terminal is online and available
-        terminal_url = f"https://api.paystack.co/terminal/{settings.terminal_id}/presence"
-        terminal_response = requests.get(terminal_url, headers=headers)
-        
-        if terminal_response.status_code != 200:
-            frappe.throw(_("Could not check terminal status"))
-            
-        terminal_data = terminal_response.json().get("data", {})
-        if not (terminal_data.get("online") and terminal_data.get("available")):
-            frappe.throw(_("Terminal is not available for payment processing"))
-            
-        # Get invoice, customer, and patient details
-        sales_invoice = frappe.get_doc("Sales Invoice", invoice)
-        customer = frappe.get_doc("Customer", sales_invoice.customer)
+    except PaystackUnavailableError:
+        # Already a clear message for the cashier
+        raise
         
-        # Get patient details if available
-        patient = None
-        if hasattr(sales_invoice, 'patient') and sales_invoice.patient:
-            patient = frappe.get_doc("Patient", sales_invoice.patient)
-        
-        # Prepare customer data using patient info if available
-        customer_data = {
-            "email": (patient.email if patient else customer.email_id) or f"customer_{customer.name.lower()}@example.com",
-            "first_name": patient.first_name if patient else customer.customer_name,
-            "last_name": patient.last_name if patient else "",
-            "phone": patient.mobile if patient else customer.mobile_no,
-            "metadata": {
-                "erp_customer_id": customer.name,
-                "patient_id": patient.name if patient else None
-            }
-        }
-        
-        # Check if customer exists in Paystack
-        paystack_customer_code = customer.get("paystack_customer_code")
-        if not paystack_customer_code:
-            # Create new customer in Paystack
-            customer_response = requests.post(
-                "https://api.paystack.co/customer",
-                headers=headers,
-                json=customer_data
-            )
-            
-            if customer_response.status_code == 200:
-                customer_result = customer_response.json()
-                if customer_result.get("status"):
-                    paystack_customer_code = customer_result["data"]["customer_code"]
-                    customer.db_set(
-                        "paystack_customer_code",
-                        customer_result["data"]["customer_code"],
-                        update_modified=False
-                    )
-            else:
-                frappe.logger().error(f"Failed to create customer in Paystack: {customer_response.text}")
-                frappe.throw(_("Failed to create customer in Paystack"))
-        
-        # Create payment request
-        payment_data = {
-            "customer": paystack_customer_code,
-            "amount": str(float(amount) * 100),  # Convert to kobo
-            "metadata": {
-                "invoice_no": invoice,
-                "customer_name": customer.customer_name,
-                "customer_email": customer.email_id,
-                "patient": sales_invoice.patient if hasattr(sales_invoice, 'patient') else None,
-                "company": sales_invoice.company,
-                "source": "ERPNext Healthcare"
-            }
-        }
-        
-        create_request_url = "https://api.paystack.co/paymentrequest"
-        request_response = requests.post(create_request_url, headers=headers, json=payment_data)
-        
-        if request_response.status_code != 200:
-            frappe.throw(_("Failed to create payment request"))
-            
-        request_data = request_response.json()["data"]
-        
-        # Push to terminal
-        terminal_data = {
-            "type": "invoice",
-            "action": "process",
-            "data": {
-                "id": request_data["id"],
-                "reference": request_data["offline_reference"]
-            }
-        }
-        
-        terminal_url = f"https://api.paystack.co/terminal/{settings.terminal_id}/event"
-        terminal_response = requests.post(terminal_url, headers=headers, json=terminal_data)
-        
-        if terminal_response.status_code != 200:
-            frappe.throw(_("Failed to push payment to terminal"))
-            
-        # Store reference in invoice
-        frappe.db.set_value("Sales Invoice", invoice, {
-            "terminal_reference": request_data["offline_reference"],
-            "paystack_status": "Pending"
-        })
+    except Exception as e:
+        frappe.logger().error(f"Terminal Payment Error: {str(e)}")
+        frappe.throw(_("Failed to process terminal payment"))
+
+@frappe.whitelist()
+def process_consolidated_payment(invoices, terminal_id=None, counter=None):
+    """Charge several invoices of one customer with a single terminal payment"""
+    try:
+        return start_consolidated_payment(frappe.parse_json(invoices), terminal_id=terminal_id, counter=counter)
         
-        return {
-            "success": True,
-            "message": "Payment request sent to terminal",
-            "reference": request_data["offline_reference"]
-        }
+    except frappe.ValidationError:
+        # Validation and availability messages are meant for the cashier as they are
+        raise
         
     except Exception as e:
-        frappe.logger().error(f"Terminal Payment Error: {str(e)}")
+        frappe.logger().error(f"Consolidated Terminal Payment Error: {str(e)}")
         frappe.throw(_("Failed to process terminal payment"))
@@ -0,0 +1,224 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Offline benchmarks for checkout, webhook ingestion and reconciliation against the mock Paystack server
+
+Meant for a scratch site with some submitted, unpaid Sales Invoices. Each
+benchmark runs inside a transaction that is rolled back afterwards.
+"""
+
+import json
+import math
+import time
+from datetime import datetime, timedelta, timezone
+
+import frappe
+import requests
+from frappe import _
+from paystack_terminal.client import PAYSTACK_BASE_URL
+from paystack_terminal.mock_server import MockPaystack, sign, start_server
+from paystack_terminal.settings import get_settings
+
+DEFAULT_TERMINAL = "BENCH-TERMINAL"
+
+# Allowed slowdown against a baseline before a metric counts as a regression, in percent
+DEFAULT_TOLERANCE = 20
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0
+    ordered = sorted(samples)
+    # Nearest-rank percentile
+    return ordered[max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)]
+
+
+def summarize(name, samples, wall_time, failed=0):
+    """Latency percentiles in ms and throughput per second for one benchmark"""
+    return {
+        "name": name,
+        "count": len(samples),
+        "failed": failed,
+        "wall_time_s": round(wall_time, 3),
+        "throughput_per_s": round(len(samples) / wall_time, 2) if wall_time else 0,
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 2) if samples else 0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2) if samples else 0
+    }
+
+
+def get_unpaid_invoices(limit):
+    return frappe.get_all(
+        "Sales Invoice",
+        filters={"docstatus": 1, "outstanding_amount": [">", 0]},
+        fields=["name", "outstanding_amount", "grand_total"],
+        order_by="creation desc",
+        limit_page_length=limit
+    )
+
+
+def rolled_back(func):
+    """Run a benchmark and discard everything it wrote to the database"""
+    def wrapper(*args, **kwargs):
+        frappe.db.rollback()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            frappe.db.rollback()
+    return wrapper
+
+
+@rolled_back
+def bench_checkout(settings, invoices, terminal_id=DEFAULT_TERMINAL):
+    """start_terminal_payment per invoice: customer, payment request, ledger and outbox writes"""
+    from paystack_terminal.checkout import start_terminal_payment
+    from paystack_terminal.dispatcher import clear_in_flight
+
+    samples, failed, references = [], 0, []
+    started = time.perf_counter()
+    for invoice in invoices:
+        begin = time.perf_counter()
+        try:
+            result = start_terminal_payment(invoice.name, invoice.outstanding_amount, settings=settings, terminal_id=terminal_id)
+            references.append(result["reference"])
+            samples.append(time.perf_counter() - begin)
+        except Exception as e:
+            failed += 1
+            frappe.logger().info(f"Checkout benchmark failed for {invoice.name}: {str(e)}")
+    wall_time = time.perf_counter() - started
+
+    for reference in references:
+        clear_in_flight(terminal_id, reference)
+    return summarize("checkout", samples, wall_time, failed)
+
+
+@rolled_back
+def bench_webhooks(count, secret_key):
+    """handle_webhook in-process for signed charge.success payloads with unique references"""
+    from werkzeug.test import EnvironBuilder
+    from werkzeug.wrappers import Request
+
+    from paystack_terminal.api import handle_webhook
+    from paystack_terminal.webhook import release_event
+
+    run = frappe.generate_hash(length=8)
+    bodies = []
+    for i in range(count):
+        reference = f"BENCH-{run}-{i}"
+        body = json.dumps({
+            "event": "charge.success",
+            "data": {"reference": reference, "amount": 100000, "status": "success", "metadata": {}}
+        }).encode()
+        bodies.append((reference, body))
+
+    samples, failed = [], 0
+    request = getattr(frappe.local, "request", None)
+    started = time.perf_counter()
+    try:
+        for reference, body in bodies:
+            frappe.local.request = Request(EnvironBuilder(
+                method="POST",
+                data=body,
+                headers={"Content-Type": "application/json", "x-paystack-signature": sign(secret_key, body)}
+            ).get_environ())
+            begin = time.perf_counter()
+            result = handle_webhook()
+            samples.append(time.perf_counter() - begin)
+            if (result or {}).get("status") != "success":
+                failed += 1
+    finally:
+        wall_time = time.perf_counter() - started
+        frappe.local.request = request
+        for reference, _body in bodies:
+            release_event("charge.success", reference)
+
+    return summarize("webhook_ingestion", samples, wall_time, failed)
+
+
+@rolled_back
+def bench_reconciliation(settings, mock_url, invoices):
+    """reconcile_incremental over N invoices whose references were paid on the mock"""
+    from paystack_terminal.reconciliation import reconcile_incremental
+
+    since = (datetime.now(timezone.utc) - timedelta(seconds=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    run = frappe.generate_hash(length=8)
+
+    transactions = []
+    for i, invoice in enumerate(invoices):
+        reference = f"BENCH-{run}-{i}"
+        frappe.db.set_value("Sales Invoice", invoice.name, "terminal_reference", reference, update_modified=False)
+        transactions.append({
+            "reference": reference,
+            "amount": int(round(invoice.grand_total * 100)),
+            "metadata": {"invoice_no": invoice.name}
+        })
+    requests.post(f"{mock_url}/_mock/transactions", json={"transactions": transactions}, timeout=30).raise_for_status()
+
+    started = time.perf_counter()
+    summary = reconcile_incremental(settings, cursor=(since, 0), persist=False)
+    wall_time = time.perf_counter() - started
+
+    result = summarize("reconciliation", [wall_time], wall_time, summary["failed"])
+    result.update({
+        "invoices": len(invoices),
+        "reconciled": summary["reconciled"],
+        "invoices_per_s": round(summary["reconciled"] / wall_time, 2) if wall_time else 0
+    })
+    return result
+
+
+def run_benchmarks(invoices=20, webhooks=200, mock_url=None, latency=0, terminal_id=DEFAULT_TERMINAL, only=None):
+    """Run the selected benchmarks and return their results.
+
+    Without mock_url a mock Paystack server is started in this process with
+    the given latency (ms). Calls never go to the live Paystack API.
+    """
+    if mock_url and mock_url.rstrip("/") == PAYSTACK_BASE_URL:
+        frappe.throw(_("Benchmarks must run against the mock Paystack server, not the live API"))
+
+    server = None
+    if not mock_url:
+        server, mock_url = start_server(MockPaystack(latency=latency))
+
+    settings = frappe._dict(get_settings(), enabled=1, base_url=mock_url)
+    settings.auth_headers = dict(settings.auth_headers or {}, Authorization="Bearer sk_test_benchmark")
+
+    selected = only or ("checkout", "webhooks", "reconciliation")
+    sample = get_unpaid_invoices(invoices) if {"checkout", "reconciliation"} & set(selected) else []
+    results = []
+    try:
+        if "checkout" in selected:
+            results.append(bench_checkout(settings, sample, terminal_id))
+        if "webhooks" in selected:
+            if not settings.secret_key:
+                frappe.throw(_("Set a Secret Key in Paystack Settings to sign benchmark webhooks"))
+            results.append(bench_webhooks(webhooks, settings.secret_key))
+        if "reconciliation" in selected:
+            results.append(bench_reconciliation(settings, mock_url, sample))
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Regressions against a previous run: slower p95 or lower throughput beyond the tolerance"""
+    previous = {result["name"]: result for result in baseline}
+    regressions = []
+
+    for result in results:
+        before = previous.get(result["name"])
+        if not before:
+            continue
+        if before["p95_ms"] and result["p95_ms"] > before["p95_ms"] * (1 + tolerance / 100.0):
+            regressions.append(f"{result['name']}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms")
+        if before["throughput_per_s"] and result["throughput_per_s"] < before["throughput_per_s"] * (1 - tolerance / 100.0):
+            regressions.append(
+                f"{result['name']}: throughput {before['throughput_per_s']}/s -> {result['throughput_per_s']}/s"
+            )
+
+    return regressions
@@ -0,0 +1,475 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Terminal checkout flow, synchronous or as a background job
+"""
+
+from functools import partial
+
+import frappe
+from frappe import _
+from frappe.utils import flt, now_datetime
+from paystack_terminal import circuit_breaker, metrics, savepoints
+from paystack_terminal.client import CircuitOpenError, PaystackAPIError, get_client
+from paystack_terminal.dispatcher import mark_in_flight, select_terminal
+from paystack_terminal.ledger import LEDGER_DOCTYPE, get_allocations, get_transaction, record_transaction, set_allocations, to_kobo
+from paystack_terminal.locks import acquire_reference_lock
+from paystack_terminal.outbox import deliver_entry, queue_customer_creation, queue_terminal_push
+from paystack_terminal.payment_status import set_payment_status
+from paystack_terminal.prewarm import is_prewarm_usable, release_prewarmed_requests
+from paystack_terminal.queues import enqueue
+from paystack_terminal.settings import get_settings
+from paystack_terminal.terminal_status import is_terminal_available
+
+STATUS_EVENT = "paystack_payment_status"
+
+# Endpoint families a checkout depends on
+CHECKOUT_FAMILIES = ("terminal", "paymentrequest")
+
+
+class PaystackUnavailableError(frappe.ValidationError):
+    pass
+
+
+def throw_unavailable(retry_in):
+    frappe.throw(
+        _("Paystack is not responding right now. Please retry in {0} seconds or take the payment another way.").format(retry_in),
+        PaystackUnavailableError,
+        title=_("Paystack Unavailable")
+    )
+
+
+def check_paystack_available():
+    """Fail fast while a circuit the checkout needs is open"""
+    for family in CHECKOUT_FAMILIES:
+        state = circuit_breaker.get_state(family)
+        if state["state"] == circuit_breaker.OPEN:
+            throw_unavailable(state["retry_in"])
+
+
+def throw_api_error(error, message):
+    if isinstance(error, CircuitOpenError):
+        throw_unavailable(error.retry_in)
+    frappe.throw(message)
+
+
+def publish_status(invoice, status, message=None, after_commit=False, **extra):
+    """Push a checkout progress update to anyone viewing the invoice"""
+    publish = partial(
+        frappe.publish_realtime,
+        STATUS_EVENT,
+        dict(invoice=invoice, status=status, message=message, **extra),
+        doctype="Sales Invoice",
+        docname=invoice
+    )
+    if after_commit:
+        savepoints.after_commit(publish)
+    else:
+        publish()
+
+
+def get_customer_data(customer, patient=None):
+    """Paystack customer payload, preferring patient details when available"""
+    return {
+        "email": (patient.email if patient else customer.email_id) or f"customer_{customer.name.lower()}@example.com",
+        "first_name": patient.first_name if patient else customer.customer_name,
+        "last_name": patient.last_name if patient else "",
+        "phone": patient.mobile if patient else customer.mobile_no,
+        "metadata": {
+            "erp_customer_id": customer.name,
+            "patient_id": patient.name if patient else None
+        }
+    }
+
+
+def ensure_paystack_customer(client, customer, patient=None):
+    """Return the customer's Paystack code, creating the Paystack customer if needed"""
+    paystack_customer_code = customer.get("paystack_customer_code")
+    if paystack_customer_code:
+        return paystack_customer_code
+
+    # Deliver through the outbox so a retry reuses the same idempotency key
+    entry = queue_customer_creation(customer.name, get_customer_data(customer, patient))
+    try:
+        deliver_entry(entry, client, raise_exception=True)
+    except PaystackAPIError as e:
+        frappe.logger().error(f"Failed to create customer in Paystack: {str(e)}")
+        throw_api_error(e, _("Failed to create customer in Paystack"))
+
+    return frappe.db.get_value("Customer", customer.name, "paystack_customer_code")
+
+
+def create_payment_request(client, sales_invoice, amount, invoices=None):
+    """Create a Paystack payment request for the invoice (without pushing it).
+
+    invoices lists every invoice a consolidated request pays; sales_invoice is
+    the primary one whose customer and company are charged.
+    """
+    customer = frappe.get_doc("Customer", sales_invoice.customer)
+
+    patient = None
+    if sales_invoice.get("patient"):
+        patient = frappe.get_doc("Patient", sales_invoice.patient)
+
+    paystack_customer_code = ensure_paystack_customer(client, customer, patient)
+
+    payment_data = {
+        "customer": paystack_customer_code,
+        "amount": str(flt(amount) * 100),  # Convert to kobo
+        "metadata": {
+            "invoice_no": sales_invoice.name,
+            "customer_name": customer.customer_name,
+            "customer_email": customer.email_id,
+            "patient": sales_invoice.get("patient"),
+            "company": sales_invoice.company,
+            "source": "ERPNext Healthcare"
+        }
+    }
+    if invoices:
+        payment_data["metadata"]["invoices"] = invoices
+
+    try:
+        return client.create_payment_request(payment_data)
+    except PaystackAPIError as e:
+        frappe.logger().error(f"Failed to create payment request: {str(e)}")
+        throw_api_error(e, _("Failed to create payment request"))
+
+
+def get_prewarmed_request(sales_invoice, amount):
+    """Return the request created on submit if it is fresh and for the same amount"""
+    if not is_prewarm_usable(sales_invoice, amount):
+        return None
+
+    return {
+        "id": sales_invoice.paystack_request_id,
+        "offline_reference": sales_invoice.paystack_offline_reference
+    }
+
+
+def get_open_request(sales_invoice, amount, invoices=None):
+    """Return the unpaid request from an earlier attempt on this invoice, if it is for the same amount.
+
+    A consolidated request is only reused for exactly the same set of invoices.
+    """
+    if not (sales_invoice.get("terminal_reference") and sales_invoice.get("paystack_request_id")):
+        return None
+
+    transaction = get_transaction(sales_invoice.terminal_reference)
+    if not transaction or transaction.status != "Pending" or transaction.payment_entry:
+        return None
+    if transaction.amount_kobo != to_kobo(amount):
+        return None
+
+    allocated = {row.sales_invoice for row in get_allocations(sales_invoice.terminal_reference)}
+    if allocated != set(invoices or []):
+        return None
+
+    return {
+        "id": sales_invoice.paystack_request_id,
+        "offline_reference": sales_invoice.terminal_reference
+    }
+
+
+def get_covering_references(invoices):
+    """Terminal references the invoices currently point at"""
+    return set(frappe.get_all(
+        "Sales Invoice",
+        filters={"name": ["in", invoices], "terminal_reference": ["is", "set"]},
+        pluck="terminal_reference"
+    ))
+
+
+def release_open_requests(client, invoices, keep=None):
+    """Archive the unpaid requests covering these invoices before another request charges them.
+
+    A request left live on the terminal could be paid as well as the new one.
+    The ledger row is re-read under the reference lock, so a payment posted
+    meanwhile is never cancelled, and a request Paystack will not archive
+    stops the checkout.
+    """
+    for reference in get_covering_references(invoices) - {keep}:
+        acquire_reference_lock(reference)
+        transaction = frappe.db.get_value(
+            LEDGER_DOCTYPE,
+            reference,
+            ["status", "payment_entry", "payment_request_id"],
+            as_dict=True,
+            for_update=True
+        )
+        if not transaction or transaction.status != "Pending" or transaction.payment_entry:
+            continue
+
+        if transaction.payment_request_id:
+            try:
+                client.archive_payment_request(transaction.payment_request_id)
+            except PaystackAPIError as e:
+                frappe.logger().error(f"Could not archive payment request {transaction.payment_request_id}: {str(e)}")
+                throw_api_error(e, _("Could not cancel the open Paystack request {0}").format(reference))
+        else:
+            # Ledger rows backfilled from before request ids were stored
+            frappe.logger().warning(f"Open Paystack reference {reference} has no payment request id to archive")
+
+        record_transaction(reference, status="Failed")
+        # Invoices on the old request that the new charge leaves out are no longer being charged
+        frappe.db.set_value(
+            "Sales Invoice",
+            {"terminal_reference": reference, "name": ["not in", invoices]},
+            "paystack_status",
+            "Failed",
+            update_modified=False
+        )
+        set_payment_status(reference, "Failed", message=_("Replaced by another payment request"))
+
+
+def resolve_terminal(sales_invoice, client, settings, terminal_id=None, counter=None):
+    """Check a pinned terminal, or let the dispatcher pick one for the user or counter"""
+    # Presence comes from the cache when fresh
+    if terminal_id:
+        if not is_terminal_available(terminal_id, client):
+            frappe.throw(_("Terminal is not available for payment processing"))
+        return terminal_id
+
+    return select_terminal(
+        company=sales_invoice.company,
+        user=frappe.session.user,
+        counter=counter,
+        client=client,
+        settings=settings
+    )
+
+
+@metrics.timed("paystack_checkout_duration_seconds", mode="single")
+def start_terminal_payment(invoice, amount, settings=None, notify=False, terminal_id=None, counter=None):
+    """Create a payment request for the invoice and queue its push to a terminal.
+
+    terminal_id pins the terminal; otherwise the dispatcher picks one for the
+    user or counter. The push is written to the outbox in the same transaction
+    as the invoice state and delivered by the outbox worker after commit.
+    """
+    amount = flt(amount)
+
+    if settings is None:
+        settings = get_settings()
+    if not settings.enabled:
+        frappe.throw(_("Paystack Terminal integration is disabled"))
+
+    check_paystack_available()
+
+    client = get_client(settings)
+    sales_invoice = frappe.get_doc("Sales Invoice", invoice)
+    terminal_id = resolve_terminal(sales_invoice, client, settings, terminal_id, counter)
+
+    # Reuse the request prepared on submit or by an earlier attempt, if it still matches
+    request_data = get_prewarmed_request(sales_invoice, amount)
+    if not request_data:
+        release_prewarmed_requests([invoice])
+        request_data = get_open_request(sales_invoice, amount)
+    # Any other open request on the invoice, such as a consolidated one, must stop being payable
+    release_open_requests(client, [invoice], keep=request_data and request_data["offline_reference"])
+    if not request_data:
+        request_data = create_payment_request(client, sales_invoice, amount)
+
+    reference = request_data["offline_reference"]
+    if notify:
+        publish_status(invoice, "request_created", _("Payment request created"), reference=reference)
+
+    # Store reference in invoice; the outbox worker moves it to Pending once the terminal has it
+    frappe.db.set_value("Sales Invoice", invoice, {
+        "terminal_reference": reference,
+        "paystack_status": "Sending",
+        "paystack_request_id": request_data["id"],
+        "paystack_offline_reference": None,
+        "paystack_prewarmed_amount": 0,
+        "paystack_prewarmed_on": None
+    })
+    record_transaction(
+        reference,
+        sales_invoice=invoice,
+        payment_request_id=request_data["id"],
+        terminal_id=terminal_id,
+        amount_kobo=to_kobo(amount),
+        company=sales_invoice.company,
+        cashier=frappe.session.user,
+        status="Pending"
+    )
+    queue_terminal_push(terminal_id, reference, request_data["id"], invoice)
+    mark_in_flight(terminal_id, reference)
+    set_payment_status(reference, "Sending", [invoice], terminal_id=terminal_id, amount=amount)
+
+    return {
+        "success": True,
+        "message": "Payment request queued for terminal",
+        "reference": reference,
+        "terminal_id": terminal_id
+    }
+
+
+def get_consolidation(invoices):
+    """Validate invoices for one combined charge; returns their rows and [(invoice, outstanding)]"""
+    invoices = list(dict.fromkeys(invoices or []))
+    if len(invoices) < 2:
+        frappe.throw(_("Select at least two invoices to pay together"))
+
+    rows = frappe.get_all(
+        "Sales Invoice",
+        filters={"name": ["in", invoices]},
+        fields=["name", "docstatus", "customer", "company", "outstanding_amount", "paystack_status"]
+    )
+    rows_by_name = {row.name: row for row in rows}
+
+    for invoice in invoices:
+        row = rows_by_name.get(invoice)
+        if not row or row.docstatus != 1:
+            frappe.throw(_("Invoice {0} is not submitted").format(invoice))
+        if flt(row.outstanding_amount) <= 0:
+            frappe.throw(_("Invoice {0} has nothing outstanding").format(invoice))
+        if row.paystack_status == "Queued" and is_checkout_queued(invoice):
+            frappe.throw(_("A terminal payment for invoice {0} is already in progress").format(invoice))
+        frappe.has_permission("Sales Invoice", "write", invoice, throw=True)
+
+    if len({(row.customer, row.company) for row in rows}) > 1:
+        frappe.throw(_("Invoices paid together must be for the same customer and company"))
+
+    return [rows_by_name[invoice] for invoice in invoices], [
+        (invoice, flt(rows_by_name[invoice].outstanding_amount)) for invoice in invoices
+    ]
+
+
+@metrics.timed("paystack_checkout_duration_seconds", mode="consolidated")
+def start_consolidated_payment(invoices, settings=None, terminal_id=None, counter=None):
+    """Charge the outstanding amounts of several invoices as one payment request and terminal push.
+
+    The first invoice is the primary one on the request; the ledger records how
+    the charge is split so one Payment Entry can settle every invoice.
+    """
+    if settings is None:
+        settings = get_settings()
+    if not settings.enabled:
+        frappe.throw(_("Paystack Terminal integration is disabled"))
+
+    check_paystack_available()
+
+    rows, allocations = get_consolidation(invoices)
+    invoices = [row.name for row in rows]
+    amount = sum(allocated for _invoice, allocated in allocations)
+
+    client = get_client(settings)
+    sales_invoice = frappe.get_doc("Sales Invoice", invoices[0])
+    terminal_id = resolve_terminal(sales_invoice, client, settings, terminal_id, counter)
+
+    request_data = get_open_request(sales_invoice, amount, invoices)
+    release_open_requests(client, invoices, keep=request_data and request_data["offline_reference"])
+    if not request_data:
+        request_data = create_payment_request(client, sales_invoice, amount, invoices)
+
+    reference = request_data["offline_reference"]
+
+    # The individual invoices' prewarmed requests are replaced by the combined one
+    release_prewarmed_requests(invoices)
+    frappe.db.set_value("Sales Invoice", {"name": ["in", invoices]}, {
+        "terminal_reference": reference,
+        "paystack_status": "Sending",
+        "paystack_request_id": request_data["id"]
+    })
+    record_transaction(
+        reference,
+        sales_invoice=invoices[0],
+        payment_request_id=request_data["id"],
+        terminal_id=terminal_id,
+        amount_kobo=to_kobo(amount),
+        company=sales_invoice.company,
+        cashier=frappe.session.user,
+        status="Pending"
+    )
+    set_allocations(reference, allocations)
+    queue_terminal_push(terminal_id, reference, request_data["id"], invoices[0])
+    mark_in_flight(terminal_id, reference)
+    set_payment_status(reference, "Sending", invoices, terminal_id=terminal_id, amount=amount)
+
+    return {
+        "success": True,
+        "message": "Payment request queued for terminal",
+        "reference": reference,
+        "terminal_id": terminal_id,
+        "invoices": invoices,
+        "amount": amount
+    }
+
+
+def get_checkout_job_id(invoice):
+    return f"paystack_checkout::{invoice}"
+
+
+def is_checkout_queued(invoice):
+    """True while the invoice's checkout job is waiting or running.
+
+    A Queued status whose job is gone (worker killed, Redis flushed, job
+    timed out) no longer blocks a new checkout.
+    """
+    from frappe.utils.background_jobs import is_job_enqueued
+
+    return is_job_enqueued(get_checkout_job_id(invoice))
+
+
+@frappe.whitelist()
+def enqueue_terminal_payment(invoice, amount, customer=None, terminal_id=None, counter=None):
+    """Validate the checkout and hand the Paystack calls to a background job"""
+    amount = flt(amount)
+
+    settings = get_settings()
+    if not settings.enabled:
+        frappe.throw(_("Paystack Terminal integration is disabled"))
+
+    frappe.has_permission("Sales Invoice", "write", invoice, throw=True)
+    check_paystack_available()
+
+    invoice_state = frappe.db.get_value(
+        "Sales Invoice",
+        invoice,
+        ["docstatus", "outstanding_amount", "paystack_status"],
+        as_dict=True
+    )
+    if not invoice_state or invoice_state.docstatus != 1:
+        frappe.throw(_("Only submitted invoices can be paid on the terminal"))
+    if amount <= 0 or invoice_state.outstanding_amount <= 0:
+        frappe.throw(_("Nothing to pay on this invoice"))
+    if invoice_state.paystack_status == "Queued" and is_checkout_queued(invoice):
+        frappe.throw(_("A terminal payment for this invoice is already in progress"))
+
+    frappe.db.set_value("Sales Invoice", invoice, "paystack_status", "Queued", update_modified=False)
+    set_payment_status(None, "Queued", [invoice])
+
+    job = enqueue(
+        "paystack_terminal.checkout.run_terminal_payment",
+        job_id=get_checkout_job_id(invoice),
+        deduplicate=True,
+        enqueue_after_commit=True,
+        invoice=invoice,
+        amount=amount,
+        terminal_id=terminal_id,
+        counter=counter,
+        queued_at=now_datetime()
+    )
+
+    return {
+        "success": True,
+        "queued": True,
+        "job_id": job.id if job else get_checkout_job_id(invoice),
+        "message": "Payment request queued for terminal"
+    }
+
+
+def run_terminal_payment(invoice, amount, terminal_id=None, counter=None, queued_at=None):
+    """Background job for enqueue_terminal_payment"""
+    if queued_at:
+        metrics.observe("paystack_queue_wait_seconds", metrics.seconds_since(queued_at), queue="checkout")
+
+    try:
+        start_terminal_payment(invoice, amount, notify=True, terminal_id=terminal_id, counter=counter)
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.logger().error(f"Terminal Payment Error: {str(e)}")
+        frappe.db.set_value("Sales Invoice", invoice, "paystack_status", "Failed", update_modified=False)
+        frappe.db.commit()
+        set_payment_status(None, "Failed", [invoice], after_commit=False, message=str(e))
+        publish_status(invoice, "failed", str(e) or _("Failed to process terminal payment"))
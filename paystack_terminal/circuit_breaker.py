@@ -0,0 +1,153 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Redis-backed circuit breaker per Paystack endpoint family
+"""
+
+import time
+
+import frappe
+from frappe.utils import cint, flt
+
+ENDPOINT_FAMILIES = ("terminal", "paymentrequest", "customer", "transaction")
+
+FAILURES_KEY = "paystack_terminal:circuit_failures:{0}"
+OPEN_UNTIL_KEY = "paystack_terminal:circuit_open_until:{0}"
+PROBE_KEY = "paystack_terminal:circuit_probe:{0}"
+
+# Consecutive failures that open the circuit
+FAILURE_THRESHOLD = 5
+# How long an open circuit rejects calls when Paystack gives no Retry-After
+OPEN_SECONDS = 30
+MAX_OPEN_SECONDS = 300
+# Only one caller probes a half-open circuit; the probe slot expires after this
+PROBE_TIMEOUT = 20
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+def get_key(template, family):
+    # Plain Redis commands only: the RedisWrapper helpers add their own prefix
+    return frappe.cache().make_key(template.format(family))
+
+
+def get_state(family):
+    """Current breaker state for an endpoint family"""
+    failures, open_until = frappe.cache().mget(
+        [get_key(FAILURES_KEY, family), get_key(OPEN_UNTIL_KEY, family)]
+    )
+    failures = cint(failures)
+    open_until = flt(open_until)
+
+    if open_until and time.time() < open_until:
+        status = OPEN
+    elif open_until:
+        status = HALF_OPEN
+    else:
+        status = CLOSED
+
+    return {
+        "family": family,
+        "state": status,
+        "failures": failures,
+        "open_until": open_until,
+        "retry_in": max(0, int(open_until - time.time())) if status == OPEN else 0
+    }
+
+
+def allow_request(family):
+    """Return (allowed, retry_in). Closed always passes; half-open lets one probe through.
+
+    Fails open: a breaker that cannot be read never blocks a Paystack call.
+    """
+    try:
+        return check_request(family)
+    except Exception as e:
+        frappe.logger().warning(f"Paystack circuit for {family} unavailable, allowing request: {str(e)}")
+        return True, 0
+
+
+def check_request(family):
+    state = get_state(family)
+    if state["state"] == CLOSED:
+        return True, 0
+    if state["state"] == OPEN:
+        return False, state["retry_in"]
+
+    probe = frappe.cache().set(get_key(PROBE_KEY, family), 1, nx=True, ex=PROBE_TIMEOUT)
+    return bool(probe), 0 if probe else PROBE_TIMEOUT
+
+
+def get_all_keys(family):
+    return [get_key(FAILURES_KEY, family), get_key(OPEN_UNTIL_KEY, family), get_key(PROBE_KEY, family)]
+
+
+def record_success(family):
+    # DEL on missing keys is a no-op, so the common healthy path is one round trip
+    try:
+        frappe.cache().delete(*get_all_keys(family))
+    except Exception as e:
+        frappe.logger().warning(f"Could not record Paystack {family} success: {str(e)}")
+
+
+def record_failure(family, retry_after=None):
+    """Count a failure; open the circuit at the threshold or immediately when Paystack says so"""
+    try:
+        count_failure(family, retry_after)
+    except Exception as e:
+        frappe.logger().warning(f"Could not record Paystack {family} failure: {str(e)}")
+
+
+def count_failure(family, retry_after=None):
+    cache = frappe.cache()
+    failures_key = get_key(FAILURES_KEY, family)
+
+    was_probing = get_state(family)["state"] == HALF_OPEN
+    failures = cache.incr(failures_key)
+    cache.expire(failures_key, MAX_OPEN_SECONDS * 4)
+
+    if retry_after or was_probing or failures >= FAILURE_THRESHOLD:
+        open_for = min(MAX_OPEN_SECONDS, flt(retry_after) or OPEN_SECONDS)
+        cache.set(get_key(OPEN_UNTIL_KEY, family), time.time() + open_for, ex=MAX_OPEN_SECONDS * 4)
+        cache.delete(get_key(PROBE_KEY, family))
+        frappe.logger().warning(f"Paystack circuit for {family} opened for {open_for}s after {failures} failures")
+
+
+def get_retry_after(headers):
+    """Seconds to back off from Retry-After or exhausted rate-limit headers, or None"""
+    headers = {k.lower(): v for k, v in (headers or {}).items()}
+
+    retry_after = headers.get("retry-after")
+    if retry_after and str(retry_after).isdigit():
+        return int(retry_after)
+
+    if headers.get("x-ratelimit-remaining") == "0" and str(headers.get("x-ratelimit-reset", "")).isdigit():
+        reset = int(headers["x-ratelimit-reset"])
+        # Either an epoch timestamp or seconds until reset
+        return max(1, reset - int(time.time())) if reset > 10 ** 9 else reset
+
+    return None
+
+
+def get_all_states():
+    return [get_state(family) for family in ENDPOINT_FAMILIES]
+
+
+def describe_states():
+    """One line per family, for the Paystack Settings form"""
+    lines = []
+    for state in get_all_states():
+        line = f"{state['family']}: {state['state']}"
+        if state["state"] == OPEN:
+            line += f" (retry in {state['retry_in']}s)"
+        elif state["failures"]:
+            line += f" ({state['failures']} recent failures)"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def reset(family=None):
+    for name in [family] if family else ENDPOINT_FAMILIES:
+        frappe.cache().delete(*get_all_keys(name))
@@ -0,0 +1,311 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Pooled HTTP client for the Paystack API
+"""
+
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from concurrent.futures import ThreadPoolExecutor
+
+import frappe
+import requests
+from paystack_terminal import circuit_breaker, metrics
+from paystack_terminal.settings import get_settings
+from requests.adapters import HTTPAdapter
+
+PAYSTACK_BASE_URL = "https://api.paystack.co"
+
+# (connect, read) timeouts in seconds, per endpoint family
+TIMEOUTS = {
+    "terminal": (3.05, 10),
+    "paymentrequest": (3.05, 15),
+    "customer": (3.05, 10),
+    "transaction": (3.05, 20),
+    "settlement": (3.05, 20),
+}
+DEFAULT_TIMEOUT = (3.05, 15)
+
+# Retries only apply to idempotent GETs
+MAX_RETRIES = 2
+BACKOFF_BASE = 0.25
+BACKOFF_CAP = 2.0
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+TRANSACTION_PAGE_SIZE = 100
+
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 10
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+class PaystackAPIError(Exception):
+    """Raised when a Paystack API call fails or returns an unsuccessful response"""
+
+    def __init__(self, message, status_code=None, response=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = response
+
+
+class CircuitOpenError(PaystackAPIError):
+    """Raised without calling Paystack while the endpoint family's circuit is open"""
+
+    def __init__(self, family, retry_in=0):
+        super().__init__(f"Paystack {family} API is unavailable, retry in {retry_in}s")
+        self.family = family
+        self.retry_in = retry_in
+
+
+@dataclass
+class PaystackResponse:
+    """Parsed Paystack API response envelope"""
+
+    status_code: int
+    status: bool
+    message: str = ""
+    data: Any = field(default_factory=dict)
+    meta: dict = field(default_factory=dict)
+    headers: dict = field(default_factory=dict)
+
+    @property
+    def ok(self):
+        return 200 <= self.status_code < 300 and self.status
+
+    @classmethod
+    def from_http(cls, response):
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+
+        if not isinstance(body, dict):
+            body = {}
+
+        return cls(
+            status_code=response.status_code,
+            status=bool(body.get("status")),
+            message=body.get("message") or "",
+            data=body.get("data") if body.get("data") is not None else {},
+            meta=body.get("meta") or {},
+            headers=dict(response.headers),
+        )
+
+
+def get_session():
+    """Return the pooled keep-alive session for this worker process"""
+    global _session, _session_pid
+
+    # Sessions must not be shared across a fork, so key them by pid
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+
+    with _session_lock:
+        if _session is None or _session_pid != pid:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=POOL_CONNECTIONS,
+                pool_maxsize=POOL_MAXSIZE,
+                max_retries=0,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+            _session_pid = pid
+
+    return _session
+
+
+def init_worker_thread(site, sites_path):
+    """Give a pool thread the site context that the breaker, metrics and logger read"""
+    frappe.init(site=site, sites_path=sites_path)
+
+
+def get_thread_pool(concurrency):
+    """Thread pool for concurrent Paystack calls; its threads do HTTP only, never database work"""
+    return ThreadPoolExecutor(
+        max_workers=max(1, concurrency),
+        initializer=init_worker_thread,
+        initargs=(frappe.local.site, frappe.local.sites_path)
+    )
+
+
+def get_timeout(path):
+    """Resolve the (connect, read) timeout for an API path"""
+    return TIMEOUTS.get(get_endpoint_family(path), DEFAULT_TIMEOUT)
+
+
+def get_endpoint_family(path):
+    """Return the first path segment, e.g. 'terminal' for /terminal/x/presence"""
+    return path.strip("/").split("/", 1)[0]
+
+
+def get_endpoint_name(path):
+    """Path with ids replaced, e.g. terminal/:id/presence, for metric labels"""
+    return "/".join(
+        part if part.isalpha() and part.islower() else ":id"
+        for part in path.strip("/").split("/")
+    )
+
+
+def backoff_delay(attempt):
+    """Full-jitter exponential backoff"""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+class PaystackClient:
+    """Thin wrapper around the shared session that speaks the Paystack API"""
+
+    def __init__(self, secret_key=None, base_url=None, headers=None):
+        self.base_url = (base_url or PAYSTACK_BASE_URL).rstrip("/")
+        self.headers = headers or {
+            "Authorization": f"Bearer {secret_key}",
+            "Content-Type": "application/json",
+        }
+
+    def request(self, method, path, params=None, json=None, retries: Optional[int] = None, idempotency_key=None):
+        """Send a request and return the parsed response, raising PaystackAPIError on failure"""
+        method = method.upper()
+        if retries is None:
+            # Paystack does not document deduplicating writes, and a timed-out POST may have
+            # succeeded. Writes are retried by the outbox, which re-checks the invoice or customer first
+            retries = MAX_RETRIES if method == "GET" else 0
+
+        headers = self.headers
+        if idempotency_key:
+            headers = dict(headers, **{"Idempotency-Key": idempotency_key})
+
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        family = get_endpoint_family(path)
+        timeout = get_timeout(path)
+        session = get_session()
+
+        allowed, retry_in = circuit_breaker.allow_request(family)
+        if not allowed:
+            raise CircuitOpenError(family, retry_in)
+
+        endpoint = get_endpoint_name(path)
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                http_response = session.request(
+                    method,
+                    url,
+                    headers=headers,
+                    params=params,
+                    json=json,
+                    timeout=timeout,
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                metrics.observe(
+                    "paystack_api_request_duration_seconds",
+                    time.monotonic() - started,
+                    endpoint=endpoint,
+                    method=method,
+                    status="timeout" if isinstance(e, requests.Timeout) else "error"
+                )
+                if attempt < retries:
+                    time.sleep(backoff_delay(attempt))
+                    attempt += 1
+                    continue
+                circuit_breaker.record_failure(family)
+                raise PaystackAPIError(f"{method} {path} failed: {str(e)}") from e
+
+            metrics.observe(
+                "paystack_api_request_duration_seconds",
+                time.monotonic() - started,
+                endpoint=endpoint,
+                method=method,
+                status=http_response.status_code
+            )
+
+            if http_response.status_code in RETRY_STATUS_CODES:
+                retry_after = circuit_breaker.get_retry_after(http_response.headers)
+                # Honour Retry-After inline only when it is short; otherwise fail fast
+                if attempt < retries and (retry_after is None or retry_after <= BACKOFF_CAP):
+                    time.sleep(retry_after if retry_after is not None else backoff_delay(attempt))
+                    attempt += 1
+                    continue
+                circuit_breaker.record_failure(family, retry_after)
+            else:
+                circuit_breaker.record_success(family)
+
+            response = PaystackResponse.from_http(http_response)
+            if not response.ok:
+                raise PaystackAPIError(
+                    f"{method} {path} returned {response.status_code}: {response.message or http_response.text}",
+                    status_code=response.status_code,
+                    response=response,
+                )
+
+            return response
+
+    def get(self, path, params=None, **kwargs):
+        return self.request("GET", path, params=params, **kwargs)
+
+    def post(self, path, json=None, **kwargs):
+        return self.request("POST", path, json=json, **kwargs)
+
+    def get_terminal_presence(self, terminal_id):
+        return self.get(f"/terminal/{terminal_id}/presence").data
+
+    def send_terminal_event(self, terminal_id, event, idempotency_key=None):
+        return self.post(f"/terminal/{terminal_id}/event", json=event, idempotency_key=idempotency_key).data
+
+    def create_customer(self, customer_data, idempotency_key=None):
+        return self.post("/customer", json=customer_data, idempotency_key=idempotency_key).data
+
+    def create_payment_request(self, payment_data):
+        return self.post("/paymentrequest", json=payment_data).data
+
+    def archive_payment_request(self, request_id):
+        return self.post(f"/paymentrequest/archive/{request_id}").data
+
+    def verify_transaction(self, reference):
+        return self.get(f"/transaction/verify/{reference}").data
+
+    def list_transactions(self, **params):
+        return self.get("/transaction", params=params)
+
+    def iter_pages(self, path, per_page=TRANSACTION_PAGE_SIZE, **params):
+        """Yield every item of a paginated list endpoint, one page at a time"""
+        page = 1
+        while True:
+            response = self.get(path, params=dict(params, perPage=per_page, page=page))
+            items = response.data or []
+            yield from items
+
+            page_count = response.meta.get("pageCount")
+            if not items or (page_count is not None and page >= int(page_count)):
+                break
+            page += 1
+
+    def iter_transactions(self, per_page=TRANSACTION_PAGE_SIZE, **params):
+        """Yield every transaction matching params, one page at a time"""
+        return self.iter_pages("/transaction", per_page, **params)
+
+    def iter_settlements(self, per_page=TRANSACTION_PAGE_SIZE, **params):
+        """Yield every payout matching params, one page at a time"""
+        return self.iter_pages("/settlement", per_page, **params)
+
+    def iter_settlement_transactions(self, settlement_id, per_page=TRANSACTION_PAGE_SIZE, **params):
+        """Yield the transactions paid out in one settlement, one page at a time"""
+        return self.iter_pages(f"/settlement/{settlement_id}/transactions", per_page, **params)
+
+
+def get_client(settings=None):
+    """Return a PaystackClient configured from the cached Paystack Settings"""
+    if settings is None:
+        settings = get_settings()
+
+    return PaystackClient(base_url=settings.get("base_url"), headers=settings.auth_headers)
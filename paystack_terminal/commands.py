@@ -0,0 +1,266 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Bench commands for the Paystack Terminal integration
+"""
+
+import click
+import frappe
+from frappe.commands import get_site, pass_context
+
+
+@click.command("paystack-reconcile")
+@click.option("--since", help="Re-run from this Paystack timestamp (ISO-8601) instead of the saved checkpoint")
+@click.option("--after-id", default=0, type=int, help="Skip transactions at --since with an id up to this one")
+@click.option("--save-checkpoint/--no-save-checkpoint", default=False,
+    help="Persist the resulting checkpoint (always on when --since is not given)")
+@pass_context
+def paystack_reconcile(context, since=None, after_id=0, save_checkpoint=False):
+    """Run incremental Paystack reconciliation, optionally from a chosen checkpoint"""
+    from paystack_terminal.reconciliation import get_lock, reconcile_incremental
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        # Same lock as the scheduled run, so the two never post or move the checkpoint together
+        lock = get_lock()
+        if not lock.acquire(blocking=False):
+            click.echo("Paystack reconciliation is already running, try again shortly", err=True)
+            raise SystemExit(1)
+
+        try:
+            cursor = (since, after_id) if since else None
+            summary = reconcile_incremental(cursor=cursor, persist=save_checkpoint or not since)
+            frappe.db.commit()
+        finally:
+            lock.release()
+        click.echo(f"Fetched {summary['fetched']} transactions ({summary['rechecked']} rechecked before the checkpoint), "
+            f"matched {summary['matched']} invoices")
+        click.echo(f"Reconciled {summary['reconciled']}, failed {summary['failed']}")
+        click.echo(f"Checkpoint: {summary['cursor'][0]} (id {summary['cursor'][1]})")
+    finally:
+        frappe.destroy()
+
+
+@click.command("paystack-sync-customers")
+@click.option("--batch-size", default=100, type=int, help="Customers per batch")
+@click.option("--concurrency", default=4, type=int, help="Parallel Paystack calls per batch")
+@click.option("--rate", default=8.0, type=float, help="Maximum Paystack calls per second")
+@click.option("--restart", is_flag=True, default=False, help="Ignore the saved checkpoint and start over")
+@click.option("--background", is_flag=True, default=False, help="Run as a background job instead")
+@pass_context
+def paystack_sync_customers(context, batch_size=100, concurrency=4, rate=8.0, restart=False, background=False):
+    """Create missing Paystack customers for Customers and linked Patients"""
+    from paystack_terminal.customer_sync import sync_customers
+    from paystack_terminal.queues import BACKGROUND, enqueue
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        if background:
+            enqueue(
+                "paystack_terminal.customer_sync.sync_customers",
+                lane=BACKGROUND,
+                timeout=4 * 60 * 60,
+                job_id="paystack_customer_sync",
+                deduplicate=True,
+                batch_size=batch_size,
+                concurrency=concurrency,
+                rate=rate,
+                restart=restart
+            )
+            frappe.db.commit()
+            click.echo("Customer sync queued")
+            return
+
+        progress = sync_customers(batch_size=batch_size, concurrency=concurrency, rate=rate, restart=restart)
+        click.echo(f"{progress['status']}: synced {progress['synced']}, failed {progress['failed']} "
+            f"of {progress['total']} customers")
+    finally:
+        frappe.destroy()
+
+
+@click.command("paystack-replay-events")
+@click.argument("names", nargs=-1)
+@click.option("--status", type=click.Choice(["Pending", "Processed", "Failed", "Dead"]), help="Replay events in this status")
+@click.option("--since", help="Replay events received at or after this datetime")
+@click.option("--reference", help="Replay events for this Paystack reference")
+@click.option("--now", "run_now", is_flag=True, default=False, help="Process in this shell instead of the queue")
+@pass_context
+def paystack_replay_events(context, names=None, status=None, since=None, reference=None, run_now=False):
+    """Reset journalled Paystack events to Pending and process them again"""
+    from paystack_terminal.events import process_pending_events, replay_events
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        replayed = replay_events(names=list(names), status=status, since=since, reference=reference)
+        click.echo(f"Queued {len(replayed)} events for replay")
+        if run_now and replayed:
+            summary = process_pending_events()
+            click.echo(f"Processed {summary['processed']}, failed {summary['failed']}")
+    finally:
+        frappe.destroy()
+
+
+@click.command("paystack-rebuild-rollups")
+@click.option("--from-date", help="First day to rebuild (default: all history)")
+@click.option("--to-date", help="Last day to rebuild")
+@pass_context
+def paystack_rebuild_rollups(context, from_date=None, to_date=None):
+    """Recompute the daily Paystack sales rollup from Payment Entries and the ledger"""
+    from paystack_terminal.rollups import rebuild_rollups
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        buckets = rebuild_rollups(from_date=from_date, to_date=to_date)
+        frappe.db.commit()
+        click.echo(f"Rebuilt {buckets} rollup rows")
+    finally:
+        frappe.destroy()
+
+
+@click.command("paystack-import-transactions")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "file_format", type=click.Choice(["csv", "jsonl"]), help="Export format (default: from the extension)")
+@click.option("--dry-run", is_flag=True, default=False, help="Match and count rows without creating Payment Entries")
+@click.option("--batch-size", default=100, type=int, help="Rows per database transaction")
+@click.option("--amounts-in", type=click.Choice(["kobo", "naira"]),
+    help="Unit of the amount and fees columns (default: naira for CSV, kobo for JSON lines)")
+@click.option("--unmatched-output", type=click.Path(dir_okay=False), help="Write unmatched rows to this CSV file")
+@pass_context
+def paystack_import_transactions(context, path, file_format=None, dry_run=False, batch_size=100, amounts_in=None,
+        unmatched_output=None):
+    """Backfill Payment Entries from a Paystack transaction export"""
+    from paystack_terminal.transaction_import import import_transactions
+
+    def progress(summary):
+        click.echo(f"{summary['rows']} rows read, {summary['created']} Payment Entries created", err=True)
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        summary = import_transactions(
+            path,
+            file_format=file_format,
+            dry_run=dry_run,
+            batch_size=batch_size,
+            amounts_in_kobo=None if amounts_in is None else amounts_in == "kobo",
+            unmatched_path=unmatched_output,
+            progress=progress
+        )
+    finally:
+        frappe.destroy()
+
+    click.echo(f"{'Dry run: ' if dry_run else ''}{summary['rows']} rows, {summary['skipped']} not successful, "
+        f"{summary['invalid']} invalid")
+    click.echo(f"Matched {summary['matched']}, unmatched {summary['unmatched']}, duplicate {summary['duplicate']}")
+    click.echo(f"Created {summary['created']} Payment Entries, failed {summary['failed']}")
+
+
+@click.command("paystack-sync-settlements")
+@click.option("--since", help="Payouts from this date (default: the last 7 days)")
+@click.option("--until", help="Payouts up to this date")
+@click.option("--post-fees/--no-post-fees", default=None,
+    help="Post fee Journal Entries (default: the Paystack Settings choice)")
+@pass_context
+def paystack_sync_settlements(context, since=None, until=None, post_fees=None):
+    """Match Paystack payouts to Payment Entries and record their fees"""
+    from paystack_terminal.settlements import sync_settlements
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        summary = sync_settlements(since=since, until=until, post_fees=post_fees)
+        click.echo(f"Synced {summary['settlements']} settlements ({summary['skipped']} already complete)")
+        click.echo(f"Transactions {summary['transactions']}: matched {summary['matched']}, "
+            f"unmatched {summary['unmatched']}")
+        click.echo(f"Posted {summary['journal_entries']} fee Journal Entries")
+    finally:
+        frappe.destroy()
+
+
+@click.command("paystack-mock-server")
+@click.option("--port", default=8090, type=int, help="Port to listen on")
+@click.option("--latency", default=0, type=float, help="Mean added latency per call, in ms")
+@click.option("--jitter", default=0, type=float, help="Latency varies by up to this many ms")
+@click.option("--error-rate", default=0.0, type=float, help="Fraction of calls answered with HTTP 500")
+@click.option("--throttle-rate", default=0.0, type=float, help="Fraction of calls answered with HTTP 429")
+@click.option("--webhook-url", help="Where to send signed charge.success webhooks")
+@click.option("--secret-key", help="Secret key used to sign webhooks")
+@click.option("--pay-after", type=float, help="Pay pushed requests after this many seconds")
+def paystack_mock_server(port=8090, latency=0, jitter=0, error_rate=0.0, throttle_rate=0.0,
+        webhook_url=None, secret_key=None, pay_after=None):
+    """Serve a local mock of the Paystack API"""
+    from paystack_terminal.mock_server import main
+
+    args = ["--port", str(port), "--latency", str(latency), "--jitter", str(jitter),
+        "--error-rate", str(error_rate), "--throttle-rate", str(throttle_rate)]
+    for option, value in (("--webhook-url", webhook_url), ("--secret-key", secret_key), ("--pay-after", pay_after)):
+        if value is not None:
+            args += [option, str(value)]
+    main(args)
+
+
+@click.command("paystack-benchmark")
+@click.option("--invoices", default=20, type=int, help="Unpaid invoices to check out and reconcile")
+@click.option("--webhooks", default=200, type=int, help="Webhooks to ingest")
+@click.option("--only", multiple=True, type=click.Choice(["checkout", "webhooks", "reconciliation"]),
+    help="Run only these benchmarks")
+@click.option("--mock-url", help="Use a running mock server instead of starting one")
+@click.option("--latency", default=0, type=float, help="Latency of the in-process mock server, in ms")
+@click.option("--output", type=click.Path(), help="Write results as JSON to this file")
+@click.option("--baseline", type=click.Path(exists=True), help="Fail if results regress against this JSON file")
+@click.option("--tolerance", default=20, type=float, help="Allowed regression against the baseline, in percent")
+@pass_context
+def paystack_benchmark(context, invoices=20, webhooks=200, only=None, mock_url=None, latency=0,
+        output=None, baseline=None, tolerance=20):
+    """Benchmark checkout, webhook ingestion and reconciliation against a mock Paystack server"""
+    import json
+
+    from paystack_terminal.benchmark import compare_to_baseline, run_benchmarks
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        results = run_benchmarks(invoices=invoices, webhooks=webhooks, mock_url=mock_url, latency=latency,
+            only=list(only) or None)
+    finally:
+        frappe.destroy()
+
+    for result in results:
+        click.echo(f"{result['name']}: {result['count']} ok, {result['failed']} failed in {result['wall_time_s']}s | "
+            f"{result['throughput_per_s']}/s | p50 {result['p50_ms']}ms p95 {result['p95_ms']}ms "
+            f"p99 {result['p99_ms']}ms max {result['max_ms']}ms")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=1)
+
+    if baseline:
+        with open(baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), tolerance)
+        for regression in regressions:
+            click.echo(f"Regression: {regression}", err=True)
+        if regressions:
+            raise SystemExit(1)
+
+
+commands = [
+    paystack_reconcile,
+    paystack_sync_customers,
+    paystack_replay_events,
+    paystack_rebuild_rollups,
+    paystack_import_transactions,
+    paystack_sync_settlements,
+    paystack_mock_server,
+    paystack_benchmark
+]
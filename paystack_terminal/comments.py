@@ -0,0 +1,60 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Timeline comments queued during a transaction and inserted in bulk once it commits
+"""
+
+from functools import partial
+
+import frappe
+from frappe.utils import now_datetime
+from paystack_terminal import savepoints
+from paystack_terminal.queues import BACKGROUND, enqueue
+
+QUEUE_FLAG = "paystack_queued_comments"
+
+
+def queue_comment(reference_doctype, reference_name, content):
+    """Add an Info comment to a document's timeline after the current transaction commits"""
+    comment = {
+        "reference_doctype": reference_doctype,
+        "reference_name": reference_name,
+        "content": content,
+        "owner": frappe.session.user
+    }
+    # Staged only on commit, so a comment made in a rolled back savepoint is never inserted
+    savepoints.after_commit(partial(stage_comment, comment))
+
+
+def stage_comment(comment):
+    queued = frappe.local.flags.get(QUEUE_FLAG)
+    if queued is None:
+        queued = frappe.local.flags[QUEUE_FLAG] = []
+        # Added while the after_commit callbacks run, so it runs after every staged comment
+        frappe.db.after_commit.add(enqueue_comments)
+    queued.append(comment)
+
+
+def enqueue_comments():
+    comments = frappe.local.flags.pop(QUEUE_FLAG, None)
+    if comments:
+        enqueue("paystack_terminal.comments.insert_comments", lane=BACKGROUND, comments=comments)
+
+
+def insert_comments(comments):
+    """Background job: one multi-row insert for every comment of a committed transaction"""
+    now = now_datetime()
+    frappe.db.bulk_insert(
+        "Comment",
+        fields=[
+            "name", "creation", "modified", "owner", "modified_by", "comment_type", "comment_email",
+            "reference_doctype", "reference_name", "content"
+        ],
+        values=[
+            (
+                frappe.generate_hash(length=10), now, now, comment["owner"], comment["owner"], "Info", comment["owner"],
+                comment["reference_doctype"], comment["reference_name"], comment["content"]
+            )
+            for comment in comments
+        ]
+    )
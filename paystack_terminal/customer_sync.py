@@ -0,0 +1,169 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Bulk, resumable sync of Customers (and linked Patients) to Paystack
+"""
+
+import threading
+import time
+
+import frappe
+from frappe.utils import now_datetime
+from paystack_terminal.checkout import get_customer_data
+from paystack_terminal.client import PaystackAPIError, get_client, get_thread_pool
+from paystack_terminal.queues import BACKGROUND, enqueue
+
+PROGRESS_KEY = "paystack_terminal:customer_sync"
+PROGRESS_EVENT = "paystack_customer_sync"
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_CONCURRENCY = 4
+# Requests per second across all worker threads
+DEFAULT_RATE = 8
+
+
+class RateLimiter:
+    """Spaces out request starts so all threads together stay under a rate"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_at = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start_at = max(now, self.next_at)
+            self.next_at = start_at + self.interval
+        if start_at > now:
+            time.sleep(start_at - now)
+
+
+def get_progress():
+    return frappe.cache().get_value(PROGRESS_KEY) or {}
+
+
+def save_progress(progress):
+    frappe.cache().set_value(PROGRESS_KEY, progress)
+    frappe.publish_realtime(PROGRESS_EVENT, progress, user=progress.get("user"))
+
+
+def get_unsynced_customers(after, limit):
+    """Next batch of Customers without a Paystack code, in name order"""
+    filters = [["paystack_customer_code", "is", "not set"], ["disabled", "=", 0]]
+    if after:
+        filters.append(["name", ">", after])
+
+    return frappe.get_all(
+        "Customer",
+        filters=filters,
+        fields=["name", "customer_name", "email_id", "mobile_no"],
+        order_by="name asc",
+        limit_page_length=limit
+    )
+
+
+def get_patients_by_customer(customer_names):
+    """Linked Patient per Customer, when the Healthcare module is installed"""
+    if not customer_names or not frappe.db.exists("DocType", "Patient"):
+        return {}
+
+    patients = frappe.get_all(
+        "Patient",
+        filters={"customer": ["in", customer_names]},
+        fields=["name", "customer", "first_name", "last_name", "email", "mobile"]
+    )
+    return {patient.customer: patient for patient in patients}
+
+
+def count_unsynced_customers():
+    return frappe.db.count("Customer", {"paystack_customer_code": ["is", "not set"], "disabled": 0})
+
+
+def sync_batch(client, customers, patients, limiter, concurrency):
+    """Create or look up a batch of customers concurrently; returns {customer: code}"""
+
+    def sync(customer):
+        limiter.wait()
+        try:
+            # Paystack returns the existing customer when the email is already known
+            result = client.create_customer(get_customer_data(customer, patients.get(customer.name)))
+            return customer.name, result.get("customer_code")
+        except PaystackAPIError as e:
+            frappe.logger().error(f"Customer sync failed for {customer.name}: {str(e)}")
+            return customer.name, None
+
+    # Worker threads only do HTTP; the DB writes happen on the calling thread
+    with get_thread_pool(concurrency) as executor:
+        return dict(executor.map(sync, customers))
+
+
+def sync_customers(batch_size=DEFAULT_BATCH_SIZE, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE,
+        restart=False, limit=None):
+    """Sync Customers without a Paystack code, resuming from the saved checkpoint"""
+    progress = {} if restart else get_progress()
+    if not progress or progress.get("status") == "Completed":
+        progress = {
+            "status": "Running",
+            "started_at": str(now_datetime()),
+            "after": None,
+            "synced": 0,
+            "failed": 0,
+            "total": count_unsynced_customers(),
+            "user": frappe.session.user
+        }
+    progress["status"] = "Running"
+    save_progress(progress)
+
+    client = get_client()
+    limiter = RateLimiter(rate)
+    processed = 0
+
+    while True:
+        customers = get_unsynced_customers(progress["after"], batch_size)
+        if not customers:
+            progress["status"] = "Completed"
+            break
+
+        patients = get_patients_by_customer([c.name for c in customers])
+        codes = sync_batch(client, customers, patients, limiter, concurrency)
+
+        updates = {name: {"paystack_customer_code": code} for name, code in codes.items() if code}
+        if updates:
+            frappe.db.bulk_update("Customer", updates, update_modified=False)
+
+        progress["after"] = customers[-1].name
+        progress["synced"] += len(updates)
+        progress["failed"] += len(codes) - len(updates)
+        frappe.db.commit()
+        save_progress(progress)
+
+        processed += len(customers)
+        if limit and processed >= limit:
+            progress["status"] = "Paused"
+            break
+
+    save_progress(progress)
+    return progress
+
+
+@frappe.whitelist()
+def enqueue_customer_sync(restart=False):
+    """Start (or resume) the customer sync as a long background job"""
+    frappe.only_for("System Manager")
+
+    enqueue(
+        "paystack_terminal.customer_sync.sync_customers",
+        lane=BACKGROUND,
+        timeout=4 * 60 * 60,
+        job_id="paystack_customer_sync",
+        deduplicate=True,
+        restart=frappe.parse_json(restart)
+    )
+    return get_progress()
+
+
+@frappe.whitelist()
+def get_customer_sync_progress():
+    frappe.only_for("System Manager")
+    return get_progress()
@@ -0,0 +1,134 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Pick a Paystack POS terminal for a checkout
+"""
+
+import time
+
+import frappe
+from frappe import _
+from paystack_terminal.settings import get_settings
+from paystack_terminal.terminal_status import describe_status, get_cached_status, is_stale, is_terminal_available
+
+TERMINALS_CACHE_KEY = "paystack_terminal:terminals"
+IN_FLIGHT_KEY = "paystack_terminal:in_flight:{0}"
+
+# A push with no charge after this long no longer counts against the terminal
+IN_FLIGHT_WINDOW = 5 * 60
+
+
+def get_registered_terminals():
+    """Enabled registry entries with their preferred users, cached in Redis"""
+
+    def load():
+        terminals = frappe.get_all(
+            "Paystack POS Terminal",
+            filters={"enabled": 1},
+            fields=["terminal_id", "terminal_name", "company", "location"],
+            order_by="terminal_id asc"
+        )
+        users = {}
+        for row in frappe.get_all(
+            "Paystack Terminal User",
+            filters={"parenttype": "Paystack POS Terminal"},
+            fields=["parent", "user"]
+        ):
+            users.setdefault(row.parent, []).append(row.user)
+
+        for terminal in terminals:
+            terminal["users"] = users.get(terminal.terminal_id, [])
+        return terminals
+
+    return frappe.cache().get_value(TERMINALS_CACHE_KEY, generator=load)
+
+
+def clear_terminal_cache():
+    frappe.cache().delete_value(TERMINALS_CACHE_KEY)
+
+
+def get_all_terminal_ids(settings=None):
+    """Every terminal we know about: the registry plus the default in Paystack Settings"""
+    if settings is None:
+        settings = get_settings()
+
+    terminal_ids = [t["terminal_id"] for t in get_registered_terminals()]
+    if settings.terminal_id and settings.terminal_id not in terminal_ids:
+        terminal_ids.append(settings.terminal_id)
+    return terminal_ids
+
+
+def get_in_flight_key(terminal_id):
+    return frappe.cache().make_key(IN_FLIGHT_KEY.format(terminal_id))
+
+
+def mark_in_flight(terminal_id, reference):
+    """Record a pushed payment request against a terminal"""
+    key = get_in_flight_key(terminal_id)
+    frappe.cache().zadd(key, {reference: time.time()})
+    frappe.cache().expire(key, IN_FLIGHT_WINDOW * 2)
+
+
+def clear_in_flight(terminal_id, reference):
+    frappe.cache().zrem(get_in_flight_key(terminal_id), reference)
+
+
+def get_in_flight(terminal_id):
+    """Pushed requests that have not been charged within the window"""
+    return frappe.cache().zcount(get_in_flight_key(terminal_id), time.time() - IN_FLIGHT_WINDOW, "+inf")
+
+
+def get_load(terminal):
+    """Sort key: known-available terminals first, then by in-flight requests"""
+    status = get_cached_status(terminal["terminal_id"])
+    looks_available = bool(status and not is_stale(status) and status["online"] and status["available"])
+    return (0 if looks_available else 1, get_in_flight(terminal["terminal_id"]))
+
+
+def select_terminal(company=None, user=None, counter=None, client=None, settings=None):
+    """Return the terminal id to push to.
+
+    Preference order: a terminal at the caller's counter or assigned to the
+    user, then the least-busy available terminal for the company. Falls back
+    to the default terminal in Paystack Settings when none are registered.
+    """
+    if settings is None:
+        settings = get_settings()
+
+    terminals = [
+        t for t in get_registered_terminals()
+        if not company or not t["company"] or t["company"] == company
+    ]
+    if not terminals:
+        if settings.terminal_id and is_terminal_available(settings.terminal_id, client):
+            return settings.terminal_id
+        frappe.throw(_("Terminal is not available for payment processing"))
+
+    preferred = [
+        t for t in terminals
+        if (counter and t["location"] == counter) or (user and user in t["users"])
+    ]
+    others = sorted((t for t in terminals if t not in preferred), key=get_load)
+
+    for terminal in preferred + others:
+        if is_terminal_available(terminal["terminal_id"], client):
+            return terminal["terminal_id"]
+
+    frappe.throw(_("No Paystack terminal is available for payment processing"))
+
+
+@frappe.whitelist()
+def get_terminal_overview():
+    """Cached presence and in-flight requests for every known terminal"""
+    frappe.has_permission("Paystack POS Terminal", "read", throw=True)
+
+    overview = []
+    for terminal_id in get_all_terminal_ids():
+        status = get_cached_status(terminal_id)
+        overview.append({
+            "terminal_id": terminal_id,
+            "status": describe_status(status),
+            "checked_at": status["checked_at"] if status else None,
+            "in_flight": get_in_flight(terminal_id)
+        })
+    return overview
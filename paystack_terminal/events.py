@@ -0,0 +1,223 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Durable Paystack event journal and its micro-batch consumer
+"""
+
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import add_to_date, now_datetime
+from paystack_terminal import metrics
+from paystack_terminal.ledger import get_transactions
+from paystack_terminal.locks import extend_reference_locks
+from paystack_terminal.queues import PARTITIONS, enqueue, get_partition
+from paystack_terminal.savepoints import savepoint
+
+BATCH_SIZE = 100
+MAX_BATCHES_PER_RUN = 50
+MAX_ATTEMPTS = 8
+
+# Retry delay doubles per attempt: 1, 2, 4 ... minutes, capped at an hour
+BACKOFF_BASE_MINUTES = 1
+BACKOFF_CAP_MINUTES = 60
+
+LOCK_KEY = "paystack_terminal:event_consumer:{0}"
+LOCK_TIMEOUT = 10 * 60
+
+
+def journal_event(event, reference, payload):
+    """Append a verified webhook to the journal and make sure a consumer will run"""
+    now = now_datetime()
+    partition = get_partition(reference)
+    frappe.get_doc({
+        "doctype": "Paystack Event",
+        "event": event,
+        "reference": reference,
+        "partition": partition,
+        "status": "Pending",
+        "attempts": 0,
+        "received_at": now,
+        "next_attempt_at": now,
+        "payload": payload.decode() if isinstance(payload, bytes) else payload
+    }).insert(ignore_permissions=True)
+
+    enqueue_consumer(partition)
+
+
+def enqueue_consumer(partition):
+    """One consumer job per partition: events of a reference run in order, partitions in parallel"""
+    enqueue(
+        "paystack_terminal.events.process_pending_events",
+        job_id=f"paystack_event_consumer::{partition}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+        partition=partition
+    )
+
+
+def enqueue_due_consumers():
+    """Scheduled: wake the consumers of partitions with due events, e.g. retries after backoff"""
+    for partition in frappe.get_all(
+        "Paystack Event",
+        filters={"status": ["in", ["Pending", "Failed"]], "next_attempt_at": ["<=", now_datetime()]},
+        distinct=True,
+        pluck="partition"
+    ):
+        enqueue_consumer(partition)
+
+
+def get_backoff(attempts):
+    return min(BACKOFF_CAP_MINUTES, BACKOFF_BASE_MINUTES * (2 ** max(attempts - 1, 0)))
+
+
+def get_due_events(limit, partition):
+    return frappe.get_all(
+        "Paystack Event",
+        filters={
+            "status": ["in", ["Pending", "Failed"]],
+            "next_attempt_at": ["<=", now_datetime()],
+            "partition": partition
+        },
+        fields=["name", "event", "reference", "payload", "attempts", "received_at", "next_attempt_at"],
+        order_by="creation asc",
+        limit_page_length=limit
+    )
+
+
+def get_batch_lookups(references):
+    """Shared lookups for a whole batch from the ledger: processed references and invoices by reference"""
+    if not references:
+        return set(), {}
+
+    rows = get_transactions(references)
+    existing = {reference for reference, row in rows.items() if row.payment_entry}
+    invoices = {reference: row.sales_invoice for reference, row in rows.items() if row.sales_invoice}
+    return existing, invoices
+
+
+def process_batch(events):
+    """Process one batch with shared lookups and a single commit"""
+    from paystack_terminal.api import process_charge
+
+    references = list({e.reference for e in events if e.reference})
+    existing, invoices = get_batch_lookups(references)
+    now = now_datetime()
+    updates = {}
+
+    for event in events:
+        metrics.observe("paystack_queue_wait_seconds", metrics.seconds_since(event.next_attempt_at), queue="events")
+        extend_reference_locks()
+
+        try:
+            with savepoint("paystack_event"):
+                payload = json.loads(event.payload or "{}")
+                if event.event == "charge.success":
+                    result = process_charge(payload.get("data") or {}, existing, invoices)
+                    if result and not result.get("duplicate"):
+                        metrics.observe(
+                            "paystack_webhook_to_payment_entry_seconds",
+                            metrics.seconds_since(event.received_at)
+                        )
+
+            updates[event.name] = {
+                "status": "Processed",
+                "attempts": event.attempts + 1,
+                "next_attempt_at": now,
+                "processed_at": now,
+                "error": None
+            }
+        except Exception as e:
+            attempts = event.attempts + 1
+            updates[event.name] = {
+                "status": "Dead" if attempts >= MAX_ATTEMPTS else "Failed",
+                "attempts": attempts,
+                "next_attempt_at": add_to_date(now, minutes=get_backoff(attempts)),
+                "processed_at": None,
+                "error": str(e)[:1000]
+            }
+            frappe.logger().error(f"Paystack event {event.name} ({event.reference}) failed: {str(e)}")
+
+    frappe.db.bulk_update("Paystack Event", updates, update_modified=False)
+    frappe.db.commit()
+    return updates
+
+
+def process_pending_events(partition=None, batch_size=BATCH_SIZE, max_batches=MAX_BATCHES_PER_RUN):
+    """Drain due events of one partition in micro-batches, or of every partition in turn"""
+    summary = {"processed": 0, "failed": 0}
+    for current in range(PARTITIONS) if partition is None else [partition]:
+        consume_partition(int(current), summary, batch_size, max_batches)
+
+    if summary["processed"] or summary["failed"]:
+        frappe.logger().info(f"Paystack event consumer: {summary}")
+    return summary
+
+
+def consume_partition(partition, summary, batch_size=BATCH_SIZE, max_batches=MAX_BATCHES_PER_RUN):
+    # An event committed after the last query found this job already started, so its
+    # deduplicated enqueue was skipped: look again once the lock is released
+    while drain_partition(partition, summary, batch_size, max_batches):
+        # End the read snapshot so events committed since are visible
+        frappe.db.commit()
+        if not get_due_events(1, partition):
+            break
+
+
+def drain_partition(partition, summary, batch_size=BATCH_SIZE, max_batches=MAX_BATCHES_PER_RUN):
+    """Process due events until none are left.
+
+    Returns False when another consumer holds the partition or max_batches ran
+    out; the minute cron picks up what is left.
+    """
+    # One consumer per partition at a time keeps its events in order
+    lock = frappe.cache().lock(frappe.cache().make_key(LOCK_KEY.format(partition)), timeout=LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        return False
+
+    try:
+        for _batch in range(max_batches):
+            events = get_due_events(batch_size, partition)
+            if not events:
+                return True
+
+            updates = process_batch(events)
+            for update in updates.values():
+                summary["processed" if update["status"] == "Processed" else "failed"] += 1
+
+            if len(events) < batch_size:
+                return True
+        return False
+    finally:
+        lock.release()
+
+
+def replay_events(names=None, status=None, since=None, reference=None):
+    """Reset matching events to Pending so the consumer runs them again"""
+    filters = {}
+    if names:
+        filters["name"] = ["in", names]
+    if status:
+        filters["status"] = status
+    if since:
+        filters["received_at"] = [">=", since]
+    if reference:
+        filters["reference"] = reference
+
+    if not filters:
+        frappe.throw(_("Refusing to replay every Paystack Event without a filter"))
+
+    to_replay = frappe.get_all("Paystack Event", filters=filters, pluck="name")
+    if to_replay:
+        now = now_datetime()
+        frappe.db.bulk_update(
+            "Paystack Event",
+            {name: {"status": "Pending", "attempts": 0, "next_attempt_at": now, "error": None} for name in to_replay},
+            update_modified=False
+        )
+        # Enqueued on commit, once the reset rows are visible to the consumers
+        enqueue_due_consumers()
+        frappe.db.commit()
+
+    return to_replay
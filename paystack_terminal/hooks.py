@@ -12,7 +12,17 @@ app_email = "dev@gemutanalytics.com"
 app_license = "MIT"
 
 # DocTypes to be registered
-doctype_list = ["Paystack Settings"]
+doctype_list = [
+    "Paystack Settings",
+    "Paystack Event",
+    "Paystack Outbox",
+    "Paystack Transaction",
+    "Paystack Transaction Invoice",
+    "Paystack Sales Rollup",
+    "Paystack Settlement",
+    "Paystack POS Terminal",
+    "Paystack Terminal User"
+]
 
 # Module configuration
 modules = {
@@ -30,10 +40,33 @@ app_include_js = [
     "/assets/paystack_terminal/js/paystack_terminal.js"
 ]
 
+# Installation
+# Fresh installs skip patches.txt, so the custom fields are created here too
+after_install = "paystack_terminal.install.after_install"
+
 # Doc Events
 doc_events = {
     "Payment Entry": {
-        "on_submit": "paystack_terminal.api.update_payment_status"
+        "on_submit": [
+            "paystack_terminal.api.update_payment_status",
+            "paystack_terminal.rollups.on_payment_entry_submit"
+        ],
+        "on_cancel": [
+            "paystack_terminal.ledger.on_payment_entry_cancel",
+            "paystack_terminal.rollups.on_payment_entry_cancel"
+        ]
+    },
+    "Sales Invoice": {
+        "on_submit": "paystack_terminal.prewarm.prewarm_on_submit",
+        "on_cancel": "paystack_terminal.prewarm.cleanup_on_cancel"
+    },
+    "Company": {
+        "on_update": "paystack_terminal.posting_context.clear_company_context",
+        "on_trash": "paystack_terminal.posting_context.clear_company_context"
+    },
+    "Mode of Payment": {
+        "on_update": "paystack_terminal.posting_context.clear_posting_context",
+        "on_trash": "paystack_terminal.posting_context.clear_posting_context"
     }
 }
 
@@ -46,7 +79,11 @@ fixtures = [
                 "Customer-paystack_customer_code",
                 "Payment Entry-paystack_reference",
                 "Sales Invoice-terminal_reference",
-                "Sales Invoice-paystack_status"
+                "Sales Invoice-paystack_status",
+                "Sales Invoice-paystack_request_id",
+                "Sales Invoice-paystack_offline_reference",
+                "Sales Invoice-paystack_prewarmed_amount",
+                "Sales Invoice-paystack_prewarmed_on"
             ]]
         ]
     },
@@ -71,6 +108,10 @@ doctype_js = {
     "Sales Invoice": "public/js/sales_invoice.js"
 }
 
+doctype_list_js = {
+    "Sales Invoice": "public/js/sales_invoice_list.js"
+}
+
 # Webhooks
 webhooks = [
     {
@@ -82,7 +123,21 @@ webhooks = [
 
 # Schedule Tasks for reconciliation
 scheduler_events = {
+    "cron": {
+        "* * * * *": [
+            "paystack_terminal.terminal_status.poll_terminal_status",
+            "paystack_terminal.events.enqueue_due_consumers",
+            "paystack_terminal.outbox.enqueue_due_workers"
+        ],
+        "*/5 * * * *": [
+            "paystack_terminal.queues.enqueue_incremental_reconciliation"
+        ]
+    },
+    "hourly": [
+        "paystack_terminal.prewarm.cleanup_stale_prewarms"
+    ],
     "daily": [
-        "paystack_terminal.api.reconcile_pending_payments"
+        "paystack_terminal.queues.enqueue_daily_reconciliation",
+        "paystack_terminal.queues.enqueue_settlement_sync"
     ]
 }
\ No newline at end of file
@@ -0,0 +1,45 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Custom fields and indexes for fresh installs, where patches.txt does not run
+"""
+
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
+
+
+def get_custom_fields():
+    """Every field the v1_0 patches add to ERPNext doctypes, in their final form"""
+    hidden = {"read_only": 1, "no_copy": 1, "print_hide": 1}
+
+    return {
+        "Sales Invoice": [
+            dict(hidden, fieldname="terminal_reference", label="Terminal Reference", fieldtype="Data",
+                insert_after="payment_schedule", search_index=1),
+            dict(hidden, fieldname="paystack_status", label="Paystack Status", fieldtype="Data",
+                insert_after="terminal_reference"),
+            dict(hidden, fieldname="paystack_request_id", label="Paystack Payment Request ID", fieldtype="Data",
+                insert_after="paystack_status"),
+            dict(hidden, fieldname="paystack_offline_reference", label="Prewarmed Offline Reference",
+                fieldtype="Data", insert_after="paystack_request_id"),
+            dict(hidden, fieldname="paystack_prewarmed_amount", label="Prewarmed Amount", fieldtype="Currency",
+                insert_after="paystack_offline_reference"),
+            dict(hidden, fieldname="paystack_prewarmed_on", label="Prewarmed On", fieldtype="Datetime",
+                insert_after="paystack_prewarmed_amount")
+        ],
+        "Customer": [
+            dict(hidden, fieldname="paystack_customer_code", label="Paystack Customer Code", fieldtype="Data",
+                insert_after="customer_details", search_index=1)
+        ],
+        "Payment Entry": [
+            # Unique: the backstop against posting one Paystack reference twice
+            dict(hidden, fieldname="paystack_reference", label="Paystack Reference", fieldtype="Data",
+                insert_after="reference_no", unique=1)
+        ]
+    }
+
+
+def after_install():
+    """Create what the patches create on upgraded sites; install marks every patch as already run"""
+    create_custom_fields(get_custom_fields())
+    frappe.db.add_index("Payment Entry", ["reference_no"])
@@ -0,0 +1,116 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Reads and writes for the Paystack Transaction ledger
+"""
+
+import frappe
+from frappe.utils import cint, flt
+from paystack_terminal.payment_status import set_payment_status
+from paystack_terminal.rollups import update_open_charges
+
+LEDGER_DOCTYPE = "Paystack Transaction"
+ALLOCATION_DOCTYPE = "Paystack Transaction Invoice"
+REFERENCE_CHUNK_SIZE = 500
+
+# Ledger columns that place an unpaid charge in the sales rollup
+ROLLUP_FIELDS = ["status", "company", "terminal_id", "cashier", "creation"]
+
+
+def to_kobo(amount):
+    return cint(round(flt(amount) * 100))
+
+
+def record_transaction(reference, **values):
+    """Insert or update the ledger row for a reference (its primary key)"""
+    if not reference:
+        return
+
+    values = {key: value for key, value in values.items() if value is not None}
+
+    previous = frappe.db.get_value(LEDGER_DOCTYPE, reference, ROLLUP_FIELDS, as_dict=True)
+    if previous:
+        if values:
+            frappe.db.set_value(LEDGER_DOCTYPE, reference, values, update_modified=True)
+            update_open_charges(previous, dict(previous, **values))
+        return
+
+    doc = frappe.get_doc(dict(values, doctype=LEDGER_DOCTYPE, reference=reference)).insert(
+        ignore_permissions=True,
+        ignore_if_duplicate=True
+    )
+    update_open_charges(None, doc.as_dict())
+
+
+def get_transaction(reference):
+    if not reference:
+        return None
+
+    return frappe.db.get_value(
+        LEDGER_DOCTYPE,
+        reference,
+        ["name", "status", "sales_invoice", "payment_entry", "payment_request_id", "terminal_id", "amount_kobo",
+            "fees_kobo", "company", "cashier", "creation"],
+        as_dict=True
+    )
+
+
+def set_allocations(reference, allocations):
+    """Record the invoices a consolidated reference pays, as [(invoice, amount)]"""
+    doc = frappe.get_doc(LEDGER_DOCTYPE, reference)
+    doc.set("invoices", [
+        {"sales_invoice": invoice, "allocated_amount": flt(amount)} for invoice, amount in allocations
+    ])
+    doc.save(ignore_permissions=True)
+
+
+def get_allocations(reference):
+    """Invoices paid by a consolidated reference; empty for a single-invoice charge"""
+    if not reference:
+        return []
+
+    return frappe.get_all(
+        ALLOCATION_DOCTYPE,
+        filters={"parent": reference, "parenttype": LEDGER_DOCTYPE},
+        fields=["sales_invoice", "allocated_amount"],
+        order_by="idx asc"
+    )
+
+
+def get_posted_payment_entry(reference):
+    """Payment Entry already posted for a reference, read with FOR UPDATE to bypass the snapshot"""
+    return frappe.db.get_value(LEDGER_DOCTYPE, reference, "payment_entry", for_update=True)
+
+
+def get_transactions(references, fields=None):
+    """Ledger rows for many references, as {reference: row}"""
+    fields = fields or ["name", "status", "sales_invoice", "payment_entry", "terminal_id", "amount_kobo"]
+    if "name" not in fields:
+        fields = ["name"] + list(fields)
+
+    references = list(references)
+    rows = {}
+    for i in range(0, len(references), REFERENCE_CHUNK_SIZE):
+        for row in frappe.get_all(
+            LEDGER_DOCTYPE,
+            filters={"name": ["in", references[i:i + REFERENCE_CHUNK_SIZE]]},
+            fields=fields
+        ):
+            rows[row.name] = row
+    return rows
+
+
+def on_payment_entry_cancel(doc, method):
+    """Payment Entry on_cancel: the reference is open again"""
+    if doc.mode_of_payment != "Paystack Terminal" or not doc.reference_no:
+        return
+
+    # Free the unique paystack_reference so the reference can be posted again
+    if doc.get("paystack_reference"):
+        frappe.db.set_value("Payment Entry", doc.name, "paystack_reference", None, update_modified=False)
+
+    transaction = get_transaction(doc.reference_no)
+    if transaction and transaction.payment_entry == doc.name:
+        frappe.db.set_value(LEDGER_DOCTYPE, doc.reference_no, {"payment_entry": None, "status": "Pending"})
+        update_open_charges(transaction, dict(transaction, status="Pending"))
+        set_payment_status(doc.reference_no, "Pending", payment_entry=None)
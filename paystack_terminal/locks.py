@@ -0,0 +1,68 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Redis-backed per-reference locks for Payment Entry creation
+"""
+
+import frappe
+from frappe import _
+from redis.exceptions import LockError
+
+LOCK_KEY = "paystack_terminal:lock:{0}"
+HELD_FLAG = "paystack_held_reference_locks"
+
+# Lease: the lock expires on its own if the worker holding it dies. Batch
+# transactions can outlast it, so their loops renew it with extend_reference_locks
+LOCK_LEASE = 60
+# How long another worker waits for the lock before giving up
+LOCK_WAIT = 10
+
+
+class ReferenceLockTimeout(frappe.ValidationError):
+    pass
+
+
+def acquire_reference_lock(reference, lease=LOCK_LEASE, wait=LOCK_WAIT):
+    """Lock a Paystack reference until the current transaction commits or rolls back.
+
+    Releasing only after commit means the next holder is guaranteed to see
+    the Payment Entry this transaction created.
+    """
+    lock = frappe.cache().lock(
+        frappe.cache().make_key(LOCK_KEY.format(reference)),
+        timeout=lease,
+        blocking_timeout=wait
+    )
+    if not lock.acquire():
+        raise ReferenceLockTimeout(_("Paystack reference {0} is being processed by another worker").format(reference))
+
+    held = frappe.local.flags.get(HELD_FLAG)
+    if held is None:
+        held = frappe.local.flags[HELD_FLAG] = []
+    held.append(lock)
+
+    def release():
+        if lock in held:
+            held.remove(lock)
+        try:
+            lock.release()
+        except LockError:
+            # Lease already expired
+            pass
+
+    frappe.db.after_commit.add(release)
+    frappe.db.after_rollback.add(release)
+    return lock
+
+
+def extend_reference_locks():
+    """Restart the lease of every reference lock held until the current transaction ends.
+
+    Batch loops call this per item, so locks taken early in a long batch stay
+    held until its commit.
+    """
+    for lock in frappe.local.flags.get(HELD_FLAG) or []:
+        try:
+            lock.reacquire()
+        except LockError:
+            frappe.logger().warning(f"Paystack reference lock {lock.name} expired before its transaction ended")
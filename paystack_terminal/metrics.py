@@ -0,0 +1,204 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Redis-backed histograms and gauges for the Paystack hot paths, with a Prometheus export
+"""
+
+import time
+from contextlib import contextmanager
+
+import frappe
+from werkzeug.wrappers import Response
+
+METRICS_KEY = "paystack_terminal:metrics:{0}"
+
+# Upper bounds in seconds for latencies and lags, and in items for batch sizes
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+HISTOGRAM = "histogram"
+GAUGE = "gauge"
+
+# name: (type, help, buckets)
+METRICS = {
+    "paystack_api_request_duration_seconds": (HISTOGRAM, "Paystack API call latency", LATENCY_BUCKETS),
+    "paystack_checkout_duration_seconds": (HISTOGRAM, "Time to create and queue a terminal payment", LATENCY_BUCKETS),
+    "paystack_webhook_to_payment_entry_seconds": (HISTOGRAM, "Lag from webhook receipt to Payment Entry", LATENCY_BUCKETS),
+    "paystack_queue_wait_seconds": (HISTOGRAM, "Time work waited in a queue before it started", LATENCY_BUCKETS),
+    "paystack_reconciliation_duration_seconds": (HISTOGRAM, "Duration of a reconciliation run", LATENCY_BUCKETS),
+    "paystack_reconciliation_batch_size": (HISTOGRAM, "Transactions or invoices handled per reconciliation run", SIZE_BUCKETS),
+    "paystack_terminal_online": (GAUGE, "Whether the terminal was online at the last presence check", None),
+    "paystack_terminal_available": (GAUGE, "Whether the terminal was free at the last presence check", None)
+}
+
+
+def get_key(name):
+    # Raw hash commands only: the RedisWrapper helpers pickle values and add their own prefix
+    return frappe.cache().make_key(METRICS_KEY.format(name))
+
+
+def encode_labels(labels):
+    return ",".join(
+        f"{key}={str(value).replace(',', '_').replace('=', '_').replace('|', '_')}"
+        for key, value in sorted(labels.items())
+    )
+
+
+def decode_labels(field):
+    return dict(part.split("=", 1) for part in field.split(",") if part)
+
+
+def observe(name, value, **labels):
+    """Add one observation to a histogram; never raises into the caller"""
+    try:
+        buckets = METRICS[name][2]
+        field = encode_labels(labels)
+        bucket = next((str(bound) for bound in buckets if value <= bound), "+Inf")
+
+        pipe = frappe.cache().pipeline(transaction=False)
+        key = get_key(name)
+        pipe.hincrby(key, f"{field}|{bucket}", 1)
+        pipe.hincrbyfloat(key, f"{field}|sum", value)
+        pipe.hincrby(key, f"{field}|count", 1)
+        pipe.execute()
+    except Exception as e:
+        frappe.logger().debug(f"Could not record metric {name}: {str(e)}")
+
+
+def set_gauge(name, value, **labels):
+    try:
+        frappe.cache().pipeline(transaction=False).hset(get_key(name), encode_labels(labels), value).execute()
+    except Exception as e:
+        frappe.logger().debug(f"Could not record metric {name}: {str(e)}")
+
+
+def seconds_since(timestamp):
+    """Seconds from a naive server-time datetime until now"""
+    return max(0.0, (frappe.utils.now_datetime() - frappe.utils.get_datetime(timestamp)).total_seconds())
+
+
+@contextmanager
+def timed(name, **labels):
+    """Observe the duration of a block; also usable as a function decorator"""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        observe(name, time.monotonic() - started, **labels)
+
+
+def read_all():
+    """Raw hashes for every metric, as {name: {field: value}}"""
+    pipe = frappe.cache().pipeline(transaction=False)
+    for name in METRICS:
+        pipe.hgetall(get_key(name))
+
+    return {
+        name: {frappe.safe_decode(field): float(value) for field, value in (data or {}).items()}
+        for name, data in zip(METRICS, pipe.execute())
+    }
+
+
+def get_histograms(name, data):
+    """Per label set: cumulative buckets, sum and count"""
+    buckets = METRICS[name][2]
+    series = {}
+    for field, value in data.items():
+        labels, _sep, part = field.rpartition("|")
+        series.setdefault(labels, {"buckets": {}, "sum": 0.0, "count": 0})
+        if part in ("sum", "count"):
+            series[labels][part] = value
+        else:
+            series[labels]["buckets"][part] = value
+
+    for entry in series.values():
+        running = 0
+        cumulative = []
+        for bound in [str(bound) for bound in buckets] + ["+Inf"]:
+            running += entry["buckets"].get(bound, 0)
+            cumulative.append((bound, running))
+        entry["buckets"] = cumulative
+    return series
+
+
+def estimate_quantile(cumulative, count, quantile):
+    """Upper bound of the bucket holding the quantile"""
+    for bound, running in cumulative:
+        if count and running >= quantile * count:
+            return bound
+    return "+Inf"
+
+
+def format_labels(labels, **extra):
+    pairs = dict(decode_labels(labels), **extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in pairs.items()) + "}"
+
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def render_prometheus():
+    lines = []
+    for name, data in read_all().items():
+        metric_type, help_text, _buckets = METRICS[name]
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+        if metric_type == GAUGE:
+            for labels, value in sorted(data.items()):
+                lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+            continue
+
+        for labels, entry in sorted(get_histograms(name, data).items()):
+            for bound, running in entry["buckets"]:
+                lines.append(f"{name}_bucket{format_labels(labels, le=bound)} {format_value(running)}")
+            lines.append(f"{name}_sum{format_labels(labels)} {format_value(entry['sum'])}")
+            lines.append(f"{name}_count{format_labels(labels)} {format_value(entry['count'])}")
+
+    return "\n".join(lines) + "\n"
+
+
+@frappe.whitelist()
+def export_metrics():
+    """Prometheus text exposition of every Paystack metric"""
+    frappe.only_for("System Manager")
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+@frappe.whitelist()
+def get_metrics_summary():
+    """Count, mean and estimated p50/p95 per series, for the desk dashboard"""
+    frappe.only_for("System Manager")
+
+    summary = {"histograms": [], "gauges": []}
+    for name, data in read_all().items():
+        metric_type, help_text, _buckets = METRICS[name]
+        if metric_type == GAUGE:
+            summary["gauges"] += [
+                {"name": name, "labels": decode_labels(labels), "value": value}
+                for labels, value in sorted(data.items())
+            ]
+            continue
+
+        for labels, entry in sorted(get_histograms(name, data).items()):
+            count = entry["count"]
+            summary["histograms"].append({
+                "name": name,
+                "help": help_text,
+                "labels": decode_labels(labels),
+                "count": int(count),
+                "mean": entry["sum"] / count if count else 0,
+                "p50": estimate_quantile(entry["buckets"], count, 0.5),
+                "p95": estimate_quantile(entry["buckets"], count, 0.95)
+            })
+
+    return summary
+
+
+@frappe.whitelist()
+def reset_metrics():
+    frappe.only_for("System Manager")
+    frappe.cache().delete(*[get_key(name) for name in METRICS])
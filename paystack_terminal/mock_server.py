@@ -0,0 +1,489 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Local stand-in for the Paystack API, for offline testing and benchmarks
+
+Run it standalone (no site needed):
+
+    python -m paystack_terminal.mock_server --port 8090 --latency 120 --error-rate 0.02 \
+        --webhook-url http://site.local:8000/api/method/paystack_terminal.api.handle_webhook \
+        --secret-key sk_test_xxx --pay-after 3
+
+then set API Base URL in Paystack Settings (or paystack_base_url in site_config)
+to http://127.0.0.1:8090.
+"""
+
+import argparse
+import hashlib
+import hmac
+import itertools
+import json
+import random
+import threading
+import time
+import urllib.request
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_PORT = 8090
+PAGE_SIZE = 50
+
+# Local card fee: 1.5% plus NGN 100 from NGN 2,500, capped at NGN 2,000 (in kobo)
+FEE_RATE = 0.015
+FEE_FLAT = 10000
+FEE_FLAT_FROM = 250000
+FEE_CAP = 200000
+
+
+def utcnow():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def get_fees(amount):
+    fees = int(amount * FEE_RATE) + (FEE_FLAT if amount >= FEE_FLAT_FROM else 0)
+    return min(fees, FEE_CAP)
+
+
+def sign(secret_key, body):
+    """x-paystack-signature for a webhook body"""
+    return hmac.new(secret_key.encode(), body, hashlib.sha512).hexdigest()
+
+
+class MockPaystack:
+    """In-memory Paystack state plus the fault injection knobs"""
+
+    def __init__(self, latency=0, jitter=0, error_rate=0.0, throttle_rate=0.0,
+            webhook_url=None, secret_key=None, pay_after=None, seed=None):
+        self.config = {
+            "latency": latency,
+            "jitter": jitter,
+            "error_rate": error_rate,
+            "throttle_rate": throttle_rate,
+            "webhook_url": webhook_url,
+            "secret_key": secret_key,
+            "pay_after": pay_after
+        }
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1000)
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.customers = {}
+            self.payment_requests = {}
+            self.transactions = {}
+            self.settlements = {}
+            self.terminal_events = []
+            self.idempotent_responses = {}
+            self.stats = {"requests": 0, "errors": 0, "throttled": 0, "webhooks_sent": 0, "webhooks_failed": 0}
+
+    def count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def next_id(self):
+        return next(self.ids)
+
+    def inject_latency(self):
+        delay = self.config["latency"] + self.random.uniform(-1, 1) * self.config["jitter"]
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+    def injected_fault(self):
+        """Return (status, body, headers) for an injected failure, or None"""
+        roll = self.random.random()
+        if roll < self.config["throttle_rate"]:
+            self.count("throttled")
+            return 429, {"status": False, "message": "Too many requests"}, {"Retry-After": "1"}
+        if roll < self.config["throttle_rate"] + self.config["error_rate"]:
+            self.count("errors")
+            return 500, {"status": False, "message": "Injected server error"}, {}
+        return None
+
+    # Paystack endpoints
+
+    def terminal_presence(self, terminal_id):
+        return 200, ok("Terminal presence retrieved", {"online": True, "available": True})
+
+    def terminal_event(self, terminal_id, body):
+        event_id = str(self.next_id())
+        with self.lock:
+            self.terminal_events.append({"id": event_id, "terminal_id": terminal_id, "event": body})
+
+        reference = ((body or {}).get("data") or {}).get("reference")
+        if reference and self.config["pay_after"] is not None:
+            timer = threading.Timer(self.config["pay_after"], self.pay, args=(reference,))
+            timer.daemon = True
+            timer.start()
+
+        return 200, ok("Event sent to Terminal", {"id": event_id})
+
+    def create_customer(self, body):
+        body = body or {}
+        customer = {
+            "id": self.next_id(),
+            "customer_code": f"CUS_{self.random.getrandbits(48):012x}",
+            "email": body.get("email"),
+            "first_name": body.get("first_name"),
+            "last_name": body.get("last_name"),
+            "phone": body.get("phone"),
+            "metadata": body.get("metadata")
+        }
+        with self.lock:
+            self.customers[customer["customer_code"]] = customer
+        return 200, ok("Customer created", customer)
+
+    def create_payment_request(self, body):
+        body = body or {}
+        request_id = self.next_id()
+        payment_request = {
+            "id": request_id,
+            "request_code": f"PRQ_{self.random.getrandbits(48):012x}",
+            "offline_reference": f"{request_id}{self.random.randint(10 ** 8, 10 ** 9 - 1)}",
+            "customer": body.get("customer"),
+            "amount": int(float(body.get("amount") or 0)),
+            "currency": "NGN",
+            "status": "pending",
+            "paid": False,
+            "metadata": body.get("metadata"),
+            "created_at": utcnow()
+        }
+        with self.lock:
+            self.payment_requests[payment_request["offline_reference"]] = payment_request
+        return 200, ok("Payment request created", payment_request)
+
+    def archive_payment_request(self, request_id):
+        return 200, ok("Payment request has been archived", None)
+
+    def verify_transaction(self, reference):
+        transaction = self.transactions.get(reference)
+        if not transaction:
+            return 400, {"status": False, "message": "Transaction reference not found"}
+        return 200, ok("Verification successful", transaction)
+
+    def list_transactions(self, query):
+        status = first(query, "status")
+        since = first(query, "from")
+        until = first(query, "to")
+        per_page = int(first(query, "perPage") or PAGE_SIZE)
+        page = max(1, int(first(query, "page") or 1))
+
+        with self.lock:
+            transactions = sorted(self.transactions.values(), key=lambda txn: (txn["createdAt"], txn["id"]))
+
+        # Paystack compares on the timestamp; string comparison works for the fixed ISO format
+        transactions = [
+            txn for txn in transactions
+            if (not status or txn["status"] == status)
+            and (not since or txn["createdAt"] >= normalize_timestamp(since))
+            and (not until or txn["createdAt"] <= normalize_timestamp(until))
+        ]
+
+        return 200, paginate("Transactions retrieved", transactions, per_page, page)
+
+    def list_settlements(self, query):
+        since = first(query, "from")
+        until = first(query, "to")
+        per_page = int(first(query, "perPage") or PAGE_SIZE)
+        page = max(1, int(first(query, "page") or 1))
+
+        with self.lock:
+            settlements = sorted(self.settlements.values(), key=lambda settlement: settlement["id"])
+
+        settlements = [
+            {key: value for key, value in settlement.items() if key != "references"}
+            for settlement in settlements
+            if (not since or settlement["createdAt"] >= normalize_timestamp(since))
+            and (not until or settlement["createdAt"] <= normalize_timestamp(until))
+        ]
+        return 200, paginate("Settlements retrieved", settlements, per_page, page)
+
+    def settlement_transactions(self, settlement_id, query):
+        per_page = int(first(query, "perPage") or PAGE_SIZE)
+        page = max(1, int(first(query, "page") or 1))
+
+        with self.lock:
+            settlement = self.settlements.get(int(settlement_id)) if settlement_id.isdigit() else None
+            if not settlement:
+                return 404, {"status": False, "message": "Settlement not found"}
+            transactions = [self.transactions[reference] for reference in settlement["references"]]
+
+        return 200, paginate("Settlement transactions retrieved", transactions, per_page, page)
+
+    # Simulated cardholder activity
+
+    def add_transaction(self, reference, amount=None, metadata=None, status="success"):
+        payment_request = self.payment_requests.get(reference) or {}
+        transaction = {
+            "id": self.next_id(),
+            "reference": reference,
+            "status": status,
+            "amount": int(amount if amount is not None else payment_request.get("amount") or 0),
+            "currency": "NGN",
+            "channel": "pos",
+            "createdAt": utcnow(),
+            "paid_at": utcnow(),
+            "metadata": metadata if metadata is not None else payment_request.get("metadata") or {}
+        }
+        transaction["fees"] = get_fees(transaction["amount"])
+        with self.lock:
+            self.transactions[reference] = transaction
+            if payment_request:
+                payment_request.update(status="paid", paid=True)
+        return transaction
+
+    def pay(self, reference):
+        """Settle a payment request and send the signed charge.success webhook"""
+        transaction = self.add_transaction(reference)
+        self.send_webhook("charge.success", transaction)
+        return transaction
+
+    def settle(self):
+        """Pay out every successful transaction not yet in a settlement, as one settlement"""
+        with self.lock:
+            settled = {reference for settlement in self.settlements.values() for reference in settlement["references"]}
+            references = [
+                reference for reference, txn in self.transactions.items()
+                if txn["status"] == "success" and reference not in settled
+            ]
+            if not references:
+                return None
+
+            total_amount = sum(self.transactions[reference]["amount"] for reference in references)
+            total_fees = sum(self.transactions[reference]["fees"] for reference in references)
+            settlement = {
+                "id": self.next_id(),
+                "status": "success",
+                "currency": "NGN",
+                "total_amount": total_amount,
+                "total_fees": total_fees,
+                "effective_amount": total_amount - total_fees,
+                "total_processed": len(references),
+                "settlement_date": utcnow(),
+                "createdAt": utcnow(),
+                "references": references
+            }
+            self.settlements[settlement["id"]] = settlement
+
+        return {key: value for key, value in settlement.items() if key != "references"}
+
+    def send_webhook(self, event, data):
+        if not (self.config["webhook_url"] and self.config["secret_key"]):
+            return False
+
+        body = json.dumps({"event": event, "data": data}).encode()
+        request = urllib.request.Request(
+            self.config["webhook_url"],
+            data=body,
+            method="POST",
+            headers={
+                "Content-Type": "application/json",
+                "x-paystack-signature": sign(self.config["secret_key"], body)
+            }
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=10):
+                self.count("webhooks_sent")
+                return True
+        except Exception:
+            self.count("webhooks_failed")
+            return False
+
+    def route(self, method, path, query, body):
+        """Dispatch a Paystack API call to (status, response body)"""
+        parts = [part for part in path.split("/") if part]
+
+        if method == "GET" and len(parts) == 3 and parts[0] == "terminal" and parts[2] == "presence":
+            return self.terminal_presence(parts[1])
+        if method == "POST" and len(parts) == 3 and parts[0] == "terminal" and parts[2] == "event":
+            return self.terminal_event(parts[1], body)
+        if method == "POST" and parts == ["customer"]:
+            return self.create_customer(body)
+        if method == "POST" and parts == ["paymentrequest"]:
+            return self.create_payment_request(body)
+        if method == "POST" and len(parts) == 3 and parts[:2] == ["paymentrequest", "archive"]:
+            return self.archive_payment_request(parts[2])
+        if method == "GET" and len(parts) == 3 and parts[:2] == ["transaction", "verify"]:
+            return self.verify_transaction(parts[2])
+        if method == "GET" and parts == ["transaction"]:
+            return self.list_transactions(query)
+        if method == "GET" and parts == ["settlement"]:
+            return self.list_settlements(query)
+        if method == "GET" and len(parts) == 3 and parts[0] == "settlement" and parts[2] == "transactions":
+            return self.settlement_transactions(parts[1], query)
+
+        return 404, {"status": False, "message": f"No mock for {method} {path}"}
+
+    def control(self, method, path, body):
+        """Endpoints under /_mock for tests and benchmarks to drive the mock"""
+        body = body or {}
+        action = path[len("/_mock/"):]
+
+        if method == "GET" and action == "stats":
+            return 200, dict(self.stats, config=self.config, transactions=len(self.transactions),
+                payment_requests=len(self.payment_requests), terminal_events=len(self.terminal_events),
+                settlements=len(self.settlements))
+        if method == "POST" and action == "config":
+            self.config.update({key: value for key, value in body.items() if key in self.config})
+            return 200, {"config": self.config}
+        if method == "POST" and action == "reset":
+            self.reset()
+            return 200, {"reset": True}
+        if method == "POST" and action == "pay":
+            return 200, self.pay(body["reference"])
+        if method == "POST" and action == "transactions":
+            # Seed successful transactions, e.g. for reconciliation runs
+            transactions = [
+                self.add_transaction(item["reference"], item.get("amount"), item.get("metadata"))
+                for item in body.get("transactions", [])
+            ]
+            return 200, {"created": len(transactions)}
+        if method == "POST" and action == "settle":
+            return 200, {"settlement": self.settle()}
+
+        return 404, {"status": False, "message": f"No mock control {action}"}
+
+
+def ok(message, data, meta=None):
+    response = {"status": True, "message": message, "data": data}
+    if meta is not None:
+        response["meta"] = meta
+    return response
+
+
+def paginate(message, items, per_page, page):
+    page_count = max(1, -(-len(items) // per_page))
+    return ok(message, items[(page - 1) * per_page:page * per_page], meta={
+        "total": len(items),
+        "perPage": per_page,
+        "page": page,
+        "pageCount": page_count
+    })
+
+
+def first(query, key):
+    values = query.get(key)
+    return values[0] if values else None
+
+
+def normalize_timestamp(value):
+    """Accept dates and ISO timestamps in the format transactions are stored in"""
+    value = value.replace(" ", "T")
+    if len(value) == 10:
+        value += "T00:00:00"
+    if not value.endswith("Z"):
+        value = value.split("+")[0]
+        if "." not in value:
+            value += ".000"
+        value += "Z"
+    return value
+
+
+def make_handler(mock):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def handle_request(self, method):
+            url = urlparse(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            body = json.loads(raw) if raw else None
+
+            if url.path.startswith("/_mock/"):
+                return self.respond(*mock.control(method, url.path, body))
+
+            mock.count("requests")
+            if not (self.headers.get("Authorization") or "").startswith("Bearer "):
+                return self.respond(401, {"status": False, "message": "Invalid key"})
+
+            mock.inject_latency()
+            fault = mock.injected_fault()
+            if fault:
+                return self.respond(*fault)
+
+            # Replay the first response for a repeated Idempotency-Key
+            key = self.headers.get("Idempotency-Key")
+            if key and (method, url.path, key) in mock.idempotent_responses:
+                return self.respond(*mock.idempotent_responses[(method, url.path, key)])
+
+            status, response = mock.route(method, url.path, parse_qs(url.query), body)
+            if key and status < 500:
+                mock.idempotent_responses[(method, url.path, key)] = (status, response)
+            self.respond(status, response)
+
+        def respond(self, status, body, headers=None):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            self.handle_request("GET")
+
+        def do_POST(self):
+            self.handle_request("POST")
+
+    return Handler
+
+
+def start_server(mock=None, host="127.0.0.1", port=0):
+    """Serve the mock on a daemon thread; port 0 picks a free port. Returns (server, base_url)"""
+    mock = mock or MockPaystack()
+    server = ThreadingHTTPServer((host, port), make_handler(mock))
+    server.daemon_threads = True
+    server.mock = mock
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description="Local mock of the Paystack API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", default=DEFAULT_PORT, type=int)
+    parser.add_argument("--latency", default=0, type=float, help="Mean added latency per call, in ms")
+    parser.add_argument("--jitter", default=0, type=float, help="Latency varies by up to this many ms")
+    parser.add_argument("--error-rate", default=0.0, type=float, help="Fraction of calls answered with HTTP 500")
+    parser.add_argument("--throttle-rate", default=0.0, type=float, help="Fraction of calls answered with HTTP 429")
+    parser.add_argument("--webhook-url", help="Where to send signed charge.success webhooks")
+    parser.add_argument("--secret-key", help="Secret key used to sign webhooks")
+    parser.add_argument("--pay-after", type=float, help="Pay pushed requests after this many seconds")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible fault injection")
+    return parser
+
+
+def main(args=None):
+    options = get_parser().parse_args(args)
+    mock = MockPaystack(
+        latency=options.latency,
+        jitter=options.jitter,
+        error_rate=options.error_rate,
+        throttle_rate=options.throttle_rate,
+        webhook_url=options.webhook_url,
+        secret_key=options.secret_key,
+        pay_after=options.pay_after,
+        seed=options.seed
+    )
+    server = ThreadingHTTPServer((options.host, options.port), make_handler(mock))
+    server.daemon_threads = True
+    print(f"Mock Paystack listening on http://{options.host}:{options.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
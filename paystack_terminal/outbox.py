@@ -0,0 +1,386 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Transactional outbox for Paystack terminal pushes and customer creation
+"""
+
+import json
+import time
+
+import frappe
+from frappe import _
+from frappe.utils import add_to_date, now_datetime
+from paystack_terminal import metrics
+from paystack_terminal.client import CircuitOpenError, get_client
+from paystack_terminal.events import get_backoff
+from paystack_terminal.ledger import LEDGER_DOCTYPE, record_transaction
+from paystack_terminal.payment_status import set_payment_status
+from paystack_terminal.queues import PARTITIONS, enqueue, get_partition
+from paystack_terminal.savepoints import savepoint
+
+OUTBOX_DOCTYPE = "Paystack Outbox"
+
+TERMINAL_PUSH = "Terminal Push"
+CREATE_CUSTOMER = "Create Customer"
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 8
+
+# A cashier is waiting on a push: a few quick retries, then Push Failed instead of a late charge
+PUSH_RETRY_SECONDS = (5, 15)
+PUSH_MAX_ATTEMPTS = len(PUSH_RETRY_SECONDS) + 1
+
+LOCK_KEY = "paystack_terminal:outbox_worker:{0}"
+LOCK_TIMEOUT = 10 * 60
+
+
+def add_to_outbox(action, idempotency_key, payload, reference_doctype=None, reference_name=None, terminal_id=None):
+    """Record an outbound call in the caller's transaction; it is delivered after commit.
+
+    An undelivered entry with the same idempotency key is reused, so retrying a
+    checkout never queues the same call twice.
+    """
+    # Pushes to one terminal share a partition and are delivered in order
+    partition = get_partition(terminal_id or reference_name)
+    existing = frappe.db.get_value(
+        OUTBOX_DOCTYPE,
+        {"idempotency_key": idempotency_key, "status": ["in", ["Pending", "Failed"]]},
+        ["name", "partition"],
+        as_dict=True
+    )
+    if existing:
+        frappe.db.set_value(OUTBOX_DOCTYPE, existing.name, "next_attempt_at", now_datetime(), update_modified=False)
+        name, partition = existing.name, existing.partition
+    else:
+        name = frappe.get_doc({
+            "doctype": OUTBOX_DOCTYPE,
+            "action": action,
+            "status": "Pending",
+            "idempotency_key": idempotency_key,
+            "reference_doctype": reference_doctype,
+            "reference_name": reference_name,
+            "terminal_id": terminal_id,
+            "partition": partition,
+            "attempts": 0,
+            "next_attempt_at": now_datetime(),
+            "payload": json.dumps(payload)
+        }).insert(ignore_permissions=True).name
+
+    enqueue_worker(partition)
+    return name
+
+
+def enqueue_worker(partition):
+    enqueue(
+        "paystack_terminal.outbox.process_outbox",
+        job_id=f"paystack_outbox_worker::{partition}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+        partition=partition
+    )
+
+
+def enqueue_due_workers():
+    """Scheduled: wake the workers of partitions with due entries, e.g. retries after backoff"""
+    for partition in frappe.get_all(
+        OUTBOX_DOCTYPE,
+        filters={"status": ["in", ["Pending", "Failed"]], "next_attempt_at": ["<=", now_datetime()]},
+        distinct=True,
+        pluck="partition"
+    ):
+        enqueue_worker(partition)
+
+
+def queue_terminal_push(terminal_id, reference, request_id, invoice):
+    """Outbox entry that pushes a payment request to a terminal"""
+    event = {
+        "type": "invoice",
+        "action": "process",
+        "data": {
+            "id": request_id,
+            "reference": reference
+        }
+    }
+    return add_to_outbox(
+        TERMINAL_PUSH,
+        f"terminal_push::{terminal_id}::{reference}",
+        {"event": event, "reference": reference},
+        reference_doctype="Sales Invoice",
+        reference_name=invoice,
+        terminal_id=terminal_id
+    )
+
+
+def queue_customer_creation(customer, customer_data):
+    """Outbox entry that creates the Paystack customer for an ERPNext Customer"""
+    return add_to_outbox(
+        CREATE_CUSTOMER,
+        f"create_customer::{customer}",
+        customer_data,
+        reference_doctype="Customer",
+        reference_name=customer
+    )
+
+
+def push_to_terminal(client, entry, payload):
+    invoice = frappe.db.get_value(
+        "Sales Invoice",
+        entry.reference_name,
+        ["docstatus", "terminal_reference"],
+        as_dict=True
+    )
+    # The invoice moved on (cancelled or re-sent with another request) since this was queued
+    if not invoice or invoice.docstatus != 1 or invoice.terminal_reference != payload["reference"]:
+        return False
+
+    client.send_terminal_event(entry.terminal_id, payload["event"], idempotency_key=entry.name)
+
+    # Every invoice on a consolidated request shares its reference
+    frappe.db.set_value(
+        "Sales Invoice",
+        {"terminal_reference": payload["reference"], "paystack_status": "Sending"},
+        "paystack_status",
+        "Pending",
+        update_modified=False
+    )
+    set_payment_status(payload["reference"], "Pending", [entry.reference_name])
+    publish_delivery(
+        entry,
+        "pushed",
+        _("Payment request sent to terminal. Please complete payment on the POS device."),
+        reference=payload["reference"],
+        terminal_id=entry.terminal_id
+    )
+    return True
+
+
+def create_customer(client, entry, payload):
+    if frappe.db.get_value("Customer", entry.reference_name, "paystack_customer_code"):
+        return False
+
+    result = client.create_customer(payload, idempotency_key=entry.name)
+    frappe.db.set_value(
+        "Customer",
+        entry.reference_name,
+        "paystack_customer_code",
+        result["customer_code"],
+        update_modified=False
+    )
+    return True
+
+
+ACTION_HANDLERS = {
+    TERMINAL_PUSH: push_to_terminal,
+    CREATE_CUSTOMER: create_customer
+}
+
+
+def publish_delivery(entry, status, message, **extra):
+    from paystack_terminal.checkout import publish_status
+
+    if entry.reference_doctype == "Sales Invoice":
+        publish_status(entry.reference_name, status, message, after_commit=True, **extra)
+
+
+def on_dead(entry):
+    """Report a push that will not be retried back to the invoice"""
+    reference = json.loads(entry.payload or "{}").get("reference")
+    if entry.action != TERMINAL_PUSH or not reference:
+        return
+
+    frappe.db.set_value(
+        "Sales Invoice",
+        {"terminal_reference": reference, "paystack_status": "Sending"},
+        "paystack_status",
+        "Push Failed",
+        update_modified=False
+    )
+    record_transaction(reference, status="Failed")
+    message = _("Could not send the payment request to the terminal. Please try again.")
+    set_payment_status(reference, "Push Failed", [entry.reference_name], message=message)
+    publish_delivery(entry, "failed", message)
+
+
+def deliver_entry(name, client=None, raise_exception=False):
+    """Deliver one entry and record the outcome; returns the entry status.
+
+    The row is read FOR UPDATE so the worker and an inline delivery never send
+    the same entry at the same time.
+    """
+    entry = frappe.db.get_value(
+        OUTBOX_DOCTYPE,
+        name,
+        ["name", "action", "status", "reference_doctype", "reference_name", "terminal_id", "attempts", "payload", "next_attempt_at"],
+        as_dict=True,
+        for_update=True
+    )
+    if not entry or entry.status not in ("Pending", "Failed"):
+        return entry.status if entry else None
+
+    metrics.observe("paystack_queue_wait_seconds", metrics.seconds_since(entry.next_attempt_at), queue="outbox")
+
+    now = now_datetime()
+    try:
+        with savepoint("paystack_outbox"):
+            delivered = ACTION_HANDLERS[entry.action](client or get_client(), entry, json.loads(entry.payload or "{}"))
+        update = {
+            "status": "Sent" if delivered else "Skipped",
+            "attempts": entry.attempts + 1,
+            "sent_at": now if delivered else None,
+            "error": None
+        }
+    except CircuitOpenError as e:
+        if entry.action == TERMINAL_PUSH:
+            update = get_failure_update(entry, now, e)
+        else:
+            # Paystack is known to be down: wait it out without spending an attempt
+            update = {
+                "status": "Failed",
+                "next_attempt_at": add_to_date(now, seconds=max(e.retry_in, 1)),
+                "error": str(e)[:1000]
+            }
+        if update["status"] == "Dead":
+            on_dead(entry)
+        if raise_exception:
+            raise
+    except Exception as e:
+        update = get_failure_update(entry, now, e)
+        frappe.logger().error(f"Paystack outbox {entry.name} ({entry.action}) failed: {str(e)}")
+        if update["status"] == "Dead":
+            on_dead(entry)
+        if raise_exception:
+            raise
+
+    frappe.db.set_value(OUTBOX_DOCTYPE, entry.name, update, update_modified=False)
+    return update["status"]
+
+
+def get_failure_update(entry, now, error):
+    """Spend an attempt; pushes get a short retry budget, customer creation the long backoff"""
+    attempts = entry.attempts + 1
+    if entry.action == TERMINAL_PUSH:
+        dead = attempts >= PUSH_MAX_ATTEMPTS
+        next_attempt_at = now if dead else add_to_date(now, seconds=PUSH_RETRY_SECONDS[attempts - 1])
+    else:
+        dead = attempts >= MAX_ATTEMPTS
+        next_attempt_at = add_to_date(now, minutes=get_backoff(attempts))
+
+    return {
+        "status": "Dead" if dead else "Failed",
+        "attempts": attempts,
+        "next_attempt_at": next_attempt_at,
+        "error": str(error)[:1000]
+    }
+
+
+def get_push_retry_wait(partition):
+    """Seconds until the partition's next push retry, when it falls within the push retry window"""
+    next_attempt_at = frappe.get_all(
+        OUTBOX_DOCTYPE,
+        filters={"status": "Failed", "action": TERMINAL_PUSH, "partition": partition},
+        fields=["min(next_attempt_at) as next_attempt_at"]
+    )[0].next_attempt_at
+    if not next_attempt_at:
+        return None
+
+    wait = (next_attempt_at - now_datetime()).total_seconds()
+    return max(0, wait) if wait <= max(PUSH_RETRY_SECONDS) else None
+
+
+def get_due_entries(limit, partition):
+    return frappe.get_all(
+        OUTBOX_DOCTYPE,
+        filters={
+            "status": ["in", ["Pending", "Failed"]],
+            "next_attempt_at": ["<=", now_datetime()],
+            "partition": partition
+        },
+        order_by="creation asc",
+        limit_page_length=limit,
+        pluck="name"
+    )
+
+
+def process_outbox(partition=None, batch_size=BATCH_SIZE):
+    """Deliver due entries of one partition, or of every partition in turn"""
+    summary = {"sent": 0, "skipped": 0, "failed": 0, "dead": 0}
+    client = get_client()
+    for current in range(PARTITIONS) if partition is None else [partition]:
+        deliver_partition(int(current), client, summary, batch_size)
+
+    if any(summary.values()):
+        frappe.logger().info(f"Paystack outbox worker: {summary}")
+    return summary
+
+
+def deliver_partition(partition, client, summary, batch_size=BATCH_SIZE):
+    # An entry committed after the last query found this job already started, so its
+    # deduplicated enqueue was skipped: look again once the lock is released
+    while drain_partition(partition, client, summary, batch_size):
+        # End the read snapshot so entries committed since are visible
+        frappe.db.commit()
+        if not get_due_entries(1, partition):
+            break
+
+
+def drain_partition(partition, client, summary, batch_size=BATCH_SIZE):
+    """Deliver due entries until none are left; False if another worker holds the partition"""
+    lock = frappe.cache().lock(frappe.cache().make_key(LOCK_KEY.format(partition)), timeout=LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        return False
+
+    try:
+        while True:
+            names = get_due_entries(batch_size, partition)
+            for name in names:
+                status = deliver_entry(name, client)
+                # Commit each delivery: the Paystack side effect has already happened
+                frappe.db.commit()
+                if status and status.lower() in summary:
+                    summary[status.lower()] += 1
+
+            if len(names) < batch_size:
+                # Stay for a push retry that is seconds away rather than leave it to the minute cron
+                wait = get_push_retry_wait(partition)
+                if wait is None:
+                    return True
+                frappe.db.commit()
+                time.sleep(wait)
+    finally:
+        lock.release()
+
+
+def retry_entries(names):
+    """Reset failed or dead entries to Pending and wake the worker"""
+    now = now_datetime()
+    frappe.db.bulk_update(
+        OUTBOX_DOCTYPE,
+        {name: {"status": "Pending", "attempts": 0, "next_attempt_at": now, "error": None} for name in names},
+        update_modified=False
+    )
+
+    # A push given another chance is an open charge again, unless its invoices moved on to another request
+    for entry in frappe.get_all(
+        OUTBOX_DOCTYPE,
+        filters={"name": ["in", names], "action": TERMINAL_PUSH},
+        fields=["payload", "reference_name"]
+    ):
+        reference = json.loads(entry.payload or "{}").get("reference")
+        if not reference or not frappe.db.exists("Sales Invoice", {"terminal_reference": reference, "paystack_status": "Push Failed"}):
+            continue
+
+        if frappe.db.get_value(LEDGER_DOCTYPE, reference, "status") == "Failed":
+            record_transaction(reference, status="Pending")
+        # Back to Sending, which delivery moves to Pending once the terminal has the request
+        frappe.db.set_value(
+            "Sales Invoice",
+            {"terminal_reference": reference, "paystack_status": "Push Failed"},
+            "paystack_status",
+            "Sending",
+            update_modified=False
+        )
+        set_payment_status(reference, "Sending", [entry.reference_name], message=None)
+
+    # Enqueued on commit, once the reset rows are visible to the workers
+    enqueue_due_workers()
+    frappe.db.commit()
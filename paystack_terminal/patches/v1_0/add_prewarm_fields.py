@@ -0,0 +1,47 @@
+import frappe
+from frappe.custom.doctype.custom_field.custom_field import create_custom_fields
+
+def execute():
+    """Add Sales Invoice fields for prewarmed Paystack payment requests"""
+    custom_fields = {
+        "Sales Invoice": [
+            {
+                "fieldname": "paystack_request_id",
+                "label": "Paystack Payment Request ID",
+                "fieldtype": "Data",
+                "insert_after": "paystack_status",
+                "read_only": 1,
+                "no_copy": 1,
+                "print_hide": 1
+            },
+            {
+                "fieldname": "paystack_offline_reference",
+                "label": "Prewarmed Offline Reference",
+                "fieldtype": "Data",
+                "insert_after": "paystack_request_id",
+                "read_only": 1,
+                "no_copy": 1,
+                "print_hide": 1
+            },
+            {
+                "fieldname": "paystack_prewarmed_amount",
+                "label": "Prewarmed Amount",
+                "fieldtype": "Currency",
+                "insert_after": "paystack_offline_reference",
+                "read_only": 1,
+                "no_copy": 1,
+                "print_hide": 1
+            },
+            {
+                "fieldname": "paystack_prewarmed_on",
+                "label": "Prewarmed On",
+                "fieldtype": "Datetime",
+                "insert_after": "paystack_prewarmed_amount",
+                "read_only": 1,
+                "no_copy": 1,
+                "print_hide": 1
+            }
+        ]
+    }
+    
+    create_custom_fields(custom_fields)
@@ -0,0 +1,7 @@
+import frappe
+
+def execute():
+    """Fill the currency gross the takings chart plots from the kobo gross of existing rollup rows"""
+    frappe.reload_doc("paystack_terminal", "doctype", "paystack_sales_rollup")
+
+    frappe.db.sql("update `tabPaystack Sales Rollup` set gross_amount = gross_kobo / 100")
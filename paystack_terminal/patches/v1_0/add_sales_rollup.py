@@ -0,0 +1,18 @@
+import frappe
+from paystack_terminal.rollups import rebuild_rollups
+
+def execute():
+    """Fill company and cashier on existing ledger rows, then build the sales rollup from history"""
+    frappe.reload_doc("paystack_terminal", "doctype", "paystack_transaction")
+    frappe.reload_doc("paystack_terminal", "doctype", "paystack_sales_rollup")
+    
+    # The invoice's creator stands in for the cashier on charges started before the ledger recorded one
+    frappe.db.sql("""
+        update `tabPaystack Transaction` tx
+        join `tabSales Invoice` si on si.name = tx.sales_invoice
+        set tx.company = coalesce(tx.company, si.company),
+            tx.cashier = coalesce(tx.cashier, si.owner)
+        where tx.company is null or tx.cashier is null
+    """)
+    
+    rebuild_rollups()
@@ -0,0 +1,88 @@
+import frappe
+from frappe.utils import now_datetime
+from paystack_terminal.ledger import to_kobo
+
+# Custom fields used for lookups that need an index
+INDEXED_FIELDS = [
+    ("Sales Invoice", "terminal_reference"),
+    ("Customer", "paystack_customer_code"),
+    ("Payment Entry", "paystack_reference")
+]
+
+CHUNK_SIZE = 1000
+
+def execute():
+    """Create the Paystack Transaction ledger, index lookup fields and backfill the ledger"""
+    frappe.reload_doc("paystack_terminal", "doctype", "paystack_transaction")
+    
+    for doctype, fieldname in INDEXED_FIELDS:
+        custom_field = f"{doctype}-{fieldname}"
+        if frappe.db.exists("Custom Field", custom_field):
+            frappe.db.set_value("Custom Field", custom_field, "search_index", 1)
+        if frappe.db.has_column(doctype, fieldname):
+            frappe.db.add_index(doctype, [fieldname])
+            
+    frappe.db.add_index("Payment Entry", ["reference_no"])
+    
+    backfill_ledger()
+
+def backfill_ledger():
+    """Seed the ledger from pushed invoices and existing Paystack Payment Entries"""
+    rows = {}
+    
+    for invoice in frappe.get_all(
+        "Sales Invoice",
+        filters={"terminal_reference": ["is", "set"]},
+        fields=["name", "terminal_reference", "paystack_status", "paystack_request_id", "grand_total"]
+    ):
+        rows[invoice.terminal_reference] = {
+            "sales_invoice": invoice.name,
+            "payment_request_id": invoice.paystack_request_id,
+            "payment_entry": None,
+            "amount_kobo": to_kobo(invoice.grand_total),
+            "status": "Success" if invoice.paystack_status == "Paid" else "Pending"
+        }
+        
+    payment_entries = frappe.get_all(
+        "Payment Entry",
+        filters={"mode_of_payment": "Paystack Terminal", "docstatus": 1, "reference_no": ["is", "set"]},
+        fields=["name", "reference_no", "paid_amount"]
+    )
+    invoice_by_payment_entry = {
+        ref.parent: ref.reference_name
+        for ref in frappe.get_all(
+            "Payment Entry Reference",
+            filters={"parenttype": "Payment Entry", "reference_doctype": "Sales Invoice", "docstatus": 1},
+            fields=["parent", "reference_name"]
+        )
+    }
+    
+    for payment_entry in payment_entries:
+        row = rows.setdefault(payment_entry.reference_no, {"payment_request_id": None})
+        row.update({
+            "sales_invoice": row.get("sales_invoice") or invoice_by_payment_entry.get(payment_entry.name),
+            "payment_entry": payment_entry.name,
+            "amount_kobo": to_kobo(payment_entry.paid_amount),
+            "status": "Success"
+        })
+        
+    now = now_datetime()
+    fields = [
+        "name", "reference", "status", "sales_invoice", "payment_entry", "payment_request_id", "amount_kobo",
+        "creation", "modified", "owner", "modified_by", "docstatus"
+    ]
+    values = [
+        (
+            reference, reference, row["status"], row.get("sales_invoice"), row["payment_entry"],
+            row.get("payment_request_id"), row["amount_kobo"], now, now, "Administrator", "Administrator", 0
+        )
+        for reference, row in rows.items()
+    ]
+    
+    for i in range(0, len(values), CHUNK_SIZE):
+        frappe.db.bulk_insert(
+            "Paystack Transaction",
+            fields=fields,
+            values=values[i:i + CHUNK_SIZE],
+            ignore_duplicates=True
+        )
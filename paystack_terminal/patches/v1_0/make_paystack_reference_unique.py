@@ -0,0 +1,41 @@
+import frappe
+
+def execute():
+    """Unique index on Payment Entry.paystack_reference as the duplicate-posting backstop"""
+    if not frappe.db.has_column("Payment Entry", "paystack_reference"):
+        return
+    
+    # Empty strings would collide under a unique index; unique Data fields store NULL instead
+    frappe.db.sql("""
+        update `tabPayment Entry`
+        set paystack_reference = NULL
+        where paystack_reference = '' or docstatus = 2
+    """)
+    
+    # Keep the value only on the oldest live entry per reference
+    frappe.db.sql("""
+        update `tabPayment Entry` pe
+        join (
+            select paystack_reference, min(creation) as first_creation
+            from `tabPayment Entry`
+            where paystack_reference is not null
+            group by paystack_reference
+            having count(*) > 1
+        ) dup on dup.paystack_reference = pe.paystack_reference
+        set pe.paystack_reference = NULL
+        where pe.creation > dup.first_creation
+    """)
+    
+    if frappe.db.exists("Custom Field", "Payment Entry-paystack_reference"):
+        frappe.db.set_value("Custom Field", "Payment Entry-paystack_reference", {"unique": 1, "search_index": 0})
+        
+    frappe.db.add_unique("Payment Entry", ["paystack_reference"], constraint_name="unique_paystack_reference")
+    
+    # The unique index serves every lookup; the plain ones left by add_transaction_ledger (add_index)
+    # and the field's old search_index only slow down writes
+    for index_name in ("paystack_reference_index", "paystack_reference"):
+        if frappe.db.sql("""
+            show index from `tabPayment Entry`
+            where Key_name = %s and Non_unique = 1
+        """, index_name):
+            frappe.db.sql_ddl(f"alter table `tabPayment Entry` drop index `{index_name}`")
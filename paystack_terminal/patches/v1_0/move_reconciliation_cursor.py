@@ -0,0 +1,19 @@
+import frappe
+from paystack_terminal.reconciliation import get_cursor, set_cursor
+
+def execute():
+    """Move the reconciliation cursor off Paystack Settings, where a form save could rewind it"""
+    values = dict(frappe.db.sql("""
+        select field, value from `tabSingles`
+        where doctype = 'Paystack Settings'
+            and field in ('reconciliation_cursor_timestamp', 'reconciliation_cursor_id')
+    """))
+
+    if values.get("reconciliation_cursor_timestamp") and not get_cursor():
+        set_cursor(values["reconciliation_cursor_timestamp"], values.get("reconciliation_cursor_id"))
+
+    frappe.db.sql("""
+        delete from `tabSingles`
+        where doctype = 'Paystack Settings'
+            and field in ('reconciliation_cursor_timestamp', 'reconciliation_cursor_id')
+    """)
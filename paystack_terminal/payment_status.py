@@ -0,0 +1,186 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Redis payment status records for cheap polling by POS and kiosk screens
+"""
+
+import time
+
+import frappe
+from frappe import _
+from frappe.utils import flt, now_datetime
+from paystack_terminal import savepoints
+
+STATUS_KEY = "paystack_terminal:payment_status:{0}:{1}"
+STATUS_TTL = 24 * 60 * 60
+
+# Each waiting request holds a web worker, so long-polls stay short and few per user
+MAX_WAIT = 20
+POLL_INTERVAL = 0.5
+MAX_WAITS_PER_USER = 3
+WAITERS_KEY = "paystack_terminal:payment_status_waiters:{0}"
+
+# Ledger status -> payment status, for records rebuilt from the database
+LEDGER_STATUS = {"Pending": "Pending", "Success": "Paid", "Failed": "Failed"}
+
+
+def get_key(kind, name):
+    return STATUS_KEY.format(kind, name)
+
+
+def get_record(reference=None, invoice=None):
+    # expires=True skips the request-local copy, so repeated reads see other workers' writes
+    if reference:
+        record = frappe.cache().get_value(get_key("reference", reference), expires=True)
+        if record:
+            return record
+    if invoice:
+        return frappe.cache().get_value(get_key("invoice", invoice), expires=True)
+    return None
+
+
+def write_record(reference, status, invoices=None, **extra):
+    """Merge an update into the record and store it under the reference and each invoice"""
+    invoices = list(invoices or [])
+    existing = get_record(reference, invoices[0] if invoices else None) or {}
+
+    # A new reference for the invoice starts a fresh record
+    if reference and existing.get("reference") not in (None, reference):
+        existing = {}
+
+    # The webhook's write can land after the consumer has already posted the payment
+    if status == "Processing" and existing.get("status") == "Paid":
+        return existing
+
+    record = dict(existing, **extra)
+    record.update({
+        "reference": reference or existing.get("reference"),
+        "invoices": list(dict.fromkeys((existing.get("invoices") or []) + invoices)),
+        "status": status,
+        "etag": frappe.generate_hash(length=12),
+        "updated_at": str(now_datetime())
+    })
+
+    cache = frappe.cache()
+    if record["reference"]:
+        cache.set_value(get_key("reference", record["reference"]), record, expires_in_sec=STATUS_TTL)
+    for invoice in record["invoices"]:
+        cache.set_value(get_key("invoice", invoice), record, expires_in_sec=STATUS_TTL)
+
+    return record
+
+
+def set_payment_status(reference, status, invoices=None, after_commit=True, **extra):
+    """Record a payment status for pollers, by default only once the current transaction commits"""
+    if not (reference or invoices):
+        return
+
+    if after_commit:
+        savepoints.after_commit(lambda: write_record(reference, status, invoices, **extra))
+    else:
+        write_record(reference, status, invoices, **extra)
+
+
+def load_record(reference=None, invoice=None):
+    """Rebuild a missing record from the database; the only path that queries it"""
+    if invoice:
+        row = frappe.db.get_value(
+            "Sales Invoice",
+            invoice,
+            ["terminal_reference", "paystack_status"],
+            as_dict=True
+        )
+        if not row:
+            return None
+        return write_record(row.terminal_reference, row.paystack_status or "Not Started", [invoice])
+
+    from paystack_terminal.ledger import get_transaction
+
+    transaction = get_transaction(reference)
+    if not transaction:
+        return None
+    return write_record(
+        reference,
+        LEDGER_STATUS.get(transaction.status, transaction.status),
+        [transaction.sales_invoice] if transaction.sales_invoice else None,
+        payment_entry=transaction.payment_entry
+    )
+
+
+def set_etag_header(etag):
+    headers = getattr(frappe.local, "response_headers", None)
+    if headers is not None:
+        headers.set("ETag", f'"{etag}"')
+
+
+def get_if_none_match():
+    etag = frappe.get_request_header("If-None-Match") if getattr(frappe.local, "request", None) else None
+    return (etag or "").replace("W/", "").strip('"') or None
+
+
+def check_permission(record, invoice=None):
+    """Only users who can read every invoice on the payment see its status"""
+    invoices = set(record.get("invoices") or [])
+    if invoice:
+        invoices.add(invoice)
+    if not invoices:
+        frappe.has_permission("Sales Invoice", "read", throw=True)
+    for name in invoices:
+        frappe.has_permission("Sales Invoice", "read", name, throw=True)
+
+
+def acquire_wait_slot():
+    """Count a long-poll against the user's limit; False when the user is already at it"""
+    key = frappe.cache().make_key(WAITERS_KEY.format(frappe.session.user))
+    waiters = frappe.cache().incr(key)
+    # Slots left behind by a killed request expire on their own
+    frappe.cache().expire(key, MAX_WAIT * 2)
+    if waiters > MAX_WAITS_PER_USER:
+        release_wait_slot()
+        return False
+    return True
+
+
+def release_wait_slot():
+    frappe.cache().decr(frappe.cache().make_key(WAITERS_KEY.format(frappe.session.user)))
+
+
+@frappe.whitelist()
+def get_payment_status(reference=None, invoice=None, etag=None, wait=0):
+    """Current payment status for a Paystack reference or Sales Invoice.
+
+    Pass the last ETag (If-None-Match header or etag argument) and wait=N to
+    block for up to N seconds until the status changes; an unchanged status
+    returns HTTP 304. A user already holding MAX_WAITS_PER_USER waits gets an
+    immediate answer instead.
+    """
+    if not (reference or invoice):
+        frappe.throw(_("Pass a Paystack reference or a Sales Invoice"))
+    if invoice:
+        frappe.has_permission("Sales Invoice", "read", invoice, throw=True)
+
+    etag = etag or get_if_none_match()
+    wait = min(max(flt(wait), 0), MAX_WAIT)
+
+    record = get_record(reference, invoice) or load_record(reference, invoice)
+    if not record:
+        frappe.throw(_("No Paystack payment found"), frappe.DoesNotExistError)
+    check_permission(record, invoice)
+
+    if etag and record["etag"] == etag and wait and acquire_wait_slot():
+        deadline = time.monotonic() + wait
+        try:
+            while record["etag"] == etag and time.monotonic() < deadline:
+                time.sleep(POLL_INTERVAL)
+                record = get_record(reference, invoice) or record
+        finally:
+            release_wait_slot()
+        # The invoices on a reference can grow while waiting, e.g. a consolidated charge
+        check_permission(record, invoice)
+
+    set_etag_header(record["etag"])
+    if etag and record["etag"] == etag:
+        frappe.local.response.http_status_code = 304
+        return None
+
+    return record
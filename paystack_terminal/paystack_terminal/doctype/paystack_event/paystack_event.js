@@ -0,0 +1,12 @@
+frappe.ui.form.on('Paystack Event', {
+    refresh: function(frm) {
+        if(frm.doc.status !== 'Pending') {
+            frm.add_custom_button(__('Replay'), function() {
+                frm.call('replay').then(() => {
+                    frappe.show_alert({message: __('Event queued for replay'), indicator: 'green'});
+                    frm.reload_doc();
+                });
+            });
+        }
+    }
+});
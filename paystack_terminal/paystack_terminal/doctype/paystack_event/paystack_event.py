@@ -0,0 +1,17 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Append-only journal of verified Paystack webhook events
+"""
+
+import frappe
+from frappe.model.document import Document
+
+class PaystackEvent(Document):
+    @frappe.whitelist()
+    def replay(self):
+        """Queue this event for processing again"""
+        frappe.only_for("System Manager")
+        
+        from paystack_terminal.events import replay_events
+        replay_events(names=[self.name])
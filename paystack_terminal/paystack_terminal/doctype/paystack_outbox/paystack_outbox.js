@@ -0,0 +1,12 @@
+frappe.ui.form.on('Paystack Outbox', {
+    refresh: function(frm) {
+        if(['Failed', 'Dead'].includes(frm.doc.status)) {
+            frm.add_custom_button(__('Retry'), function() {
+                frm.call('retry').then(() => {
+                    frappe.show_alert({message: __('Entry queued for delivery'), indicator: 'green'});
+                    frm.reload_doc();
+                });
+            });
+        }
+    }
+});
@@ -0,0 +1,17 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Outbound Paystack calls written alongside the state change that needs them
+"""
+
+import frappe
+from frappe.model.document import Document
+
+class PaystackOutbox(Document):
+    @frappe.whitelist()
+    def retry(self):
+        """Queue this entry for delivery again"""
+        frappe.only_for("System Manager")
+
+        from paystack_terminal.outbox import retry_entries
+        retry_entries([self.name])
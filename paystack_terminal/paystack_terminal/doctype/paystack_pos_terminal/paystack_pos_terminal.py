@@ -0,0 +1,20 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: A Paystack POS device that checkouts can be dispatched to
+"""
+
+from frappe.model.document import Document
+from paystack_terminal.dispatcher import clear_terminal_cache
+from paystack_terminal.terminal_status import describe_status, get_cached_status
+
+class PaystackPOSTerminal(Document):
+    @property
+    def presence_status(self):
+        return describe_status(get_cached_status(self.terminal_id))
+    
+    def on_update(self):
+        clear_terminal_cache()
+    
+    def on_trash(self):
+        clear_terminal_cache()
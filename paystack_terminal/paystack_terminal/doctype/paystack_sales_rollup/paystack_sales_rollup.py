@@ -0,0 +1,13 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Daily Paystack takings per company, terminal and cashier
+"""
+
+from frappe.model.document import Document
+from paystack_terminal.rollups import get_rollup_name
+
+class PaystackSalesRollup(Document):
+    def autoname(self):
+        # One row per bucket, so concurrent writers converge on the same name
+        self.name = get_rollup_name(self.posting_date, self.company, self.terminal_id, self.cashier)
@@ -7,45 +7,87 @@ Description: A custom module for integrating Paystack Terminal with ERPNext
 import frappe
 from frappe import _
 from frappe.model.document import Document
-import requests
+from paystack_terminal.circuit_breaker import describe_states
+from paystack_terminal.client import PaystackClient
+from paystack_terminal.queues import describe_queues
+from paystack_terminal.reconciliation import get_cursor
+from paystack_terminal.settings import clear_settings_cache
+from paystack_terminal.terminal_status import (
+    describe_status,
+    get_cached_status,
+    get_terminal_status,
+    refresh_terminal_status,
+)
 
 class PaystackSettings(Document):
+    @property
+    def circuit_breaker_status(self):
+        return describe_states()
+        
+    @property
+    def queue_status(self):
+        return describe_queues()
+        
+    @property
+    def reconciliation_cursor_timestamp(self):
+        cursor = get_cursor()
+        return cursor[0] if cursor else None
+        
+    @property
+    def reconciliation_cursor_id(self):
+        cursor = get_cursor()
+        return cursor[1] if cursor else None
+        
+    def onload(self):
+        # Show the cached presence rather than whatever was stored on last save
+        if self.enabled and self.terminal_id:
+            self.terminal_status = describe_status(get_cached_status(self.terminal_id))
+            
     def validate(self):
         if self.enabled:
             if not self.secret_key:
                 frappe.throw(_("Secret Key is required"))
-            if not self.terminal_id:
+            if not self.terminal_id and not frappe.db.exists("Paystack POS Terminal", {"enabled": 1}):
                 frappe.throw(_("Terminal ID is required"))
             if not self.public_key:
                 frappe.throw(_("Public Key is required"))
             
-            # Check terminal status
-            self.check_terminal_status()
+            # Only go live when credentials changed or the cached entry is stale
+            if self.terminal_id:
+                if any(self.has_value_changed(field) for field in ("terminal_id", "secret_key", "api_base_url")):
+                    self.check_terminal_status()
+                else:
+                    self.terminal_status = describe_status(
+                        get_terminal_status(self.terminal_id, self.get_client())
+                    )
             
             # Set webhook URL
             self.webhook_url = f"{frappe.utils.get_url()}/api/method/paystack_terminal.api.handle_webhook"
     
+    def on_update(self):
+        clear_settings_cache()
+        # Clear again once committed, in case another worker re-cached the old row meanwhile
+        frappe.db.after_commit.add(clear_settings_cache)
+    
+    def get_client(self):
+        """Client for the credentials being saved, which the cached settings do not have yet"""
+        return PaystackClient(
+            self.get_password('secret_key'),
+            base_url=self.api_base_url or frappe.conf.get("paystack_base_url")
+        )
+    
     def check_terminal_status(self):
         """Check if terminal is available"""
         try:
-            headers = {
-                "Authorization": f"Bearer {self.get_password('secret_key')}",
-                "Content-Type": "application/json"
-            }
+            client = self.get_client()
             
             # Check terminal presence instead of just status
-            terminal_url = f"https://api.paystack.co/terminal/{self.terminal_id}/presence"
-            response = requests.get(terminal_url, headers=headers)
+            status = refresh_terminal_status(self.terminal_id, client)
+            self.terminal_status = describe_status(status)
             
-            if response.status_code == 200:
-                data = response.json()["data"]
-                if data.get("online") and data.get("available"):
-                    self.terminal_status = "Connected"
-                else:
-                    self.terminal_status = "Busy"
-                    frappe.msgprint(_("Terminal is online but busy processing another payment"))
-            else:
-                self.terminal_status = "Disconnected"
+            if self.terminal_status == "Busy":
+                frappe.msgprint(_("Terminal is online but busy processing another payment"))
+            elif self.terminal_status != "Connected":
                 frappe.msgprint(_("Could not connect to Paystack Terminal"))
         except Exception as e:
             self.terminal_status = "Error"
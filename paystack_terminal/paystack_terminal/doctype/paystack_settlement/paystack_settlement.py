@@ -0,0 +1,10 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: A Paystack payout and how its transactions matched our Payment Entries
+"""
+
+from frappe.model.document import Document
+
+class PaystackSettlement(Document):
+    pass
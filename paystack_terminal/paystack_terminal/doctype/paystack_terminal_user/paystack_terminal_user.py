@@ -0,0 +1,10 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Users who prefer a given Paystack POS Terminal
+"""
+
+from frappe.model.document import Document
+
+class PaystackTerminalUser(Document):
+    pass
@@ -0,0 +1,10 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Ledger of Paystack references, keyed by the reference itself
+"""
+
+from frappe.model.document import Document
+
+class PaystackTransaction(Document):
+    pass
@@ -0,0 +1,10 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Invoices settled by one consolidated Paystack reference
+"""
+
+from frappe.model.document import Document
+
+class PaystackTransactionInvoice(Document):
+    pass
@@ -0,0 +1,92 @@
+frappe.pages['paystack-metrics'].on_page_load = function(wrapper) {
+    const page = frappe.ui.make_app_page({
+        parent: wrapper,
+        title: __('Paystack Metrics'),
+        single_column: true
+    });
+
+    const $body = $('<div class="paystack-metrics"></div>').appendTo(page.main);
+
+    const format_bound = function(bound) {
+        return bound === '+Inf' ? '> 900' : bound;
+    };
+
+    const format_labels = function(labels) {
+        return Object.keys(labels).map(key => `${key}=${labels[key]}`).join(', ') || '-';
+    };
+
+    const render = function(summary) {
+        const groups = {};
+        summary.histograms.forEach(row => {
+            (groups[row.name] = groups[row.name] || []).push(row);
+        });
+
+        let html = '';
+        Object.keys(groups).forEach(name => {
+            const rows = groups[name];
+            const is_size = name.endsWith('_batch_size');
+            html += `<h5 class="mt-4">${frappe.utils.escape_html(rows[0].help)}</h5>
+                <table class="table table-bordered table-sm">
+                <thead><tr>
+                    <th>${__('Labels')}</th><th class="text-right">${__('Count')}</th>
+                    <th class="text-right">${is_size ? __('Mean') : __('Mean (s)')}</th>
+                    <th class="text-right">${is_size ? __('p50 up to') : __('p50 up to (s)')}</th>
+                    <th class="text-right">${is_size ? __('p95 up to') : __('p95 up to (s)')}</th>
+                </tr></thead><tbody>`;
+            rows.forEach(row => {
+                html += `<tr>
+                    <td>${frappe.utils.escape_html(format_labels(row.labels))}</td>
+                    <td class="text-right">${row.count}</td>
+                    <td class="text-right">${row.mean.toFixed(3)}</td>
+                    <td class="text-right">${format_bound(row.p50)}</td>
+                    <td class="text-right">${format_bound(row.p95)}</td>
+                </tr>`;
+            });
+            html += '</tbody></table>';
+        });
+
+        const terminals = {};
+        summary.gauges.forEach(row => {
+            const terminal = row.labels.terminal;
+            terminals[terminal] = terminals[terminal] || {};
+            terminals[terminal][row.name] = row.value;
+        });
+
+        if (Object.keys(terminals).length) {
+            html += `<h5 class="mt-4">${__('Terminals')}</h5>
+                <table class="table table-bordered table-sm">
+                <thead><tr><th>${__('Terminal')}</th><th>${__('Online')}</th><th>${__('Available')}</th></tr></thead><tbody>`;
+            Object.keys(terminals).sort().forEach(terminal => {
+                const row = terminals[terminal];
+                html += `<tr>
+                    <td>${frappe.utils.escape_html(terminal)}</td>
+                    <td>${row.paystack_terminal_online ? __('Yes') : __('No')}</td>
+                    <td>${row.paystack_terminal_available ? __('Yes') : __('No')}</td>
+                </tr>`;
+            });
+            html += '</tbody></table>';
+        }
+
+        $body.html(html || `<p class="text-muted">${__('No Paystack activity recorded yet')}</p>`);
+    };
+
+    const refresh = function() {
+        frappe.call('paystack_terminal.metrics.get_metrics_summary').then(r => render(r.message));
+    };
+
+    page.set_primary_action(__('Refresh'), refresh);
+    page.add_menu_item(__('Reset Metrics'), function() {
+        frappe.confirm(__('Clear all recorded Paystack metrics?'), function() {
+            frappe.call('paystack_terminal.metrics.reset_metrics').then(refresh);
+        });
+    });
+    page.add_menu_item(__('Prometheus Export'), function() {
+        window.open('/api/method/paystack_terminal.metrics.export_metrics');
+    });
+
+    refresh();
+    // Keep the numbers current while the page is open
+    setInterval(function() {
+        if (frappe.get_route_str() === 'paystack-metrics') refresh();
+    }, 15000);
+};
@@ -0,0 +1,40 @@
+frappe.query_reports["Paystack Terminal Sales"] = {
+    filters: [
+        {
+            fieldname: "from_date",
+            label: __("From Date"),
+            fieldtype: "Date",
+            default: frappe.datetime.add_days(frappe.datetime.get_today(), -30)
+        },
+        {
+            fieldname: "to_date",
+            label: __("To Date"),
+            fieldtype: "Date",
+            default: frappe.datetime.get_today()
+        },
+        {
+            fieldname: "company",
+            label: __("Company"),
+            fieldtype: "Link",
+            options: "Company"
+        },
+        {
+            fieldname: "terminal_id",
+            label: __("Terminal ID"),
+            fieldtype: "Data"
+        },
+        {
+            fieldname: "cashier",
+            label: __("Cashier"),
+            fieldtype: "Link",
+            options: "User"
+        },
+        {
+            fieldname: "group_by",
+            label: __("Group By"),
+            fieldtype: "Select",
+            options: ["Day", "Terminal", "Cashier", "Company", "Day and Terminal", "Day, Terminal and Cashier"],
+            default: "Day"
+        }
+    ]
+};
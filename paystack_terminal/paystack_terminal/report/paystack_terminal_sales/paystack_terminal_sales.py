@@ -0,0 +1,98 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Daily Paystack Terminal takings, read only from the sales rollup
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import flt
+
+ROLLUP_DOCTYPE = "Paystack Sales Rollup"
+
+# Group By option -> rollup columns that make up a row
+GROUPINGS = {
+    "Day": ["posting_date"],
+    "Terminal": ["terminal_id"],
+    "Cashier": ["cashier"],
+    "Company": ["company"],
+    "Day and Terminal": ["posting_date", "terminal_id"],
+    "Day, Terminal and Cashier": ["posting_date", "company", "terminal_id", "cashier"]
+}
+
+DIMENSION_COLUMNS = {
+    "posting_date": {"label": _("Date"), "fieldname": "posting_date", "fieldtype": "Date", "width": 110},
+    "company": {"label": _("Company"), "fieldname": "company", "fieldtype": "Link", "options": "Company", "width": 160},
+    "terminal_id": {"label": _("Terminal ID"), "fieldname": "terminal_id", "fieldtype": "Data", "width": 140},
+    "cashier": {"label": _("Cashier"), "fieldname": "cashier", "fieldtype": "Link", "options": "User", "width": 180}
+}
+
+
+def execute(filters=None):
+    filters = frappe._dict(filters or {})
+    dimensions = GROUPINGS.get(filters.group_by) or GROUPINGS["Day"]
+
+    data = get_data(filters, dimensions)
+    return get_columns(dimensions), data, None, get_chart(data, dimensions)
+
+
+def get_columns(dimensions):
+    return [DIMENSION_COLUMNS[dimension] for dimension in dimensions] + [
+        {"label": _("Payments"), "fieldname": "payment_count", "fieldtype": "Int", "width": 90},
+        {"label": _("Gross"), "fieldname": "gross", "fieldtype": "Currency", "width": 130},
+        {"label": _("Fees"), "fieldname": "fees", "fieldtype": "Currency", "width": 110},
+        {"label": _("Net"), "fieldname": "net", "fieldtype": "Currency", "width": 130},
+        {"label": _("Pending"), "fieldname": "pending_count", "fieldtype": "Int", "width": 80},
+        {"label": _("Failed"), "fieldname": "failed_count", "fieldtype": "Int", "width": 80}
+    ]
+
+
+def get_filters(filters):
+    conditions = {}
+    if filters.from_date and filters.to_date:
+        conditions["posting_date"] = ["between", [filters.from_date, filters.to_date]]
+    elif filters.from_date:
+        conditions["posting_date"] = [">=", filters.from_date]
+    elif filters.to_date:
+        conditions["posting_date"] = ["<=", filters.to_date]
+
+    for fieldname in ("company", "terminal_id", "cashier"):
+        if filters.get(fieldname):
+            conditions[fieldname] = filters.get(fieldname)
+    return conditions
+
+
+def get_data(filters, dimensions):
+    rows = frappe.get_all(
+        ROLLUP_DOCTYPE,
+        filters=get_filters(filters),
+        fields=dimensions + [
+            "sum(payment_count) as payment_count",
+            "sum(gross_kobo) as gross_kobo",
+            "sum(fees_kobo) as fees_kobo",
+            "sum(pending_count) as pending_count",
+            "sum(failed_count) as failed_count"
+        ],
+        group_by=", ".join(dimensions),
+        order_by=", ".join(dimensions)
+    )
+
+    for row in rows:
+        row.gross = flt(row.gross_kobo) / 100
+        row.fees = flt(row.fees_kobo) / 100
+        row.net = row.gross - row.fees
+    return rows
+
+
+def get_chart(data, dimensions):
+    if not data or dimensions != ["posting_date"]:
+        return None
+
+    return {
+        "data": {
+            "labels": [frappe.format(row.posting_date, {"fieldtype": "Date"}) for row in data],
+            "datasets": [{"name": _("Gross"), "values": [row.gross for row in data]}]
+        },
+        "type": "bar",
+        "fieldtype": "Currency"
+    }
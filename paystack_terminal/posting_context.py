@@ -0,0 +1,68 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Cached per-company accounts and currency used when posting Payment Entries
+"""
+
+import frappe
+from frappe import _
+
+MODE_OF_PAYMENT = "Paystack Terminal"
+CACHE_KEY = "paystack_terminal:posting_context"
+
+
+def ensure_mode_of_payment():
+    if not frappe.db.exists("Mode of Payment", MODE_OF_PAYMENT):
+        frappe.get_doc({
+            "doctype": "Mode of Payment",
+            "mode_of_payment": MODE_OF_PAYMENT,
+            "type": "Bank",
+            "enabled": 1
+        }).insert(ignore_permissions=True)
+
+
+def build_posting_context(company):
+    """Resolve currency and accounts for a company from the database"""
+    ensure_mode_of_payment()
+
+    company_details = frappe.db.get_value(
+        "Company",
+        company,
+        ["default_currency", "default_bank_account", "default_receivable_account"],
+        as_dict=True
+    )
+    if not company_details:
+        frappe.throw(_("Company {0} not found").format(company))
+
+    paid_to = frappe.db.get_value(
+        "Mode of Payment Account",
+        {"parent": MODE_OF_PAYMENT, "company": company},
+        "default_account"
+    ) or company_details.default_bank_account
+
+    if not paid_to:
+        frappe.throw(_("Please set default bank account in Company or Mode of Payment"))
+
+    return {
+        "company": company,
+        "currency": company_details.default_currency,
+        "paid_to": paid_to,
+        "paid_from": company_details.default_receivable_account,
+        "mode_of_payment": MODE_OF_PAYMENT
+    }
+
+
+def get_posting_context(company):
+    """Posting context for a company, served from the Redis hash when available"""
+    return frappe.cache().hget(CACHE_KEY, company, generator=lambda: build_posting_context(company))
+
+
+def clear_company_context(doc, method=None):
+    """Company doc event: drop that company's entry"""
+    frappe.cache().hdel(CACHE_KEY, doc.name)
+
+
+def clear_posting_context(doc=None, method=None):
+    """Mode of Payment doc event: accounts may have changed for any company"""
+    if doc is None or doc.name == MODE_OF_PAYMENT:
+        frappe.cache().delete_value(CACHE_KEY)
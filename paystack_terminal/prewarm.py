@@ -0,0 +1,181 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Prepare Paystack customers and payment requests when a Sales Invoice is submitted
+"""
+
+import frappe
+from frappe.utils import add_to_date, flt, now_datetime
+from paystack_terminal.client import PaystackAPIError, get_client
+from paystack_terminal.queues import BACKGROUND, INTERACTIVE, enqueue
+from paystack_terminal.settings import get_settings
+
+# Prewarmed requests older than this are archived and recreated at checkout
+PREWARM_TTL_HOURS = 12
+
+PREWARM_FIELDS = {
+    "paystack_request_id": None,
+    "paystack_offline_reference": None,
+    "paystack_prewarmed_amount": 0,
+    "paystack_prewarmed_on": None
+}
+
+
+def prewarm_on_submit(doc, method):
+    """Sales Invoice on_submit: prepare the Paystack side in the background"""
+    try:
+        settings = get_settings()
+        if not (settings.enabled and settings.get("prewarm_on_submit")):
+            return
+        if flt(doc.outstanding_amount) <= 0:
+            return
+
+        # Interactive lane: the cashier is usually about to check out
+        enqueue(
+            "paystack_terminal.prewarm.run_prewarm",
+            lane=INTERACTIVE,
+            job_id=f"paystack_prewarm::{doc.name}",
+            deduplicate=True,
+            enqueue_after_commit=True,
+            invoice=doc.name
+        )
+    except Exception as e:
+        # Never block invoice submission
+        frappe.logger().error(f"Prewarm Enqueue Error: {str(e)}")
+
+
+def run_prewarm(invoice):
+    """Ensure the Paystack customer exists and pre-create the payment request"""
+    from paystack_terminal.checkout import create_payment_request
+
+    try:
+        sales_invoice = frappe.get_doc("Sales Invoice", invoice)
+        if sales_invoice.docstatus != 1 or flt(sales_invoice.outstanding_amount) <= 0:
+            return
+        if sales_invoice.get("paystack_request_id") or sales_invoice.get("terminal_reference"):
+            return
+
+        amount = flt(sales_invoice.outstanding_amount)
+        client = get_client()
+        request_data = create_payment_request(client, sales_invoice, amount)
+
+        # A checkout may have committed its own request during the call; the locking read sees it
+        current = frappe.db.get_value(
+            "Sales Invoice",
+            invoice,
+            ["paystack_request_id", "terminal_reference"],
+            as_dict=True,
+            for_update=True
+        )
+        if current.paystack_request_id or current.terminal_reference:
+            archive_payment_request(client, request_data["id"])
+            return
+
+        frappe.db.set_value("Sales Invoice", invoice, {
+            "paystack_request_id": request_data["id"],
+            "paystack_offline_reference": request_data["offline_reference"],
+            "paystack_prewarmed_amount": amount,
+            "paystack_prewarmed_on": now_datetime()
+        }, update_modified=False)
+
+    except Exception as e:
+        frappe.logger().error(f"Prewarm Error for {invoice}: {str(e)}")
+
+
+def is_prewarm_usable(sales_invoice, amount):
+    """True if the invoice holds an unexpired prewarmed request for exactly this amount"""
+    if not (sales_invoice.get("paystack_offline_reference") and sales_invoice.get("paystack_prewarmed_on")):
+        return False
+    if flt(sales_invoice.paystack_prewarmed_amount) != flt(amount):
+        return False
+
+    return sales_invoice.paystack_prewarmed_on > add_to_date(now_datetime(), hours=-PREWARM_TTL_HOURS)
+
+
+def cleanup_on_cancel(doc, method):
+    """Sales Invoice on_cancel: archive an unused prewarmed request"""
+    if doc.get("paystack_offline_reference") and doc.get("paystack_request_id"):
+        enqueue(
+            "paystack_terminal.prewarm.archive_prewarmed_requests",
+            lane=BACKGROUND,
+            enqueue_after_commit=True,
+            invoices=[doc.name]
+        )
+
+
+def archive_prewarmed_requests(invoices):
+    """Archive prewarmed payment requests on Paystack and clear them from the invoices"""
+    rows = frappe.get_all(
+        "Sales Invoice",
+        filters={"name": ["in", invoices], "paystack_offline_reference": ["is", "set"]},
+        fields=["name", "paystack_request_id"]
+    )
+    if not rows:
+        return
+
+    client = get_client()
+    for row in rows:
+        archive_payment_request(client, row.paystack_request_id)
+        frappe.db.set_value("Sales Invoice", row.name, PREWARM_FIELDS, update_modified=False)
+
+
+def archive_payment_request(client, request_id):
+    try:
+        client.archive_payment_request(request_id)
+    except PaystackAPIError as e:
+        frappe.logger().info(f"Could not archive payment request {request_id}: {str(e)}")
+
+
+def archive_payment_requests(request_ids):
+    """Background job: archive requests already cleared from their invoices"""
+    client = get_client()
+    for request_id in request_ids:
+        archive_payment_request(client, request_id)
+
+
+def release_prewarmed_requests(invoices):
+    """Clear prewarmed requests from invoices about to be charged with another request.
+
+    The fields are reset in the caller's transaction and the requests are
+    archived after it commits, so the cleanup never touches the new request.
+    """
+    rows = frappe.get_all(
+        "Sales Invoice",
+        filters={"name": ["in", invoices], "paystack_offline_reference": ["is", "set"]},
+        fields=["name", "paystack_request_id"]
+    )
+    if not rows:
+        return
+
+    frappe.db.set_value("Sales Invoice", {"name": ["in", [row.name for row in rows]]}, PREWARM_FIELDS,
+        update_modified=False)
+    enqueue(
+        "paystack_terminal.prewarm.archive_payment_requests",
+        lane=BACKGROUND,
+        enqueue_after_commit=True,
+        request_ids=[row.paystack_request_id for row in rows if row.paystack_request_id]
+    )
+
+
+def cleanup_stale_prewarms():
+    """Scheduled cleanup of expired, cancelled or already paid prewarmed requests"""
+    try:
+        cutoff = add_to_date(now_datetime(), hours=-PREWARM_TTL_HOURS)
+        base_filters = {"paystack_offline_reference": ["is", "set"]}
+
+        stale = frappe.get_all(
+            "Sales Invoice",
+            filters=dict(base_filters, paystack_prewarmed_on=["<", cutoff]),
+            pluck="name"
+        )
+        stale += frappe.get_all(
+            "Sales Invoice",
+            filters=dict(base_filters, status=["in", ["Paid", "Cancelled", "Credit Note Issued"]]),
+            pluck="name"
+        )
+
+        if stale:
+            archive_prewarmed_requests(list(set(stale)))
+
+    except Exception as e:
+        frappe.logger().error(f"Prewarm Cleanup Error: {str(e)}")
@@ -19,4 +19,65 @@ paystack_terminal.process_payment = function(args, callback) {
             });
         }
     });
-}
\ No newline at end of file
+}
+
+// Charge several invoices of one customer with a single terminal payment
+paystack_terminal.process_consolidated_payment = function(invoices, callback) {
+    frappe.call({
+        method: 'paystack_terminal.api.process_consolidated_payment',
+        args: {invoices: invoices},
+        freeze: true,
+        freeze_message: __('Sending combined payment request to terminal...'),
+        callback: function(r) {
+            if (r.message && r.message.success) {
+                frappe.show_alert({
+                    message: __('Payment request for {0} sent to terminal', [format_currency(r.message.amount)]),
+                    indicator: 'green'
+                });
+                if (callback) callback(r.message);
+            }
+        }
+    });
+}
+
+// Queue the terminal push in the background; progress arrives via the
+// 'paystack_payment_status' realtime event
+paystack_terminal.process_payment_async = function(args, callback) {
+    frappe.call({
+        method: 'paystack_terminal.checkout.enqueue_terminal_payment',
+        args: args,
+        callback: function(r) {
+            if (r.message && r.message.success) {
+                if (callback) callback(r.message);
+            }
+        }
+    });
+}
+
+paystack_terminal.show_payment_status = function(frm, data) {
+    const indicators = {
+        request_created: 'blue',
+        pushed: 'orange',
+        paid: 'green',
+        failed: 'red'
+    };
+    const indicator = indicators[data.status] || 'blue';
+
+    if (data.status === 'failed') {
+        frm.dashboard.clear_headline();
+        frappe.msgprint({
+            title: __('Payment Failed'),
+            message: data.message || __('Could not process payment. Please try again.'),
+            indicator: indicator
+        });
+        frm.reload_doc();
+        return;
+    }
+
+    frm.dashboard.set_headline_alert(data.message, indicator);
+    frappe.show_alert({message: data.message, indicator: indicator});
+
+    if (data.status === 'paid' || data.status === 'pushed') {
+        frm.reload_doc();
+    }
+}
@@ -1,26 +1,23 @@
 frappe.ui.form.on('Sales Invoice', {
+    setup: function(frm) {
+        // Progress updates from the background checkout job
+        frappe.realtime.off('paystack_payment_status');
+        frappe.realtime.on('paystack_payment_status', function(data) {
+            if(!data || data.invoice !== cur_frm?.doc?.name) return;
+            paystack_terminal.show_payment_status(cur_frm, data);
+        });
+    },
     refresh: function(frm) {
         if(frm.doc.docstatus === 1 && frm.doc.status !== 'Paid') {
             frm.add_custom_button(__('Process Payment with Paystack Terminal'), function() {
-                frappe.call({
-                    method: 'paystack_terminal.api.process_terminal_payment',
-                    args: {
-                        invoice: frm.doc.name,
-                        amount: frm.doc.grand_total,
-                        customer: frm.doc.customer
-                    },
-                    freeze: true,
-                    freeze_message: __('Sending payment request to terminal...'),
-                    callback: function(r) {
-                        if(r.message && r.message.success) {
-                            frappe.show_alert({
-                                message: __('Payment request sent to terminal. Please complete payment on the POS device.'),
-                                indicator: 'green'
-                            });
-                        }
-                    }
+                paystack_terminal.process_payment_async({
+                    invoice: frm.doc.name,
+                    amount: frm.doc.outstanding_amount,
+                    customer: frm.doc.customer
+                }, function() {
+                    frm.dashboard.set_headline_alert(__('Sending payment request to terminal...'), 'blue');
                 });
             });
         }
     }
-});
\ No newline at end of file
+});
@@ -0,0 +1,20 @@
+frappe.listview_settings['Sales Invoice'] = frappe.listview_settings['Sales Invoice'] || {};
+
+const paystack_terminal_list_onload = frappe.listview_settings['Sales Invoice'].onload;
+
+frappe.listview_settings['Sales Invoice'].onload = function(listview) {
+    if (paystack_terminal_list_onload) paystack_terminal_list_onload(listview);
+
+    // One card tap for all of a patient's unpaid invoices
+    listview.page.add_action_item(__('Pay Together with Paystack Terminal'), function() {
+        const invoices = listview.get_checked_items(true);
+        if (invoices.length < 2) {
+            frappe.msgprint(__('Select at least two invoices to pay together'));
+            return;
+        }
+
+        paystack_terminal.process_consolidated_payment(invoices, function() {
+            listview.refresh();
+        });
+    });
+};
@@ -0,0 +1,130 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Dedicated, prioritized Paystack job queues and partitioned consumers
+
+Two lanes, listed in priority order. A worker started with
+
+    bench worker --queue paystack_interactive,paystack_background
+
+always drains the interactive lane first: checkouts, charge confirmations
+and terminal pushes run ahead of reconciliation, settlements and syncs.
+Sites without these queues in common_site_config's "workers" fall back to
+the shared short and long queues.
+"""
+
+import zlib
+from datetime import datetime
+
+import frappe
+from frappe.utils import now_datetime
+from paystack_terminal import metrics
+
+INTERACTIVE = "paystack_interactive"
+BACKGROUND = "paystack_background"
+LANES = (INTERACTIVE, BACKGROUND)
+FALLBACK_QUEUES = {INTERACTIVE: "short", BACKGROUND: "long"}
+
+# Events for one reference and pushes for one terminal always share a partition,
+# so a partition's single consumer keeps their order while partitions run in parallel
+PARTITIONS = 8
+
+
+def get_queue_name(lane):
+    """The dedicated queue for a lane when it is configured, else the shared queue"""
+    return lane if lane in (frappe.conf.get("workers") or {}) else FALLBACK_QUEUES[lane]
+
+
+def enqueue(method, lane=INTERACTIVE, **kwargs):
+    return frappe.enqueue(method, queue=get_queue_name(lane), **kwargs)
+
+
+def get_partition(key):
+    """Stable partition for a reference or terminal id"""
+    return zlib.crc32(str(key or "").encode()) % PARTITIONS
+
+
+def enqueue_incremental_reconciliation():
+    """Scheduled: run incremental reconciliation in the background lane"""
+    enqueue(
+        "paystack_terminal.reconciliation.run_incremental_reconciliation",
+        lane=BACKGROUND,
+        job_id="paystack_incremental_reconciliation",
+        deduplicate=True
+    )
+
+
+def enqueue_daily_reconciliation():
+    enqueue(
+        "paystack_terminal.api.reconcile_pending_payments",
+        lane=BACKGROUND,
+        job_id="paystack_daily_reconciliation",
+        deduplicate=True
+    )
+
+
+def enqueue_settlement_sync():
+    enqueue(
+        "paystack_terminal.settlements.run_settlement_sync",
+        lane=BACKGROUND,
+        job_id="paystack_settlement_sync",
+        deduplicate=True
+    )
+
+
+def get_lane_status(lane):
+    """Jobs waiting in a lane's queue and how long the oldest has waited, in seconds"""
+    from frappe.utils.background_jobs import get_queue
+
+    queue = get_queue(get_queue_name(lane))
+    oldest_wait = 0
+    job_ids = queue.get_job_ids(0, 1)
+    if job_ids:
+        job = queue.fetch_job(job_ids[0])
+        if job and job.enqueued_at:
+            # RQ stores naive UTC timestamps
+            oldest_wait = max(0, (datetime.utcnow() - job.enqueued_at).total_seconds())
+
+    return {"queue": queue.name, "depth": queue.count, "oldest_wait": oldest_wait}
+
+
+def get_backlog(doctype):
+    """Due rows of a journal table (events or outbox): count and oldest wait in seconds"""
+    row = frappe.get_all(
+        doctype,
+        filters={"status": ["in", ["Pending", "Failed"]], "next_attempt_at": ["<=", now_datetime()]},
+        fields=["count(name) as due", "min(next_attempt_at) as oldest"]
+    )[0]
+    oldest_wait = (now_datetime() - row.oldest).total_seconds() if row.oldest else 0
+    return {"due": row.due or 0, "oldest_wait": max(0, oldest_wait)}
+
+
+def describe_queues():
+    """Queue depth and wait per lane plus the event and outbox backlogs, for Paystack Settings"""
+    lines = []
+    for lane in LANES:
+        try:
+            status = get_lane_status(lane)
+            lines.append(f"{lane} ({status['queue']}): {status['depth']} queued, "
+                f"oldest waiting {status['oldest_wait']:.0f}s")
+        except Exception as e:
+            lines.append(f"{lane}: unavailable ({str(e)})")
+
+    for label, doctype in (("Paystack Events", "Paystack Event"), ("Outbox", "Paystack Outbox")):
+        backlog = get_backlog(doctype)
+        lines.append(f"{label}: {backlog['due']} due, oldest waiting {backlog['oldest_wait']:.0f}s")
+
+    # Measured waits since the metrics were last reset, per consumer
+    name = "paystack_queue_wait_seconds"
+    try:
+        histograms = metrics.get_histograms(name, metrics.read_all()[name])
+    except Exception as e:
+        histograms = {}
+        lines.append(f"Wait metrics unavailable ({str(e)})")
+
+    for labels, entry in sorted(histograms.items()):
+        queue = metrics.decode_labels(labels).get("queue")
+        p95 = metrics.estimate_quantile(entry["buckets"], entry["count"], 0.95)
+        lines.append(f"Wait p95 ({queue}): up to {p95}s over {int(entry['count'])} jobs")
+
+    return "\n".join(lines)
@@ -0,0 +1,283 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Bulk reconciliation of Sales Invoices against Paystack transactions
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import frappe
+from frappe.utils import cint
+from paystack_terminal import metrics
+from paystack_terminal.client import PaystackAPIError, get_client, get_thread_pool
+from paystack_terminal.locks import extend_reference_locks
+from paystack_terminal.savepoints import savepoint
+from paystack_terminal.settings import get_settings
+
+DEFAULT_CONCURRENCY = 4
+REFERENCE_CHUNK_SIZE = 500
+
+LOCK_KEY = "paystack_terminal:reconciliation"
+LOCK_TIMEOUT = 15 * 60
+
+CURSOR_KEY = "paystack_reconciliation_cursor"
+
+# The checkpoint is on createdAt, so each run lists this far behind it again: a charge that only
+# turns successful later, e.g. a delayed terminal approval, is still picked up
+OVERLAP_MINUTES = 60
+
+
+def get_pending_invoices(since):
+    """Unpaid Sales Invoices that were pushed to a terminal"""
+    return frappe.get_all(
+        "Sales Invoice",
+        filters={
+            "terminal_reference": ["!=", ""],
+            "status": "Unpaid",
+            "creation": [">=", since]
+        },
+        fields=["name", "terminal_reference", "grand_total"]
+    )
+
+
+def build_transaction_index(client, since, until=None):
+    """Page through successful Paystack transactions and index them by reference"""
+    params = {"status": "success", "from": str(since)}
+    if until:
+        params["to"] = str(until)
+
+    return {
+        txn["reference"]: txn
+        for txn in client.iter_transactions(**params)
+        if txn.get("reference")
+    }
+
+
+def verify_references(client, references, concurrency=DEFAULT_CONCURRENCY):
+    """Verify references concurrently, returning {reference: transaction} for the ones found"""
+
+    def verify(reference):
+        try:
+            return reference, client.verify_transaction(reference)
+        except PaystackAPIError as e:
+            frappe.logger().info(f"Could not verify {reference}: {str(e)}")
+            return reference, None
+
+    # Worker threads only do HTTP; all database work stays on the calling thread
+    with get_thread_pool(concurrency) as executor:
+        results = executor.map(verify, references)
+        return {reference: txn for reference, txn in results if txn}
+
+
+def get_existing_references(references):
+    """References that already have a Payment Entry"""
+    if not references:
+        return set()
+
+    return set(frappe.get_all(
+        "Payment Entry",
+        filters={"reference_no": ["in", list(references)], "docstatus": ["!=", 2]},
+        pluck="reference_no"
+    ))
+
+
+@metrics.timed("paystack_reconciliation_duration_seconds", mode="sweep")
+def reconcile(since, until=None, settings=None, concurrency=None):
+    """Reconcile pending invoices in one pass over the Paystack transaction list"""
+    if settings is None:
+        settings = get_settings()
+    if concurrency is None:
+        concurrency = settings.get("reconciliation_concurrency") or DEFAULT_CONCURRENCY
+
+    summary = {"pending": 0, "indexed": 0, "verified": 0, "reconciled": 0, "failed": 0}
+
+    pending_invoices = get_pending_invoices(since)
+    summary["pending"] = len(pending_invoices)
+    metrics.observe("paystack_reconciliation_batch_size", len(pending_invoices), mode="sweep")
+    if not pending_invoices:
+        return summary
+
+    client = get_client(settings)
+    index = build_transaction_index(client, since, until)
+    summary["indexed"] = len(index)
+
+    # Fall back to verify only for references the list did not return
+    missing = [inv.terminal_reference for inv in pending_invoices if inv.terminal_reference not in index]
+    if missing:
+        verified = verify_references(client, missing, concurrency)
+        summary["verified"] = len(verified)
+        index.update(verified)
+
+    post_matches(pending_invoices, index, summary)
+    return summary
+
+
+def post_matches(invoices, index, summary):
+    """Create Payment Entries for invoices whose reference has a successful transaction.
+
+    Returns the set of references that failed to post.
+    """
+    from paystack_terminal.api import create_payment_entry
+
+    failed = set()
+    existing = get_existing_references([inv.terminal_reference for inv in invoices])
+
+    for invoice in invoices:
+        txn = index.get(invoice.terminal_reference)
+        if not txn or txn.get("status") != "success" or invoice.terminal_reference in existing:
+            continue
+
+        extend_reference_locks()
+        try:
+            with savepoint("paystack_reconcile"):
+                create_payment_entry(
+                    reference=invoice.terminal_reference,
+                    amount=invoice.grand_total,
+                    invoice=invoice.name,
+                    fees_kobo=txn.get("fees")
+                )
+            existing.add(invoice.terminal_reference)
+            summary["reconciled"] += 1
+            frappe.logger().info(f"Reconciled payment for invoice {invoice.name}")
+        except Exception as e:
+            failed.add(invoice.terminal_reference)
+            summary["failed"] += 1
+            frappe.logger().error(f"Error reconciling invoice {invoice.name}: {str(e)}")
+
+    return failed
+
+
+def parse_timestamp(value):
+    """Parse a Paystack ISO-8601 timestamp such as 2025-01-02T10:11:12.000Z, assuming UTC if naive"""
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def get_transaction_key(txn):
+    """Sort key that orders transactions the same way the cursor does"""
+    return parse_timestamp(txn.get("createdAt") or txn.get("created_at")), int(txn.get("id") or 0)
+
+
+def get_cursor():
+    """Return the persisted (timestamp, transaction id) watermark, or None"""
+    # Its own record rather than a Paystack Settings field, so saving a stale form never moves it.
+    # Read straight from the table: the cursor moves every run and skips the defaults cache
+    value = frappe.db.get_value("DefaultValue", {"parent": "__global", "defkey": CURSOR_KEY}, "defvalue")
+    if not value:
+        return None
+
+    timestamp, transaction_id = json.loads(value)
+    return timestamp, cint(transaction_id)
+
+
+def set_cursor(timestamp, transaction_id):
+    """Persist the watermark; it is committed together with the Payment Entries it covers"""
+    frappe.db.set_global(CURSOR_KEY, json.dumps([timestamp, cint(transaction_id)]))
+
+
+def get_lock():
+    """The lock every incremental run holds, scheduled or from the command line"""
+    return frappe.cache().lock(frappe.cache().make_key(LOCK_KEY), timeout=LOCK_TIMEOUT)
+
+
+def get_invoices_for_references(references):
+    """Unpaid Sales Invoices for the given terminal references"""
+    invoices = []
+    for chunk in chunked(list(references), REFERENCE_CHUNK_SIZE):
+        invoices += frappe.get_all(
+            "Sales Invoice",
+            filters={
+                "terminal_reference": ["in", chunk],
+                "status": ["in", ["Unpaid", "Overdue", "Partly Paid"]],
+                "docstatus": 1
+            },
+            fields=["name", "terminal_reference", "grand_total"]
+        )
+    return invoices
+
+
+def chunked(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+@metrics.timed("paystack_reconciliation_duration_seconds", mode="incremental")
+def reconcile_incremental(settings=None, cursor=None, persist=True):
+    """Reconcile only the transactions after the watermark, then advance it.
+
+    cursor overrides the persisted watermark; persist=False leaves it untouched.
+    """
+    if settings is None:
+        settings = get_settings()
+    if cursor is None:
+        cursor = get_cursor()
+    if cursor is None:
+        since = datetime.now(timezone.utc) - timedelta(days=1)
+        cursor = (since.strftime("%Y-%m-%dT%H:%M:%SZ"), 0)
+
+    summary = {"fetched": 0, "rechecked": 0, "matched": 0, "reconciled": 0, "failed": 0, "cursor": cursor}
+
+    cursor_key = (parse_timestamp(cursor[0]), cint(cursor[1]))
+    list_from = (cursor_key[0] - timedelta(minutes=OVERLAP_MINUTES)).astimezone(timezone.utc)
+
+    client = get_client(settings)
+    delta, overlap = [], []
+    for txn in client.iter_transactions(status="success", **{"from": list_from.strftime("%Y-%m-%dT%H:%M:%SZ")}):
+        if txn.get("reference"):
+            (delta if get_transaction_key(txn) > cursor_key else overlap).append(txn)
+
+    summary["fetched"] = len(delta)
+    summary["rechecked"] = len(overlap)
+    metrics.observe("paystack_reconciliation_batch_size", len(delta), mode="incremental")
+    if not (delta or overlap):
+        return summary
+
+    delta.sort(key=get_transaction_key)
+    # Overlap transactions already posted drop out: their invoices are paid and their references have entries
+    index = {txn["reference"]: txn for txn in overlap + delta}
+
+    invoices = get_invoices_for_references(index)
+    summary["matched"] = len(invoices)
+    failed = post_matches(invoices, index, summary)
+
+    # Advance up to, but not past, the oldest new transaction that failed to post; a failed overlap
+    # transaction is retried by the next run's overlap and the daily sweep
+    new_cursor = None
+    for txn in delta:
+        if txn["reference"] in failed:
+            break
+        new_cursor = (txn.get("createdAt") or txn.get("created_at"), cint(txn.get("id")))
+
+    if new_cursor:
+        summary["cursor"] = new_cursor
+        if persist:
+            set_cursor(*new_cursor)
+
+    return summary
+
+
+def run_incremental_reconciliation():
+    """Scheduled entry point: incremental reconciliation guarded by a Redis lock"""
+    try:
+        settings = get_settings()
+        if not settings.enabled:
+            return
+
+        lock = get_lock()
+        if not lock.acquire(blocking=False):
+            frappe.logger().info("Paystack reconciliation already running, skipping")
+            return
+
+        try:
+            summary = reconcile_incremental(settings)
+            frappe.db.commit()
+            frappe.logger().info(f"Paystack incremental reconciliation summary: {summary}")
+        finally:
+            lock.release()
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.logger().error(f"Incremental Reconciliation Error: {str(e)}")
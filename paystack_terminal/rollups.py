@@ -0,0 +1,182 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Incrementally maintained daily takings per company, terminal and cashier
+"""
+
+import hashlib
+
+import frappe
+from frappe.utils import cint, flt, getdate
+
+ROLLUP_DOCTYPE = "Paystack Sales Rollup"
+MEASURES = ("payment_count", "gross_kobo", "gross_amount", "fees_kobo", "pending_count", "failed_count")
+
+# Ledger status -> counter an unpaid charge occupies on the day it started
+OPEN_COUNTERS = {"Pending": "pending_count", "Failed": "failed_count"}
+
+
+def get_rollup_name(posting_date, company, terminal_id, cashier):
+    key = "|".join(str(part or "") for part in (getdate(posting_date), company, terminal_id, cashier))
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+
+def add_to_rollup(posting_date, company, terminal_id, cashier, **deltas):
+    """Add deltas to one bucket with a single in-place UPDATE, creating the row on first use"""
+    deltas = {field: value for field, value in deltas.items() if field in MEASURES and value}
+    if not deltas:
+        return
+
+    name = get_rollup_name(posting_date, company, terminal_id, cashier)
+    if not frappe.db.exists(ROLLUP_DOCTYPE, name):
+        frappe.get_doc({
+            "doctype": ROLLUP_DOCTYPE,
+            "posting_date": getdate(posting_date),
+            "company": company,
+            "terminal_id": terminal_id,
+            "cashier": cashier
+        }).insert(ignore_permissions=True, ignore_if_duplicate=True)
+
+    # Relative updates, so concurrent submits never overwrite each other's counts
+    assignments = ", ".join(f"`{field}` = `{field}` + %({field})s" for field in deltas)
+    frappe.db.sql(
+        f"update `tab{ROLLUP_DOCTYPE}` set {assignments} where name = %(name)s",
+        dict(deltas, name=name)
+    )
+
+
+def get_open_bucket(row):
+    counter = OPEN_COUNTERS.get(row.get("status")) if row else None
+    if not counter:
+        return None
+    return (getdate(row.get("creation")), row.get("company"), row.get("terminal_id"), row.get("cashier")), counter
+
+
+def update_open_charges(before, after):
+    """Move a ledger row between the pending and failed counters as its status changes"""
+    old, new = get_open_bucket(before), get_open_bucket(after)
+    if old == new:
+        return
+
+    if old:
+        add_to_rollup(*old[0], **{old[1]: -1})
+    if new:
+        add_to_rollup(*new[0], **{new[1]: 1})
+
+
+def add_payment(doc, sign=1):
+    from paystack_terminal.ledger import get_transaction, to_kobo
+
+    transaction = get_transaction(doc.reference_no) or frappe._dict()
+    fees_kobo = doc.flags.get("paystack_fees_kobo")
+    add_to_rollup(
+        doc.posting_date,
+        doc.company,
+        transaction.terminal_id,
+        transaction.cashier,
+        payment_count=sign,
+        gross_kobo=sign * to_kobo(doc.paid_amount),
+        gross_amount=sign * flt(doc.paid_amount),
+        fees_kobo=sign * cint(transaction.fees_kobo if fees_kobo is None else fees_kobo)
+    )
+
+
+def on_payment_entry_submit(doc, method):
+    """Payment Entry on_submit: count the payment on its posting day"""
+    if doc.mode_of_payment != "Paystack Terminal":
+        return
+
+    try:
+        add_payment(doc)
+    except Exception as e:
+        # The rebuild command repairs a missed update; never block the submission
+        frappe.logger().error(f"Paystack rollup update failed for {doc.name}: {str(e)}")
+
+
+def on_payment_entry_cancel(doc, method):
+    """Payment Entry on_cancel: take the payment back out of its day"""
+    if doc.mode_of_payment != "Paystack Terminal":
+        return
+
+    try:
+        add_payment(doc, sign=-1)
+    except Exception as e:
+        frappe.logger().error(f"Paystack rollup update failed for {doc.name}: {str(e)}")
+
+
+def rebuild_rollups(from_date=None, to_date=None):
+    """Recompute the rollup for a date range (everything by default) from Payment Entries and the ledger"""
+    from paystack_terminal.ledger import LEDGER_DOCTYPE
+
+    conditions, values = get_date_conditions(from_date, to_date)
+
+    frappe.db.sql(
+        f"delete from `tab{ROLLUP_DOCTYPE}` where 1=1 {conditions.format(column='posting_date')}",
+        values
+    )
+
+    buckets = {}
+
+    def add(key, **measures):
+        bucket = buckets.setdefault(key, dict.fromkeys(MEASURES, 0))
+        for field, value in measures.items():
+            bucket[field] += flt(value)
+
+    for row in frappe.db.sql(f"""
+        select pe.posting_date, pe.company, tx.terminal_id, tx.cashier,
+            count(*) as payment_count,
+            sum(round(pe.paid_amount * 100)) as gross_kobo,
+            sum(pe.paid_amount) as gross_amount,
+            sum(coalesce(tx.fees_kobo, 0)) as fees_kobo
+        from `tabPayment Entry` pe
+        left join `tab{LEDGER_DOCTYPE}` tx on tx.name = pe.reference_no
+        where pe.docstatus = 1 and pe.mode_of_payment = 'Paystack Terminal'
+            {conditions.format(column='pe.posting_date')}
+        group by pe.posting_date, pe.company, tx.terminal_id, tx.cashier
+    """, values, as_dict=True):
+        add(
+            (getdate(row.posting_date), row.company, row.terminal_id, row.cashier),
+            payment_count=row.payment_count,
+            gross_kobo=row.gross_kobo,
+            gross_amount=row.gross_amount,
+            fees_kobo=row.fees_kobo
+        )
+
+    for row in frappe.db.sql(f"""
+        select date(creation) as posting_date, company, terminal_id, cashier,
+            sum(case when status = 'Pending' then 1 else 0 end) as pending_count,
+            sum(case when status = 'Failed' then 1 else 0 end) as failed_count
+        from `tab{LEDGER_DOCTYPE}`
+        where status in ('Pending', 'Failed')
+            {conditions.format(column='date(creation)')}
+        group by date(creation), company, terminal_id, cashier
+    """, values, as_dict=True):
+        add(
+            (getdate(row.posting_date), row.company, row.terminal_id, row.cashier),
+            pending_count=row.pending_count,
+            failed_count=row.failed_count
+        )
+
+    for (posting_date, company, terminal_id, cashier), measures in buckets.items():
+        frappe.get_doc(dict(
+            measures,
+            doctype=ROLLUP_DOCTYPE,
+            posting_date=posting_date,
+            company=company,
+            terminal_id=terminal_id,
+            cashier=cashier
+        )).insert(ignore_permissions=True)
+
+    return len(buckets)
+
+
+def get_date_conditions(from_date, to_date):
+    """SQL date filter with a {column} placeholder, and its values"""
+    conditions, values = "", {}
+    if from_date:
+        conditions += " and {column} >= %(from_date)s"
+        values["from_date"] = getdate(from_date)
+    if to_date:
+        conditions += " and {column} <= %(to_date)s"
+        values["to_date"] = getdate(to_date)
+    return conditions, values
@@ -0,0 +1,51 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Per-item savepoints whose after-commit side effects roll back with them
+"""
+
+from contextlib import contextmanager
+
+import frappe
+
+FRAMES_FLAG = "paystack_savepoint_frames"
+
+
+def get_frames():
+    frames = frappe.local.flags.get(FRAMES_FLAG)
+    if frames is None:
+        frames = frappe.local.flags[FRAMES_FLAG] = []
+    return frames
+
+
+def after_commit(callback):
+    """Run callback once the transaction commits.
+
+    Inside savepoint() the callback is held back until the block succeeds, so
+    a rolled back item never publishes statuses, comments or realtime updates.
+    """
+    frames = get_frames()
+    if frames:
+        frames[-1].append(callback)
+    else:
+        frappe.db.after_commit.add(callback)
+
+
+@contextmanager
+def savepoint(name):
+    """frappe.db savepoint that also drops the block's after_commit callbacks on error.
+
+    The exception is re-raised after rolling back to the savepoint.
+    """
+    frames = get_frames()
+    frames.append([])
+    frappe.db.savepoint(name)
+    try:
+        yield
+    except Exception:
+        frames.pop()
+        frappe.db.rollback(save_point=name)
+        raise
+
+    for callback in frames.pop():
+        after_commit(callback)
@@ -0,0 +1,69 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Cached, decrypted Paystack Settings for hot paths
+"""
+
+import frappe
+from frappe.utils import cint
+
+VERSION_KEY = "paystack_terminal:settings_version"
+LEGACY_CACHE_KEY = "paystack_terminal:settings"
+
+# {site: (version, settings)}; checked against the Redis version on every read.
+# The decrypted secret only ever lives here, never in Redis
+_process_cache = {}
+
+
+def build_settings():
+    """Load Paystack Settings and decrypt the secret once"""
+    doc = frappe.get_single("Paystack Settings")
+    secret_key = doc.get_password("secret_key", raise_exception=False) if doc.secret_key else None
+
+    return frappe._dict(
+        enabled=cint(doc.enabled),
+        terminal_id=doc.terminal_id,
+        public_key=doc.public_key,
+        # site_config's paystack_base_url lets a test site point at the mock server without a form edit
+        base_url=doc.get("api_base_url") or frappe.conf.get("paystack_base_url"),
+        secret_key=secret_key,
+        auth_headers={
+            "Authorization": f"Bearer {secret_key}",
+            "Content-Type": "application/json"
+        },
+        prewarm_on_submit=cint(doc.get("prewarm_on_submit")),
+        reconciliation_concurrency=cint(doc.get("reconciliation_concurrency")),
+        post_fee_journal_entries=cint(doc.get("post_fee_journal_entries")),
+        fee_expense_account=doc.get("fee_expense_account")
+    )
+
+
+def get_version():
+    return frappe.cache().get(frappe.cache().make_key(VERSION_KEY))
+
+
+def get_settings():
+    """Resolved settings: process memory first, then the database.
+
+    The process copy costs one Redis GET of the version to confirm it is
+    current; neither the database nor decryption is touched until the
+    settings change.
+    """
+    site = getattr(frappe.local, "site", None)
+    version = get_version()
+
+    cached = _process_cache.get(site)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    settings = build_settings()
+    _process_cache[site] = (version, settings)
+    return settings
+
+
+def clear_settings_cache():
+    """Bump the version so every process reloads"""
+    # Sites upgraded from a release that kept the decrypted settings in Redis
+    frappe.cache().delete_value(LEGACY_CACHE_KEY)
+    frappe.cache().incr(frappe.cache().make_key(VERSION_KEY))
+    _process_cache.pop(getattr(frappe.local, "site", None), None)
@@ -0,0 +1,255 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Match Paystack settlements to Payment Entries, record fees and post fee Journal Entries
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, cint, flt, getdate, now_datetime, nowdate
+from paystack_terminal import metrics
+from paystack_terminal.client import get_client
+from paystack_terminal.ledger import LEDGER_DOCTYPE, get_transactions
+from paystack_terminal.posting_context import get_posting_context
+from paystack_terminal.reconciliation import REFERENCE_CHUNK_SIZE, chunked
+from paystack_terminal.rollups import add_to_rollup
+from paystack_terminal.savepoints import savepoint
+from paystack_terminal.settings import get_settings
+
+SETTLEMENT_DOCTYPE = "Paystack Settlement"
+
+# Payouts are revisited for a week, so late Payment Entries still get matched
+DEFAULT_LOOKBACK_DAYS = 7
+
+LOCK_KEY = "paystack_terminal:settlement_sync"
+LOCK_TIMEOUT = 30 * 60
+
+
+def build_reference_index(references):
+    """{reference: ledger row plus its Payment Entry's posting date and company}, in chunked queries"""
+    rows = get_transactions(references, fields=["payment_entry", "fees_kobo", "settlement", "terminal_id", "cashier"])
+
+    payment_entries = {}
+    for chunk in chunked([row.payment_entry for row in rows.values() if row.payment_entry], REFERENCE_CHUNK_SIZE):
+        for payment_entry in frappe.get_all(
+            "Payment Entry",
+            filters={"name": ["in", chunk], "docstatus": 1},
+            fields=["name", "posting_date", "company"]
+        ):
+            payment_entries[payment_entry.name] = payment_entry
+
+    index = {}
+    for reference, row in rows.items():
+        payment_entry = payment_entries.get(row.payment_entry)
+        if payment_entry:
+            index[reference] = frappe._dict(row, posting_date=payment_entry.posting_date, company=payment_entry.company)
+    return index
+
+
+def match_transactions(settlement_id, transactions):
+    """Record fees and the settlement on every matched ledger row in one pass.
+
+    transactions is {reference: Paystack transaction}. Returns the matched
+    count, their fees in kobo and the companies they were posted in.
+    """
+    index = build_reference_index(list(transactions))
+
+    updates, fee_deltas = {}, {}
+    matched_fees = 0
+    for reference, row in index.items():
+        fees = cint(transactions[reference].get("fees"))
+        matched_fees += fees
+
+        if cint(row.fees_kobo) != fees or row.settlement != settlement_id:
+            updates[reference] = {"fees_kobo": fees, "settlement": settlement_id}
+
+        # Fees the rollup has not seen yet, per day, company, terminal and cashier
+        if fees != cint(row.fees_kobo):
+            bucket = (row.posting_date, row.company, row.terminal_id, row.cashier)
+            fee_deltas[bucket] = fee_deltas.get(bucket, 0) + fees - cint(row.fees_kobo)
+
+    if updates:
+        frappe.db.bulk_update(LEDGER_DOCTYPE, updates, update_modified=False)
+    for bucket, delta in fee_deltas.items():
+        add_to_rollup(*bucket, fees_kobo=delta)
+
+    return frappe._dict(
+        matched=len(index),
+        matched_fees=matched_fees,
+        companies={row.company for row in index.values()}
+    )
+
+
+def get_settlement_date(settlement):
+    value = settlement.get("settlement_date") or settlement.get("settlementDate") or settlement.get("createdAt")
+    return getdate(value[:10]) if value else None
+
+
+def is_synced(settlement_id, status, post_fees):
+    """Nothing left to do for a payout: all matched, same status and its Journal Entry posted if wanted"""
+    existing = frappe.db.get_value(
+        SETTLEMENT_DOCTYPE,
+        settlement_id,
+        ["status", "unmatched_count", "journal_entry", "total_fees_kobo"],
+        as_dict=True
+    )
+    return bool(
+        existing
+        and existing.status == status
+        and not cint(existing.unmatched_count)
+        and (existing.journal_entry or not post_fees or not flt(existing.total_fees_kobo))
+    )
+
+
+def sync_settlement(client, settlement, settings, post_fees=False):
+    """Fetch one payout's transactions page by page, match them and update its record"""
+    settlement_id = str(settlement.get("id"))
+
+    transactions = {
+        txn["reference"]: txn
+        for txn in client.iter_settlement_transactions(settlement_id)
+        if txn.get("reference")
+    }
+    result = match_transactions(settlement_id, transactions)
+    metrics.observe("paystack_reconciliation_batch_size", len(transactions), mode="settlement")
+
+    if frappe.db.exists(SETTLEMENT_DOCTYPE, settlement_id):
+        doc = frappe.get_doc(SETTLEMENT_DOCTYPE, settlement_id)
+    else:
+        doc = frappe.new_doc(SETTLEMENT_DOCTYPE)
+        doc.settlement_id = settlement_id
+
+    doc.update({
+        "status": settlement.get("status"),
+        "settlement_date": get_settlement_date(settlement),
+        "company": next(iter(result.companies)) if len(result.companies) == 1 else None,
+        "total_amount_kobo": flt(settlement.get("total_amount")),
+        "total_fees_kobo": flt(settlement.get("total_fees", sum(cint(txn.get("fees")) for txn in transactions.values()))),
+        "effective_amount_kobo": flt(settlement.get("effective_amount")),
+        "transaction_count": len(transactions),
+        "matched_count": result.matched,
+        "unmatched_count": len(transactions) - result.matched,
+        "matched_fees_kobo": result.matched_fees,
+        "last_synced_on": now_datetime(),
+        "notes": None
+    })
+
+    if post_fees and not doc.journal_entry:
+        doc.notes = post_fee_journal_entry(doc, settings, result.companies)
+
+    doc.save(ignore_permissions=True)
+    return doc
+
+
+def post_fee_journal_entry(doc, settings, companies):
+    """Move a payout's fees from the Paystack Terminal account to the fee expense account.
+
+    Returns a note when the entry cannot be posted yet.
+    """
+    if not flt(doc.total_fees_kobo):
+        return None
+    if doc.status != "success":
+        return _("Waiting for the payout to complete")
+    if doc.unmatched_count:
+        return _("Waiting for {0} transactions without a Payment Entry").format(doc.unmatched_count)
+    if len(companies) != 1:
+        return _("Transactions were posted in several companies; post the fees manually")
+
+    company = next(iter(companies))
+    if not settings.fee_expense_account:
+        return _("Set a Fee Expense Account in Paystack Settings")
+    if frappe.db.get_value("Account", settings.fee_expense_account, "company") != company:
+        return _("Fee Expense Account does not belong to {0}").format(company)
+
+    amount = flt(doc.total_fees_kobo) / 100
+    context = get_posting_context(company)
+
+    try:
+        with savepoint("paystack_fee_journal"):
+            journal_entry = frappe.get_doc({
+                "doctype": "Journal Entry",
+                "voucher_type": "Journal Entry",
+                "company": company,
+                "posting_date": doc.settlement_date or nowdate(),
+                "cheque_no": doc.settlement_id,
+                "cheque_date": doc.settlement_date or nowdate(),
+                "user_remark": f"Paystack fees for settlement {doc.settlement_id}",
+                "accounts": [
+                    {
+                        "account": settings.fee_expense_account,
+                        "debit_in_account_currency": amount,
+                        "cost_center": frappe.get_cached_value("Company", company, "cost_center")
+                    },
+                    {
+                        "account": context["paid_to"],
+                        "credit_in_account_currency": amount
+                    }
+                ]
+            })
+            journal_entry.insert(ignore_permissions=True)
+            journal_entry.submit()
+    except Exception as e:
+        frappe.logger().error(f"Could not post fees for Paystack settlement {doc.settlement_id}: {str(e)}")
+        return _("Could not post the fee Journal Entry: {0}").format(str(e))
+
+    doc.journal_entry = journal_entry.name
+    return None
+
+
+@metrics.timed("paystack_reconciliation_duration_seconds", mode="settlement")
+def sync_settlements(settings=None, since=None, until=None, post_fees=None):
+    """Match every payout since a date (default: the last week), committing after each one"""
+    if settings is None:
+        settings = get_settings()
+    if post_fees is None:
+        post_fees = bool(settings.post_fee_journal_entries)
+
+    params = {"from": str(since or add_days(nowdate(), -DEFAULT_LOOKBACK_DAYS))}
+    if until:
+        params["to"] = str(until)
+
+    client = get_client(settings)
+    summary = {"settlements": 0, "skipped": 0, "transactions": 0, "matched": 0, "unmatched": 0, "journal_entries": 0}
+
+    for settlement in client.iter_settlements(**params):
+        if is_synced(str(settlement.get("id")), settlement.get("status"), post_fees):
+            summary["skipped"] += 1
+            continue
+
+        had_journal_entry = frappe.db.get_value(SETTLEMENT_DOCTYPE, str(settlement.get("id")), "journal_entry")
+        doc = sync_settlement(client, settlement, settings, post_fees)
+        frappe.db.commit()
+
+        summary["settlements"] += 1
+        summary["transactions"] += doc.transaction_count
+        summary["matched"] += doc.matched_count
+        summary["unmatched"] += doc.unmatched_count
+        if doc.journal_entry and not had_journal_entry:
+            summary["journal_entries"] += 1
+
+    frappe.db.set_single_value("Paystack Settings", "settlements_synced_on", now_datetime())
+    frappe.db.commit()
+    return summary
+
+
+def run_settlement_sync():
+    """Scheduled entry point: settlement matching guarded by a Redis lock"""
+    try:
+        settings = get_settings()
+        if not settings.enabled:
+            return
+
+        lock = frappe.cache().lock(frappe.cache().make_key(LOCK_KEY), timeout=LOCK_TIMEOUT)
+        if not lock.acquire(blocking=False):
+            frappe.logger().info("Paystack settlement sync already running, skipping")
+            return
+
+        try:
+            summary = sync_settlements(settings)
+            frappe.logger().info(f"Paystack settlement sync summary: {summary}")
+        finally:
+            lock.release()
+
+    except Exception as e:
+        frappe.db.rollback()
+        frappe.logger().error(f"Settlement Sync Error: {str(e)}")
@@ -0,0 +1,122 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Redis-backed cache of Paystack terminal presence
+"""
+
+import frappe
+from frappe.utils import now_datetime, time_diff_in_seconds
+from paystack_terminal import metrics
+from paystack_terminal.client import PaystackAPIError, get_client
+from paystack_terminal.settings import get_settings
+
+CACHE_KEY = "paystack_terminal:presence:{0}"
+
+# Entries older than this trigger a live check on the checkout path
+STALE_AFTER = 90
+# Redis drops entries entirely after this
+CACHE_TTL = 600
+
+
+def get_cache_key(terminal_id):
+    return CACHE_KEY.format(terminal_id)
+
+
+def get_cached_status(terminal_id):
+    """Return the cached presence entry, or None"""
+    return frappe.cache().get_value(get_cache_key(terminal_id))
+
+
+def set_cached_status(terminal_id, online, available, source="poll"):
+    status = {
+        "terminal_id": terminal_id,
+        "online": bool(online),
+        "available": bool(available),
+        "checked_at": now_datetime(),
+        "source": source
+    }
+    frappe.cache().set_value(get_cache_key(terminal_id), status, expires_in_sec=CACHE_TTL)
+    metrics.set_gauge("paystack_terminal_online", int(status["online"]), terminal=terminal_id)
+    metrics.set_gauge("paystack_terminal_available", int(status["available"]), terminal=terminal_id)
+    return status
+
+
+def is_stale(status):
+    return not status or time_diff_in_seconds(now_datetime(), status["checked_at"]) > STALE_AFTER
+
+
+def refresh_terminal_status(terminal_id, client=None):
+    """Check presence against Paystack and store the result"""
+    if client is None:
+        client = get_client()
+
+    try:
+        data = client.get_terminal_presence(terminal_id)
+    except PaystackAPIError as e:
+        frappe.logger().error(f"Terminal presence check failed for {terminal_id}: {str(e)}")
+        return set_cached_status(terminal_id, False, False, source="error")
+
+    return set_cached_status(terminal_id, data.get("online"), data.get("available"))
+
+
+def get_terminal_status(terminal_id, client=None):
+    """Cached presence, refreshed live only when the entry is stale"""
+    status = get_cached_status(terminal_id)
+    if is_stale(status):
+        status = refresh_terminal_status(terminal_id, client)
+    return status
+
+
+def is_terminal_available(terminal_id, client=None):
+    """Fast-path availability check for checkout.
+
+    A fresh "available" entry is trusted as is; anything else is confirmed
+    live so a stale busy/offline entry never blocks a payment.
+    """
+    status = get_cached_status(terminal_id)
+    if is_stale(status) or not (status["online"] and status["available"]):
+        status = refresh_terminal_status(terminal_id, client)
+    return status["online"] and status["available"]
+
+
+def describe_status(status):
+    """Human readable label used for the terminal_status field"""
+    if not status:
+        return "Unknown"
+    if status.get("source") == "error":
+        return "Disconnected"
+    if status["online"] and status["available"]:
+        return "Connected"
+    if status["online"]:
+        return "Busy"
+    return "Offline"
+
+
+def update_from_webhook(event, data):
+    """Update the cache from a terminal-related webhook event"""
+    terminal_id = data.get("terminal_id") or (data.get("terminal") or {}).get("terminal_id")
+    if not terminal_id:
+        return
+
+    if "online" in data or "available" in data:
+        set_cached_status(terminal_id, data.get("online"), data.get("available"), source="webhook")
+    else:
+        # Unknown shape: drop the entry so the next checkout checks live
+        frappe.cache().delete_value(get_cache_key(terminal_id))
+
+
+def poll_terminal_status():
+    """Scheduled refresh of every configured terminal"""
+    from paystack_terminal.dispatcher import get_all_terminal_ids
+
+    try:
+        settings = get_settings()
+        if not settings.enabled:
+            return
+
+        client = get_client(settings)
+        for terminal_id in get_all_terminal_ids(settings):
+            refresh_terminal_status(terminal_id, client)
+
+    except Exception as e:
+        frappe.logger().error(f"Terminal Status Poll Error: {str(e)}")
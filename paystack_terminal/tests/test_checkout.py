@@ -0,0 +1,72 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Tests for replacing open Paystack requests at checkout
+"""
+
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from paystack_terminal import checkout
+from paystack_terminal.client import PaystackAPIError
+from paystack_terminal.ledger import LEDGER_DOCTYPE, record_transaction
+
+
+class TestReleaseOpenRequests(FrappeTestCase):
+    def setUp(self):
+        self.reference = f"test-checkout-{frappe.generate_hash(length=10)}"
+        self.client = MagicMock()
+
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def release(self, invoices, keep=None):
+        with patch.object(checkout, "get_covering_references", return_value={self.reference}):
+            checkout.release_open_requests(self.client, invoices, keep=keep)
+
+    def test_single_checkout_archives_consolidated_request(self):
+        # A Pending consolidated request for SINV-A and SINV-B, then a single checkout of SINV-A
+        record_transaction(self.reference, status="Pending", payment_request_id="PRQ_consolidated")
+        self.release(["SINV-A"])
+
+        self.client.archive_payment_request.assert_called_once_with("PRQ_consolidated")
+        self.assertEqual(frappe.db.get_value(LEDGER_DOCTYPE, self.reference, "status"), "Failed")
+
+    def test_reused_request_is_kept(self):
+        record_transaction(self.reference, status="Pending", payment_request_id="PRQ_open")
+        self.release(["SINV-A", "SINV-B"], keep=self.reference)
+
+        self.client.archive_payment_request.assert_not_called()
+        self.assertEqual(frappe.db.get_value(LEDGER_DOCTYPE, self.reference, "status"), "Pending")
+
+    def test_paid_request_is_left_alone(self):
+        record_transaction(self.reference, status="Success", payment_request_id="PRQ_paid")
+        self.release(["SINV-A"])
+
+        self.client.archive_payment_request.assert_not_called()
+        self.assertEqual(frappe.db.get_value(LEDGER_DOCTYPE, self.reference, "status"), "Success")
+
+    def test_archive_failure_stops_checkout(self):
+        record_transaction(self.reference, status="Pending", payment_request_id="PRQ_open")
+        self.client.archive_payment_request.side_effect = PaystackAPIError("boom")
+
+        with self.assertRaises(frappe.ValidationError):
+            self.release(["SINV-A"])
+
+
+class TestOpenRequestReuse(FrappeTestCase):
+    def get_open_request(self, allocated, invoices=None):
+        sales_invoice = frappe._dict(name="SINV-A", terminal_reference="ref-open", paystack_request_id="PRQ_open")
+        transaction = frappe._dict(status="Pending", payment_entry=None, amount_kobo=150000)
+        with patch.object(checkout, "get_transaction", return_value=transaction), \
+                patch.object(checkout, "get_allocations", return_value=[
+                    frappe._dict(sales_invoice=invoice) for invoice in allocated]):
+            return checkout.get_open_request(sales_invoice, 1500, invoices)
+
+    def test_single_request_is_reused(self):
+        self.assertEqual(self.get_open_request([])["offline_reference"], "ref-open")
+
+    def test_consolidated_request_is_not_reused_for_one_invoice(self):
+        self.assertIsNone(self.get_open_request(["SINV-A", "SINV-B"]))
+        self.assertIsNotNone(self.get_open_request(["SINV-A", "SINV-B"], ["SINV-A", "SINV-B"]))
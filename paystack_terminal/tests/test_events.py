@@ -0,0 +1,119 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Tests for the Paystack event journal and its consumer
+"""
+
+import json
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from paystack_terminal import events
+from paystack_terminal.queues import get_partition
+
+
+class TestEventJournal(FrappeTestCase):
+    def setUp(self):
+        self.reference = f"test-event-{frappe.generate_hash(length=10)}"
+        patcher = patch.object(events, "enqueue_consumer")
+        self.enqueue_consumer = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def journal(self, event="charge.success"):
+        payload = json.dumps({"event": event, "data": {"reference": self.reference}}).encode()
+        events.journal_event(event, self.reference, payload)
+        return frappe.get_last_doc("Paystack Event", filters={"reference": self.reference})
+
+    def get_event(self, name):
+        return frappe.get_all(
+            "Paystack Event",
+            filters={"name": name},
+            fields=["name", "event", "reference", "payload", "attempts", "received_at", "next_attempt_at"]
+        )
+
+    def test_journal_event(self):
+        event = self.journal()
+        self.assertEqual(event.status, "Pending")
+        self.assertEqual(event.partition, get_partition(self.reference))
+        self.enqueue_consumer.assert_called_once_with(get_partition(self.reference))
+
+    def test_process_batch(self):
+        event = self.journal()
+        with patch("paystack_terminal.api.process_charge", return_value={"duplicate": True}) as process_charge, \
+                patch.object(frappe.db, "commit"):
+            updates = events.process_batch(self.get_event(event.name))
+
+        process_charge.assert_called_once()
+        self.assertEqual(updates[event.name]["status"], "Processed")
+        self.assertEqual(frappe.db.get_value("Paystack Event", event.name, "status"), "Processed")
+
+    def test_failed_event_backs_off(self):
+        event = self.journal()
+        with patch("paystack_terminal.api.process_charge", side_effect=Exception("boom")), \
+                patch.object(frappe.db, "commit"):
+            update = events.process_batch(self.get_event(event.name))[event.name]
+
+        self.assertEqual(update["status"], "Failed")
+        self.assertEqual(update["attempts"], 1)
+        self.assertGreater(update["next_attempt_at"], frappe.utils.now_datetime())
+        self.assertIn("boom", update["error"])
+
+    def test_last_attempt_is_dead(self):
+        event = self.journal()
+        rows = self.get_event(event.name)
+        rows[0].attempts = events.MAX_ATTEMPTS - 1
+        with patch("paystack_terminal.api.process_charge", side_effect=Exception("boom")), \
+                patch.object(frappe.db, "commit"):
+            update = events.process_batch(rows)[event.name]
+
+        self.assertEqual(update["status"], "Dead")
+
+    def test_failure_rolls_back_only_its_event(self):
+        first, second = self.journal(), self.journal("charge.failed")
+
+        def process_charge(data, existing, invoices):
+            frappe.db.set_value("Paystack Event", second.name, "reference", "written by a failed event")
+            raise Exception("boom")
+
+        with patch("paystack_terminal.api.process_charge", side_effect=process_charge), \
+                patch.object(frappe.db, "commit"):
+            updates = events.process_batch(self.get_event(first.name) + self.get_event(second.name))
+
+        self.assertEqual(updates[first.name]["status"], "Failed")
+        self.assertEqual(updates[second.name]["status"], "Processed")
+        self.assertEqual(frappe.db.get_value("Paystack Event", second.name, "reference"), self.reference)
+
+    def test_backoff(self):
+        self.assertEqual(events.get_backoff(1), events.BACKOFF_BASE_MINUTES)
+        self.assertEqual(events.get_backoff(2), events.BACKOFF_BASE_MINUTES * 2)
+        self.assertEqual(events.get_backoff(20), events.BACKOFF_CAP_MINUTES)
+
+
+class TestEventConsumerLock(FrappeTestCase):
+    def test_held_partition_is_skipped(self):
+        partition = get_partition(frappe.generate_hash(length=10))
+        lock = frappe.cache().lock(frappe.cache().make_key(events.LOCK_KEY.format(partition)), timeout=30)
+        self.assertTrue(lock.acquire(blocking=False))
+        try:
+            with patch.object(events, "get_due_events") as get_due_events:
+                self.assertFalse(events.drain_partition(partition, {"processed": 0, "failed": 0}))
+            get_due_events.assert_not_called()
+        finally:
+            lock.release()
+
+    def test_consumer_rechecks_after_release(self):
+        # An event lands while the first pass holds the lock; the re-check drains it
+        due = [[frappe._dict(name="a")], [frappe._dict(name="b")], [frappe._dict(name="b")], []]
+        with patch.object(events, "get_due_events", side_effect=lambda limit, partition: due.pop(0)), \
+                patch.object(events, "process_batch", side_effect=lambda rows: {
+                    row.name: {"status": "Processed"} for row in rows}), \
+                patch.object(frappe.db, "commit"):
+            summary = {"processed": 0, "failed": 0}
+            events.consume_partition(0, summary)
+
+        self.assertEqual(summary["processed"], 2)
+        self.assertFalse(due)
@@ -0,0 +1,45 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Tests for the per-reference Payment Entry locks
+"""
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from paystack_terminal.locks import HELD_FLAG, ReferenceLockTimeout, acquire_reference_lock, extend_reference_locks
+
+
+class TestReferenceLock(FrappeTestCase):
+    def setUp(self):
+        self.reference = f"test-lock-{frappe.generate_hash(length=10)}"
+
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def test_second_holder_times_out(self):
+        acquire_reference_lock(self.reference)
+        with self.assertRaises(ReferenceLockTimeout):
+            acquire_reference_lock(self.reference, wait=0)
+
+    def test_released_when_transaction_ends(self):
+        lock = acquire_reference_lock(self.reference)
+        self.assertIn(lock, frappe.local.flags.get(HELD_FLAG))
+
+        frappe.db.rollback()
+        self.assertFalse(lock.locked())
+        self.assertNotIn(lock, frappe.local.flags.get(HELD_FLAG))
+        acquire_reference_lock(self.reference, wait=0)
+
+    def test_extend_renews_lease(self):
+        lock = acquire_reference_lock(self.reference, lease=30)
+        frappe.cache().pexpire(lock.name, 100)
+
+        extend_reference_locks()
+        self.assertGreater(frappe.cache().pttl(lock.name), 1000)
+
+    def test_extend_tolerates_expired_lease(self):
+        lock = acquire_reference_lock(self.reference)
+        frappe.cache().delete(lock.name)
+
+        extend_reference_locks()
+        self.assertFalse(lock.locked())
@@ -0,0 +1,121 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Tests for the Paystack outbox
+"""
+
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_to_date, now_datetime
+from paystack_terminal import outbox
+from paystack_terminal.ledger import LEDGER_DOCTYPE, record_transaction
+
+
+class TestOutbox(FrappeTestCase):
+    def setUp(self):
+        self.customer = f"test-outbox-{frappe.generate_hash(length=10)}"
+        patcher = patch.object(outbox, "enqueue_worker")
+        self.enqueue_worker = patcher.start()
+        self.addCleanup(patcher.stop)
+        # Entries point at customers and invoices that only exist in name here
+        patcher = patch("frappe.model.document.Document._validate_links")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def queue(self):
+        return outbox.queue_customer_creation(self.customer, {"email": "outbox@example.com"})
+
+    def test_idempotency_key_reuses_entry(self):
+        name = self.queue()
+        self.assertEqual(self.queue(), name)
+        self.assertEqual(frappe.db.count(outbox.OUTBOX_DOCTYPE, {"reference_name": self.customer}), 1)
+        self.assertEqual(self.enqueue_worker.call_count, 2)
+
+    def test_delivered_entry_is_not_reused(self):
+        name = self.queue()
+        frappe.db.set_value(outbox.OUTBOX_DOCTYPE, name, "status", "Sent")
+        self.assertNotEqual(self.queue(), name)
+
+    def test_deliver_entry(self):
+        name = self.queue()
+        handler = MagicMock(return_value=True)
+        with patch.dict(outbox.ACTION_HANDLERS, {outbox.CREATE_CUSTOMER: handler}):
+            self.assertEqual(outbox.deliver_entry(name, client=MagicMock()), "Sent")
+            # A delivered entry is never sent again
+            self.assertEqual(outbox.deliver_entry(name, client=MagicMock()), "Sent")
+
+        handler.assert_called_once()
+        self.assertEqual(frappe.db.get_value(outbox.OUTBOX_DOCTYPE, name, "attempts"), 1)
+
+    def test_failed_delivery_is_retried_later(self):
+        name = self.queue()
+        with patch.dict(outbox.ACTION_HANDLERS, {outbox.CREATE_CUSTOMER: MagicMock(side_effect=Exception("boom"))}):
+            self.assertEqual(outbox.deliver_entry(name, client=MagicMock()), "Failed")
+
+        entry = frappe.db.get_value(outbox.OUTBOX_DOCTYPE, name, ["attempts", "next_attempt_at", "error"], as_dict=True)
+        self.assertEqual(entry.attempts, 1)
+        self.assertGreater(entry.next_attempt_at, now_datetime())
+        self.assertIn("boom", entry.error)
+
+    def test_retried_push_reopens_the_charge(self):
+        reference = f"test-outbox-{frappe.generate_hash(length=10)}"
+        name = outbox.queue_terminal_push("TRM_test", reference, "PRQ_test", self.customer)
+        frappe.db.set_value(outbox.OUTBOX_DOCTYPE, name, "status", "Dead")
+        record_transaction(reference, status="Failed")
+
+        # The dead push left its invoice in Push Failed
+        with patch.object(frappe.db, "exists", return_value=True), \
+                patch.object(outbox, "set_payment_status") as set_payment_status, \
+                patch.object(outbox, "enqueue_due_workers"), \
+                patch.object(frappe.db, "commit"):
+            outbox.retry_entries([name])
+
+        self.assertEqual(frappe.db.get_value(outbox.OUTBOX_DOCTYPE, name, "status"), "Pending")
+        self.assertEqual(frappe.db.get_value(LEDGER_DOCTYPE, reference, "status"), "Pending")
+        set_payment_status.assert_called_once_with(reference, "Sending", [self.customer], message=None)
+
+    def test_retried_push_of_a_replaced_request_stays_closed(self):
+        reference = f"test-outbox-{frappe.generate_hash(length=10)}"
+        name = outbox.queue_terminal_push("TRM_test", reference, "PRQ_test", self.customer)
+        record_transaction(reference, status="Failed")
+
+        with patch.object(outbox, "set_payment_status") as set_payment_status, \
+                patch.object(outbox, "enqueue_due_workers"), \
+                patch.object(frappe.db, "commit"):
+            outbox.retry_entries([name])
+
+        self.assertEqual(frappe.db.get_value(LEDGER_DOCTYPE, reference, "status"), "Failed")
+        set_payment_status.assert_not_called()
+
+
+class TestOutboxRetryBudget(FrappeTestCase):
+    def get_update(self, action, attempts):
+        return outbox.get_failure_update(frappe._dict(action=action, attempts=attempts), now_datetime(), "boom")
+
+    def test_push_retries_quickly_then_dies(self):
+        now = now_datetime()
+        for attempts, seconds in enumerate(outbox.PUSH_RETRY_SECONDS):
+            update = outbox.get_failure_update(frappe._dict(action=outbox.TERMINAL_PUSH, attempts=attempts), now, "boom")
+            self.assertEqual(update["status"], "Failed")
+            self.assertEqual(update["next_attempt_at"], add_to_date(now, seconds=seconds))
+
+        self.assertEqual(self.get_update(outbox.TERMINAL_PUSH, outbox.PUSH_MAX_ATTEMPTS - 1)["status"], "Dead")
+
+    def test_customer_creation_uses_long_backoff(self):
+        self.assertEqual(self.get_update(outbox.CREATE_CUSTOMER, outbox.PUSH_MAX_ATTEMPTS - 1)["status"], "Failed")
+        self.assertEqual(self.get_update(outbox.CREATE_CUSTOMER, outbox.MAX_ATTEMPTS - 1)["status"], "Dead")
+
+    def test_held_partition_is_skipped(self):
+        lock = frappe.cache().lock(frappe.cache().make_key(outbox.LOCK_KEY.format(0)), timeout=30)
+        self.assertTrue(lock.acquire(blocking=False))
+        try:
+            with patch.object(outbox, "get_due_entries") as get_due_entries:
+                self.assertFalse(outbox.drain_partition(0, MagicMock(), {}))
+            get_due_entries.assert_not_called()
+        finally:
+            lock.release()
@@ -0,0 +1,62 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Tests for prewarmed Paystack payment requests
+"""
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_to_date, now_datetime
+from paystack_terminal import prewarm
+from paystack_terminal.prewarm import PREWARM_FIELDS, PREWARM_TTL_HOURS, is_prewarm_usable
+
+
+def prewarmed_invoice(amount=1500, hours_ago=1):
+    return frappe._dict(
+        paystack_request_id=1234,
+        paystack_offline_reference="1234567890",
+        paystack_prewarmed_amount=amount,
+        paystack_prewarmed_on=add_to_date(now_datetime(), hours=-hours_ago)
+    )
+
+
+class TestPrewarm(FrappeTestCase):
+    def test_usable_for_same_amount(self):
+        self.assertTrue(is_prewarm_usable(prewarmed_invoice(), 1500))
+
+    def test_not_usable_for_other_amount(self):
+        self.assertFalse(is_prewarm_usable(prewarmed_invoice(), 1000))
+
+    def test_not_usable_once_expired(self):
+        self.assertFalse(is_prewarm_usable(prewarmed_invoice(hours_ago=PREWARM_TTL_HOURS + 1), 1500))
+
+    def test_not_usable_without_request(self):
+        self.assertFalse(is_prewarm_usable(frappe._dict(), 1500))
+        self.assertFalse(is_prewarm_usable(frappe._dict(prewarmed_invoice(), paystack_offline_reference=None), 1500))
+
+
+class TestReleasePrewarm(FrappeTestCase):
+    def test_release_clears_fields_and_archives_after_commit(self):
+        rows = [frappe._dict(name="SINV-1", paystack_request_id=11), frappe._dict(name="SINV-2", paystack_request_id=12)]
+        with patch.object(frappe, "get_all", return_value=rows), \
+                patch.object(frappe.db, "set_value") as set_value, \
+                patch.object(prewarm, "enqueue") as enqueue:
+            prewarm.release_prewarmed_requests(["SINV-1", "SINV-2", "SINV-3"])
+
+        set_value.assert_called_once_with("Sales Invoice", {"name": ["in", ["SINV-1", "SINV-2"]]}, PREWARM_FIELDS,
+            update_modified=False)
+        enqueue.assert_called_once()
+        self.assertEqual(enqueue.call_args.args[0], "paystack_terminal.prewarm.archive_payment_requests")
+        self.assertEqual(enqueue.call_args.kwargs["request_ids"], [11, 12])
+        self.assertTrue(enqueue.call_args.kwargs["enqueue_after_commit"])
+
+    def test_nothing_to_release(self):
+        with patch.object(frappe, "get_all", return_value=[]), \
+                patch.object(frappe.db, "set_value") as set_value, \
+                patch.object(prewarm, "enqueue") as enqueue:
+            prewarm.release_prewarmed_requests(["SINV-1"])
+
+        set_value.assert_not_called()
+        enqueue.assert_not_called()
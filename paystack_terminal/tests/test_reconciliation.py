@@ -0,0 +1,102 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Tests for the incremental reconciliation checkpoint and lock
+"""
+
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from paystack_terminal import reconciliation
+
+
+def transaction(id, reference, created_at):
+    return {"id": id, "reference": reference, "createdAt": created_at}
+
+
+class TestReconciliationCursor(FrappeTestCase):
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def test_cursor_round_trip(self):
+        reconciliation.set_cursor("2026-01-02T10:11:12.000Z", "42")
+        self.assertEqual(reconciliation.get_cursor(), ("2026-01-02T10:11:12.000Z", 42))
+
+    def test_settings_save_keeps_cursor(self):
+        reconciliation.set_cursor("2026-01-02T10:11:12.000Z", 42)
+        settings = frappe.get_single("Paystack Settings")
+        settings.enabled = 0
+        settings.save(ignore_permissions=True)
+
+        self.assertEqual(reconciliation.get_cursor(), ("2026-01-02T10:11:12.000Z", 42))
+        self.assertEqual(settings.reconciliation_cursor_id, 42)
+
+    def run_incremental(self, transactions, failed=()):
+        self.client = MagicMock()
+        self.client.iter_transactions.return_value = transactions
+        with patch.object(reconciliation, "get_client", return_value=self.client), \
+                patch.object(reconciliation, "get_invoices_for_references", return_value=[]) as get_invoices, \
+                patch.object(reconciliation, "post_matches", return_value=set(failed)):
+            summary = reconciliation.reconcile_incremental(
+                frappe._dict(),
+                cursor=("2026-01-02T10:00:00.000Z", 5)
+            )
+        self.references = set(get_invoices.call_args.args[0]) if get_invoices.called else set()
+        return summary
+
+    def test_cursor_skips_seen_transactions(self):
+        summary = self.run_incremental([
+            transaction(4, "seen-earlier-id", "2026-01-02T10:00:00.000Z"),
+            transaction(5, "seen", "2026-01-02T10:00:00.000Z"),
+            transaction(6, "same-second", "2026-01-02T10:00:00.000Z"),
+            transaction(7, "later", "2026-01-02T10:00:01.000Z")
+        ])
+
+        self.assertEqual(summary["fetched"], 2)
+        self.assertEqual(summary["rechecked"], 2)
+        self.assertEqual(summary["cursor"], ("2026-01-02T10:00:01.000Z", 7))
+        self.assertEqual(reconciliation.get_cursor(), ("2026-01-02T10:00:01.000Z", 7))
+
+    def test_lists_the_overlap_before_the_cursor(self):
+        # Created before the checkpoint but only successful now, e.g. a delayed terminal approval
+        summary = self.run_incremental([
+            transaction(3, "approved-late", "2026-01-02T09:30:00.000Z"),
+            transaction(7, "later", "2026-01-02T10:00:01.000Z")
+        ], failed={"approved-late"})
+
+        self.assertEqual(self.client.iter_transactions.call_args.kwargs["from"], "2026-01-02T09:00:00Z")
+        self.assertEqual(self.references, {"approved-late", "later"})
+        # A failed overlap transaction never moves the checkpoint back
+        self.assertEqual(summary["cursor"], ("2026-01-02T10:00:01.000Z", 7))
+
+    def test_cursor_stops_before_failure(self):
+        summary = self.run_incremental([
+            transaction(8, "third", "2026-01-02T10:00:03.000Z"),
+            transaction(6, "first", "2026-01-02T10:00:01.000Z"),
+            transaction(7, "second", "2026-01-02T10:00:02.000Z")
+        ], failed={"second"})
+
+        self.assertEqual(summary["cursor"], ("2026-01-02T10:00:01.000Z", 6))
+        self.assertEqual(reconciliation.get_cursor(), ("2026-01-02T10:00:01.000Z", 6))
+
+    def test_nothing_new_keeps_cursor(self):
+        reconciliation.set_cursor("2026-01-01T00:00:00.000Z", 1)
+        summary = self.run_incremental([])
+
+        self.assertEqual(summary["fetched"], 0)
+        self.assertEqual(reconciliation.get_cursor(), ("2026-01-01T00:00:00.000Z", 1))
+
+
+class TestReconciliationLock(FrappeTestCase):
+    def test_one_run_at_a_time(self):
+        lock = reconciliation.get_lock()
+        self.assertTrue(lock.acquire(blocking=False))
+        try:
+            self.assertFalse(reconciliation.get_lock().acquire(blocking=False))
+            with patch.object(reconciliation, "get_settings", return_value=frappe._dict(enabled=1)), \
+                    patch.object(reconciliation, "reconcile_incremental") as reconcile_incremental:
+                reconciliation.run_incremental_reconciliation()
+            reconcile_incremental.assert_not_called()
+        finally:
+            lock.release()
@@ -0,0 +1,71 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Tests for the daily Paystack sales rollup
+"""
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import getdate, nowdate
+from paystack_terminal.ledger import record_transaction
+from paystack_terminal.rollups import ROLLUP_DOCTYPE, add_payment, add_to_rollup, get_rollup_name, update_open_charges
+
+
+class TestSalesRollup(FrappeTestCase):
+    def setUp(self):
+        self.terminal_id = f"test-rollup-{frappe.generate_hash(length=10)}"
+        self.bucket = (getdate(nowdate()), None, self.terminal_id, None)
+
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def get_rollup(self):
+        return frappe.db.get_value(
+            ROLLUP_DOCTYPE,
+            get_rollup_name(*self.bucket),
+            ["payment_count", "gross_kobo", "gross_amount", "fees_kobo", "pending_count", "failed_count"],
+            as_dict=True
+        )
+
+    def test_updates_accumulate(self):
+        add_to_rollup(*self.bucket, payment_count=1, gross_kobo=150000, fees_kobo=2250)
+        add_to_rollup(*self.bucket, payment_count=1, gross_kobo=50000, fees_kobo=750)
+
+        rollup = self.get_rollup()
+        self.assertEqual(rollup.payment_count, 2)
+        self.assertEqual(rollup.gross_kobo, 200000)
+        self.assertEqual(rollup.fees_kobo, 3000)
+        self.assertEqual(frappe.db.count(ROLLUP_DOCTYPE, {"terminal_id": self.terminal_id}), 1)
+
+    def test_empty_deltas_create_nothing(self):
+        add_to_rollup(*self.bucket, payment_count=0, unknown_field=5)
+        self.assertIsNone(self.get_rollup())
+
+    def test_payment_and_cancellation(self):
+        record_transaction(self.terminal_id, terminal_id=self.terminal_id, status="Success")
+        doc = frappe._dict(posting_date=nowdate(), company=None, reference_no=self.terminal_id, paid_amount=1500.5,
+            flags=frappe._dict(paystack_fees_kobo=2250))
+        add_payment(doc)
+
+        rollup = self.get_rollup()
+        # The chart plots gross_amount, so it is kept in currency next to the kobo total
+        self.assertEqual(rollup.gross_amount, 1500.5)
+        self.assertEqual(rollup.gross_kobo, 150050)
+
+        add_payment(doc, sign=-1)
+        rollup = self.get_rollup()
+        self.assertEqual((rollup.payment_count, rollup.gross_kobo, rollup.gross_amount, rollup.fees_kobo), (0, 0, 0, 0))
+
+    def test_open_charges_move_between_counters(self):
+        pending = {"status": "Pending", "creation": nowdate(), "company": None, "terminal_id": self.terminal_id}
+        failed = dict(pending, status="Failed")
+
+        update_open_charges(None, pending)
+        update_open_charges(pending, pending)
+        self.assertEqual((self.get_rollup().pending_count, self.get_rollup().failed_count), (1, 0))
+
+        update_open_charges(pending, failed)
+        self.assertEqual((self.get_rollup().pending_count, self.get_rollup().failed_count), (0, 1))
+
+        update_open_charges(failed, dict(failed, status="Success"))
+        self.assertEqual((self.get_rollup().pending_count, self.get_rollup().failed_count), (0, 0))
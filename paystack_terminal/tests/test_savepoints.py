@@ -0,0 +1,59 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Tests for savepoints that hold back after-commit callbacks
+"""
+
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from paystack_terminal.savepoints import after_commit, get_frames, savepoint
+
+
+class TestSavepoints(FrappeTestCase):
+    def setUp(self):
+        patcher = patch.object(frappe.db.after_commit, "add")
+        self.add = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        frappe.db.rollback()
+
+    def test_outside_savepoint(self):
+        callback = MagicMock()
+        after_commit(callback)
+        self.add.assert_called_once_with(callback)
+
+    def test_successful_block_keeps_callbacks(self):
+        callback = MagicMock()
+        with savepoint("test_savepoint"):
+            after_commit(callback)
+            self.add.assert_not_called()
+
+        self.add.assert_called_once_with(callback)
+        self.assertEqual(get_frames(), [])
+
+    def test_failed_block_drops_callbacks_and_writes(self):
+        callback = MagicMock()
+        frappe.db.set_global("paystack_test_savepoint", "before")
+        with self.assertRaises(ValueError):
+            with savepoint("test_savepoint"):
+                frappe.db.set_global("paystack_test_savepoint", "inside")
+                after_commit(callback)
+                raise ValueError("boom")
+
+        self.add.assert_not_called()
+        self.assertEqual(get_frames(), [])
+        self.assertEqual(frappe.db.get_global("paystack_test_savepoint"), "before")
+
+    def test_nested_failure_keeps_outer_callbacks(self):
+        outer, inner = MagicMock(), MagicMock()
+        with savepoint("test_outer"):
+            after_commit(outer)
+            with self.assertRaises(ValueError):
+                with savepoint("test_inner"):
+                    after_commit(inner)
+                    raise ValueError("boom")
+
+        self.add.assert_called_once_with(outer)
@@ -0,0 +1,83 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Tests for matching Paystack settlements to the ledger
+"""
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from paystack_terminal import settlements
+
+
+def ledger_row(fees_kobo=0, settlement=None, company="Test Company"):
+    return frappe._dict(
+        payment_entry="ACC-PAY-0001",
+        fees_kobo=fees_kobo,
+        settlement=settlement,
+        terminal_id="TERM-1",
+        cashier="cashier@example.com",
+        posting_date=frappe.utils.getdate("2026-01-02"),
+        company=company
+    )
+
+
+class TestSettlementMatching(FrappeTestCase):
+    def match(self, index, transactions):
+        with patch.object(settlements, "build_reference_index", return_value=index), \
+                patch.object(frappe.db, "bulk_update") as bulk_update, \
+                patch.object(settlements, "add_to_rollup") as add_to_rollup:
+            result = settlements.match_transactions("STL-1", transactions)
+        return result, bulk_update, add_to_rollup
+
+    def test_records_fees_and_settlement(self):
+        result, bulk_update, add_to_rollup = self.match(
+            {"ref-1": ledger_row(), "ref-2": ledger_row(company="Other Company")},
+            {"ref-1": {"fees": 150}, "ref-2": {"fees": 250}, "ref-unmatched": {"fees": 99}}
+        )
+
+        self.assertEqual(result.matched, 2)
+        self.assertEqual(result.matched_fees, 400)
+        self.assertEqual(result.companies, {"Test Company", "Other Company"})
+        self.assertEqual(bulk_update.call_args.args[1], {
+            "ref-1": {"fees_kobo": 150, "settlement": "STL-1"},
+            "ref-2": {"fees_kobo": 250, "settlement": "STL-1"}
+        })
+        self.assertEqual(add_to_rollup.call_count, 2)
+
+    def test_rematch_is_idempotent(self):
+        result, bulk_update, add_to_rollup = self.match(
+            {"ref-1": ledger_row(fees_kobo=150, settlement="STL-1")},
+            {"ref-1": {"fees": 150}}
+        )
+
+        self.assertEqual(result.matched_fees, 150)
+        bulk_update.assert_not_called()
+        add_to_rollup.assert_not_called()
+
+    def test_fee_correction_adds_only_the_difference(self):
+        _result, _bulk_update, add_to_rollup = self.match(
+            {"ref-1": ledger_row(fees_kobo=150, settlement="STL-1"), "ref-2": ledger_row(fees_kobo=50)},
+            {"ref-1": {"fees": 175}, "ref-2": {"fees": 75}}
+        )
+
+        # Both rows share a bucket, so one update carries both differences
+        add_to_rollup.assert_called_once_with(
+            frappe.utils.getdate("2026-01-02"), "Test Company", "TERM-1", "cashier@example.com", fees_kobo=50
+        )
+
+
+class TestSettlementSyncState(FrappeTestCase):
+    def is_synced(self, existing, status="success", post_fees=True):
+        with patch.object(frappe.db, "get_value", return_value=existing and frappe._dict(existing)):
+            return settlements.is_synced("STL-1", status, post_fees)
+
+    def test_is_synced(self):
+        done = {"status": "success", "unmatched_count": 0, "journal_entry": "ACC-JV-0001", "total_fees_kobo": 400}
+        self.assertTrue(self.is_synced(done))
+        self.assertFalse(self.is_synced(None))
+        self.assertFalse(self.is_synced(done, status="pending"))
+        self.assertFalse(self.is_synced(dict(done, unmatched_count=2)))
+        self.assertFalse(self.is_synced(dict(done, journal_entry=None)))
+        self.assertTrue(self.is_synced(dict(done, journal_entry=None), post_fees=False))
@@ -0,0 +1,64 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Tests for webhook signature verification and idempotency
+"""
+
+import hashlib
+import hmac
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from paystack_terminal.webhook import claim_event, is_valid_signature, release_event
+
+SECRET_KEY = "sk_test_webhook"
+
+
+def sign(payload, secret_key=SECRET_KEY):
+    return hmac.new(secret_key.encode(), payload, hashlib.sha512).hexdigest()
+
+
+class TestWebhookSignature(FrappeTestCase):
+    def test_valid_signature(self):
+        payload = b'{"event": "charge.success"}'
+        self.assertTrue(is_valid_signature(payload, sign(payload), SECRET_KEY))
+
+    def test_signature_case_and_whitespace(self):
+        payload = b'{"event": "charge.success"}'
+        self.assertTrue(is_valid_signature(payload, f" {sign(payload).upper()}\n", SECRET_KEY))
+
+    def test_tampered_payload(self):
+        payload = b'{"event": "charge.success", "data": {"amount": 100}}'
+        signature = sign(payload)
+        self.assertFalse(is_valid_signature(payload.replace(b"100", b"1"), signature, SECRET_KEY))
+
+    def test_wrong_secret(self):
+        payload = b'{"event": "charge.success"}'
+        self.assertFalse(is_valid_signature(payload, sign(payload, "sk_test_other"), SECRET_KEY))
+
+    def test_missing_parts(self):
+        payload = b'{"event": "charge.success"}'
+        self.assertFalse(is_valid_signature(payload, None, SECRET_KEY))
+        self.assertFalse(is_valid_signature(b"", sign(b""), SECRET_KEY))
+
+
+class TestWebhookIdempotency(FrappeTestCase):
+    def setUp(self):
+        self.reference = f"test-webhook-{frappe.generate_hash(length=10)}"
+
+    def tearDown(self):
+        release_event("charge.success", self.reference)
+
+    def test_claim_once(self):
+        self.assertTrue(claim_event("charge.success", self.reference))
+        self.assertFalse(claim_event("charge.success", self.reference))
+
+    def test_claim_per_event(self):
+        self.assertTrue(claim_event("charge.success", self.reference))
+        self.assertTrue(claim_event("charge.failed", self.reference))
+        release_event("charge.failed", self.reference)
+
+    def test_release_allows_retry(self):
+        self.assertTrue(claim_event("charge.success", self.reference))
+        release_event("charge.success", self.reference)
+        self.assertTrue(claim_event("charge.success", self.reference))
@@ -0,0 +1,209 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Streaming backfill of Payment Entries from Paystack transaction exports (CSV or JSON lines)
+"""
+
+import csv
+import json
+import os
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+from paystack_terminal import metrics
+from paystack_terminal.ledger import get_transactions
+from paystack_terminal.locks import extend_reference_locks
+from paystack_terminal.reconciliation import REFERENCE_CHUNK_SIZE, chunked, get_existing_references
+from paystack_terminal.savepoints import savepoint
+
+# Rows per database transaction; each Payment Entry holds its reference lock until the commit
+DEFAULT_BATCH_SIZE = 100
+
+FORMATS = ("csv", "jsonl")
+
+
+def get_format(path, file_format=None):
+    file_format = file_format or os.path.splitext(path)[1].lstrip(".").lower()
+    if file_format in ("json", "ndjson"):
+        file_format = "jsonl"
+    if file_format not in FORMATS:
+        frappe.throw(_("Unsupported export format {0}; use CSV or JSON lines").format(file_format))
+    return file_format
+
+
+def iter_rows(path, file_format):
+    """Yield raw export rows one at a time; never holds the file in memory"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if file_format == "csv":
+            for row in csv.DictReader(f):
+                yield {(key or "").strip().lower().replace(" ", "_"): value for key, value in row.items()}
+            return
+
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def parse_metadata(value):
+    if isinstance(value, dict):
+        return value
+    try:
+        metadata = json.loads(value) if value else {}
+    except ValueError:
+        return {}
+    return metadata if isinstance(metadata, dict) else {}
+
+
+def normalize(row, amounts_in_kobo):
+    """Reference, amount in naira, fees in kobo, status and invoice hint of an export row"""
+    unit = 1 if amounts_in_kobo else 100
+    metadata = parse_metadata(row.get("metadata"))
+    fees = row.get("fees")
+
+    return frappe._dict(
+        reference=(row.get("reference") or "").strip(),
+        status=(row.get("status") or "").strip().lower(),
+        amount=flt(row.get("amount")) * unit / 100,
+        fees_kobo=cint(round(flt(fees) * unit)) if fees not in (None, "") else None,
+        invoice=metadata.get("invoice_no") or row.get("invoice_no"),
+        metadata=metadata
+    )
+
+
+def build_reference_index(references):
+    """{reference: invoice} for a batch, from the ledger first and pushed invoices second"""
+    index = {
+        reference: row.sales_invoice
+        for reference, row in get_transactions(references, fields=["sales_invoice"]).items()
+        if row.sales_invoice
+    }
+
+    missing = [reference for reference in references if reference not in index]
+    for chunk in chunked(missing, REFERENCE_CHUNK_SIZE):
+        for invoice in frappe.get_all(
+            "Sales Invoice",
+            filters={"terminal_reference": ["in", chunk], "docstatus": 1},
+            fields=["name", "terminal_reference"]
+        ):
+            index[invoice.terminal_reference] = invoice.name
+
+    return index
+
+
+def get_open_invoices(invoices):
+    """Submitted invoices that still have something outstanding"""
+    open_invoices = set()
+    for chunk in chunked(list(invoices), REFERENCE_CHUNK_SIZE):
+        open_invoices.update(frappe.get_all(
+            "Sales Invoice",
+            filters={"name": ["in", chunk], "docstatus": 1, "outstanding_amount": [">", 0]},
+            pluck="name"
+        ))
+    return open_invoices
+
+
+def import_batch(rows, summary, dry_run=False, unmatched=None):
+    """Match one batch against the reference index and post its missing Payment Entries"""
+    from paystack_terminal.api import create_payment_entry
+
+    references = list(dict.fromkeys(row.reference for row in rows))
+    existing = get_existing_references(references)
+    existing.update(
+        reference
+        for reference, row in get_transactions(references, fields=["payment_entry"]).items()
+        if row.payment_entry
+    )
+    index = build_reference_index(references)
+
+    for row in rows:
+        row.invoice = index.get(row.reference) or row.invoice
+    open_invoices = get_open_invoices({row.invoice for row in rows if row.invoice})
+
+    for row in rows:
+        if row.reference in existing:
+            summary["duplicate"] += 1
+            continue
+
+        if not row.invoice or row.invoice not in open_invoices:
+            summary["unmatched"] += 1
+            if unmatched:
+                unmatched.writerow([row.reference, row.amount, row.invoice or ""])
+            continue
+
+        summary["matched"] += 1
+        # A reference repeated in the export is only posted once
+        existing.add(row.reference)
+        if dry_run:
+            continue
+
+        extend_reference_locks()
+        try:
+            with savepoint("paystack_import"):
+                create_payment_entry(row.reference, row.amount, row.invoice, row.metadata, fees_kobo=row.fees_kobo)
+            summary["created"] += 1
+        except Exception as e:
+            summary["failed"] += 1
+            frappe.logger().error(f"Paystack import could not post {row.reference}: {str(e)}")
+
+    if dry_run:
+        frappe.db.rollback()
+    else:
+        frappe.db.commit()
+
+
+@metrics.timed("paystack_reconciliation_duration_seconds", mode="import")
+def import_transactions(path, file_format=None, dry_run=False, batch_size=DEFAULT_BATCH_SIZE,
+        amounts_in_kobo=None, unmatched_path=None, progress=None):
+    """Stream a Paystack transaction export and create the Payment Entries it is missing.
+
+    CSV exports carry naira amounts and JSON lines (API objects) carry kobo,
+    unless amounts_in_kobo says otherwise. Each batch is committed on its own,
+    so an interrupted import can simply be run again.
+    """
+    file_format = get_format(path, file_format)
+    if amounts_in_kobo is None:
+        amounts_in_kobo = file_format == "jsonl"
+
+    summary = {
+        "rows": 0, "skipped": 0, "invalid": 0, "matched": 0, "unmatched": 0,
+        "duplicate": 0, "created": 0, "failed": 0, "dry_run": bool(dry_run)
+    }
+
+    unmatched_file = open(unmatched_path, "w", newline="") if unmatched_path else None
+    unmatched = csv.writer(unmatched_file) if unmatched_file else None
+    if unmatched:
+        unmatched.writerow(["reference", "amount", "invoice"])
+
+    def flush(batch):
+        import_batch(batch, summary, dry_run=dry_run, unmatched=unmatched)
+        metrics.observe("paystack_reconciliation_batch_size", len(batch), mode="import")
+        if progress:
+            progress(summary)
+
+    try:
+        batch = []
+        for raw in iter_rows(path, file_format):
+            summary["rows"] += 1
+            row = normalize(raw, amounts_in_kobo)
+
+            if not row.reference or row.amount <= 0:
+                summary["invalid"] += 1
+                continue
+            if row.status != "success":
+                summary["skipped"] += 1
+                continue
+
+            batch.append(row)
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+
+        if batch:
+            flush(batch)
+    finally:
+        if unmatched_file:
+            unmatched_file.close()
+
+    return summary
@@ -0,0 +1,43 @@
+"""
+Author:Hedgar Ajakaiye
+Date: October 17, 2026
+Description: Signature verification and idempotency for Paystack webhooks
+"""
+
+import hashlib
+import hmac
+
+import frappe
+from paystack_terminal.settings import get_settings
+
+IDEMPOTENCY_KEY = "paystack_terminal:webhook:{0}:{1}"
+
+# Paystack retries for up to 72 hours
+IDEMPOTENCY_TTL = 72 * 60 * 60
+
+
+def is_valid_signature(payload, signature, secret_key=None):
+    """Constant-time check of the x-paystack-signature HMAC-SHA512 over the raw body"""
+    if not signature or not payload:
+        return False
+
+    secret_key = secret_key or get_settings().secret_key
+    if not secret_key:
+        return False
+
+    expected = hmac.new(secret_key.encode(), payload, hashlib.sha512).hexdigest()
+    return hmac.compare_digest(expected, signature.strip().lower())
+
+
+def get_idempotency_key(event, reference):
+    return frappe.cache().make_key(IDEMPOTENCY_KEY.format(event, reference))
+
+
+def claim_event(event, reference):
+    """SETNX the idempotency key; False means this event was already accepted"""
+    return bool(frappe.cache().set(get_idempotency_key(event, reference), 1, nx=True, ex=IDEMPOTENCY_TTL))
+
+
+def release_event(event, reference):
+    """Forget a claimed event so Paystack's retry can be accepted again"""
+    frappe.cache().delete(get_idempotency_key(event, reference))